@@ -0,0 +1,122 @@
+import json
+import os
+import pygame
+from settings import *
+
+# Every image the game loads goes through here. When bake_assets.py has been
+# run the images are cut out of packed atlas pages listed in the manifest,
+# otherwise they are loaded from the individual files under graphics/.
+# Either way each image is only loaded once and shared between sprites.
+# The manifest keeps each source file's mtime and size; images whose source
+# changed since the bake are loaded from the file instead.
+
+_images = {}
+_atlases = []
+_manifest = None
+
+
+def image_key(path, size=None, frame=None):
+	key = path.replace(os.sep, '/')
+	if size:
+		key += f'@{size[0]}x{size[1]}'
+	if frame is not None:
+		key += f'#{frame}'
+	return key
+
+
+def source_path(key):
+	# The file an image key was cut from, see image_key
+	return key.partition('#')[0].partition('@')[0]
+
+
+def source_stamp(path):
+	# [mtime in ns, size] of a source image, None when it is gone
+	try:
+		stat = os.stat(path)
+	except OSError:
+		return None
+	return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_manifest():
+	global _manifest
+	if _manifest is None:
+		_manifest = {}
+		if USE_BAKED_ASSETS and os.path.exists(ASSET_MANIFEST):
+			with open(ASSET_MANIFEST) as manifest_file:
+				data = json.load(manifest_file)
+			if 'sources' not in data:
+				print(f'Assets: {ASSET_MANIFEST} does not record its sources, loading the files instead; re-run bake_assets.py')
+				return _manifest
+			stale = {path for path, stamp in data['sources'].items() if source_stamp(path) != stamp}
+			if stale:
+				print(f'Assets: {len(stale)} source images changed since the bake (e.g. {min(stale)}), '
+					  f'loading those from the files; re-run bake_assets.py')
+			# atlas pages are only decoded the first time one of their images is used
+			_atlases[:] = [name for name in data['atlases']]
+			_manifest = {key: entry for key, entry in data['images'].items() if source_path(key) not in stale}
+	return _manifest
+
+
+def get_atlas(index):
+	atlas = _atlases[index]
+	if isinstance(atlas, str):
+		atlas = _atlases[index] = pygame.image.load(os.path.join(ASSET_BAKE_DIR, atlas)).convert_alpha()
+	return atlas
+
+
+def get_baked(key):
+	entry = load_manifest().get(key)
+	if entry is None:
+		return None
+	atlas_index, x, y, width, height, offset_x, offset_y, full_width, full_height = entry
+	region = get_atlas(atlas_index).subsurface((x, y, width, height))
+	if (width, height) == (full_width, full_height):
+		return region
+
+	# stored trimmed, pad it back out so rects and offsets stay as authored
+	image = pygame.Surface((full_width, full_height), pygame.SRCALPHA)
+	image.blit(region, (offset_x, offset_y))
+	return image
+
+
+def load_image(path, size=None):
+	key = image_key(path, size)
+	if key not in _images:
+		image = get_baked(key)
+		if image is None:
+			image = pygame.image.load(path)
+			if size:
+				image = pygame.transform.scale(image, size)
+			image = image.convert_alpha()
+		_images[key] = image
+	return _images[key]
+
+
+def cut_frame(sheet, x, y, width, height):
+	# Same as Enemy.get_image: frames past the end of a short sheet come out blank
+	image = pygame.Surface((width, height), pygame.SRCALPHA)
+	image.blit(sheet, (0, 0), (x, y, width, height))
+	return image
+
+
+def load_frames(path, frame_size, count):
+	# Horizontal animation strip of count frames, each frame_size big
+	frame_width, frame_height = frame_size
+	frames = []
+	for i in range(count):
+		key = image_key(path, frame=i)
+		if key not in _images:
+			image = get_baked(key)
+			if image is None:
+				image = cut_frame(load_image(path), i * frame_width, 0, frame_width, frame_height)
+			_images[key] = image
+		frames.append(_images[key])
+	return frames
+
+
+def clear_cache():
+	global _manifest
+	_images.clear()
+	_atlases.clear()
+	_manifest = None
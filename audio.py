@@ -0,0 +1,97 @@
+import os
+import pygame
+from settings import *
+
+
+class SoundBank:
+	"""
+	Every effect is decoded once up front and played on a fixed pool of
+	mixer channels. When the pool is full the quietest-priority, oldest voice
+	is stolen, and the same sound is only started once per simulation tick.
+	"""
+
+	def __init__(self, sound_dirs=SOUND_DIRS, channel_count=AUDIO_CHANNELS):
+		self.sounds = {}
+		self.channels = []
+		self.channel_priority = []
+		self.channel_started = []
+		self.played_this_tick = set()
+		self.tick = 0
+		self.enabled = pygame.mixer.get_init() is not None
+		if not self.enabled:
+			print('Audio disabled: mixer could not be initialised')
+			return
+
+		paths = [monster['attack_sound'] for monster in monster_data.values()]
+		for directory in sound_dirs:
+			for name in sorted(os.listdir(directory)):
+				if name.lower().endswith('.wav'):
+					paths.append(f'{directory}/{name}')
+		for path in paths:
+			if path not in self.sounds:
+				self.sounds[path] = pygame.mixer.Sound(path)
+				self.sounds[path].set_volume(SFX_VOLUME)
+
+		# The pool is ours alone, pygame never hands these channels out by itself
+		pygame.mixer.set_num_channels(channel_count)
+		pygame.mixer.set_reserved(channel_count)
+		self.channels = [pygame.mixer.Channel(i) for i in range(channel_count)]
+		self.channel_priority = [0] * channel_count
+		self.channel_started = [0] * channel_count
+
+	def new_tick(self):
+		self.tick += 1
+		self.played_this_tick.clear()
+
+	def pick_channel(self, priority):
+		steal_index = None
+		for index, channel in enumerate(self.channels):
+			if not channel.get_busy():
+				return index
+			if self.channel_priority[index] <= priority:
+				if steal_index is None or (self.channel_priority[index], self.channel_started[index]) < (self.channel_priority[steal_index], self.channel_started[steal_index]):
+					steal_index = index
+		return steal_index
+
+	def play(self, path, priority=SOUND_PRIORITY_NORMAL):
+		if not self.enabled or path in self.played_this_tick:
+			return
+		sound = self.sounds.get(path)
+		if sound is None:
+			return  # never load from disk inside the frame
+		index = self.pick_channel(priority)
+		if index is None:
+			return  # everything playing is more important
+		self.channels[index].play(sound)
+		self.channel_priority[index] = priority
+		self.channel_started[index] = self.tick
+		self.played_this_tick.add(path)
+
+	def play_music(self, path=MUSIC_PATH, volume=MUSIC_VOLUME):
+		# Streamed from disk by SDL's mixer thread, not decoded up front
+		if not self.enabled:
+			return
+		pygame.mixer.music.load(path)
+		pygame.mixer.music.set_volume(volume)
+		pygame.mixer.music.play(-1)
+
+
+sound_bank = None
+
+
+def init_audio():
+	global sound_bank
+	if sound_bank is None:
+		sound_bank = SoundBank()
+	return sound_bank
+
+
+def play_sound(path, priority=SOUND_PRIORITY_NORMAL):
+	# Safe to call from anywhere, does nothing until init_audio() has run
+	if sound_bank is not None:
+		sound_bank.play(path, priority)
+
+
+def new_audio_tick():
+	if sound_bank is not None:
+		sound_bank.new_tick()
@@ -0,0 +1,152 @@
+"""
+Offline asset build: packs the game's images into a few atlases plus a JSON
+manifest that assets.py reads at startup.
+
+	python bake_assets.py
+
+Enemy animation strips are pre-sliced using Enemy.enemy_frame_data and the
+player frames are pre-scaled to PLAYER_WIDTH x PLAYER_HEIGHT, so the runtime
+only has to cut subsurfaces out of the atlases. Mostly transparent frames are
+stored trimmed and padded back to their original size when loaded. The
+manifest records every source file's mtime and size, so the game notices
+art edited after the bake and loads it from the file until the next bake.
+"""
+import json
+import os
+import time
+import pygame
+from settings import *
+from assets import image_key, cut_frame, source_path, source_stamp
+from enemy import Enemy
+
+PLAYER_DIR = 'graphics/player'
+CHARACTER_DIR = 'graphics/_Crypt/Characters'
+WEAPON_DIR = 'graphics/weapons'
+TRIM_THRESHOLD = 0.75  # only trim images whose opaque area is at most this fraction
+TILE_IMAGES = ['graphics/_Crypt/Tilesets/wall-1.png', 'graphics/_Crypt/Tilesets/ground 1 to 2.png',
+			   'graphics/_Crypt/Props/animated/doors/doors-metal-door frame 1-opening.png']
+
+
+def list_pngs(directory):
+	paths = []
+	for root, _, files in os.walk(directory):
+		for name in sorted(files):
+			if name.lower().endswith('.png'):
+				paths.append(os.path.join(root, name).replace(os.sep, '/'))
+	return sorted(paths)
+
+
+def collect_images():
+	"""
+	Returns {group: {key: surface}}. Keys match what assets.load_image and
+	load_frames ask for; each group is packed into its own atlas pages so the
+	runtime only decodes the pages for things it actually uses.
+	"""
+	groups = {'player': {}, 'tiles': {}, 'particles': {}}
+
+	for path in list_pngs(PLAYER_DIR):
+		size = (PLAYER_WIDTH, PLAYER_HEIGHT)
+		groups['player'][image_key(path, size)] = pygame.transform.scale(pygame.image.load(path), size)
+	for path in list_pngs(WEAPON_DIR):
+		groups['player'][image_key(path)] = pygame.image.load(path)
+
+	for path in list_pngs(CHARACTER_DIR):
+		relative = os.path.relpath(path, CHARACTER_DIR).replace(os.sep, '/')
+		enemy_type = relative.split('/')[0]
+		action = os.path.splitext(os.path.basename(path))[0]
+		frame_data = Enemy.enemy_frame_data.get(enemy_type)
+		if frame_data is None or action not in frame_data or action in ['frame_size', 'hitbox_scale', 'hitbox_offset']:
+			continue
+		group = groups.setdefault('enemy-' + os.path.dirname(relative).replace('/', '-'), {})
+		sheet = pygame.image.load(path)
+		frame_width, frame_height = frame_data['frame_size']
+		for i in range(frame_data[action]):
+			group[image_key(path, frame=i)] = cut_frame(sheet, i * frame_width, 0, frame_width, frame_height)
+
+	for path in TILE_IMAGES:
+		groups['tiles'][image_key(path)] = pygame.image.load(path)
+	for path in list_pngs(PARTICLE_DIR):
+		groups['particles'][image_key(path)] = pygame.image.load(path)
+
+	return groups
+
+
+def pack(images, atlas_size=ATLAS_SIZE, padding=1):
+	"""
+	Shelf packer: tallest images first, left to right in rows, a new atlas page
+	once a page is full. Returns (page sizes, {key: [page, x, y, w, h]}).
+	"""
+	placements = {}
+	pages = []
+	x = y = shelf_height = 0
+	page_width = page_height = 0
+
+	def close_page():
+		if page_width and page_height:
+			pages.append((page_width, page_height))
+
+	for key in sorted(images, key=lambda key: (-images[key].get_height(), key)):
+		width, height = images[key].get_size()
+		if x + width > atlas_size:
+			x, y, shelf_height = 0, y + shelf_height + padding, 0
+		if y + height > atlas_size:
+			close_page()
+			x = y = shelf_height = page_width = page_height = 0
+		placements[key] = [len(pages), x, y, width, height]
+		x += width + padding
+		shelf_height = max(shelf_height, height)
+		page_width = max(page_width, x)
+		page_height = max(page_height, y + height)
+	close_page()
+	return pages, placements
+
+
+def trim(image):
+	# Drop transparent borders when that saves a worthwhile amount of atlas space.
+	# Returns the trimmed surface and where it sits inside the original image.
+	bounds = image.get_bounding_rect()
+	if bounds.width * bounds.height > image.get_width() * image.get_height() * TRIM_THRESHOLD:
+		return image, (0, 0)
+	if bounds.width == 0 or bounds.height == 0:
+		bounds = pygame.Rect(0, 0, 1, 1)
+	return image.subsurface(bounds).copy(), bounds.topleft
+
+
+def bake(output_dir=ASSET_BAKE_DIR):
+	start = time.perf_counter()
+	os.makedirs(output_dir, exist_ok=True)
+
+	atlas_names = []
+	manifest_images = {}
+	sources = {}
+	image_count = 0
+	for group_name, originals in collect_images().items():
+		images = {}
+		offsets = {}
+		for key, image in originals.items():
+			images[key], offsets[key] = trim(image)
+		pages, placements = pack(images)
+		first_page = len(atlas_names)
+		for page_index, size in enumerate(pages):
+			atlas = pygame.Surface(size, pygame.SRCALPHA)
+			for key, (index, x, y, _, _) in placements.items():
+				if index == page_index:
+					atlas.blit(images[key], (x, y))
+			name = f'{group_name}_{page_index}.png'
+			pygame.image.save(atlas, os.path.join(output_dir, name))
+			atlas_names.append(name)
+		for key, (index, x, y, width, height) in placements.items():
+			full_width, full_height = originals[key].get_size()
+			manifest_images[key] = [first_page + index, x, y, width, height, *offsets[key], full_width, full_height]
+			sources[source_path(key)] = source_stamp(source_path(key))
+		image_count += len(images)
+
+	with open(os.path.join(output_dir, os.path.basename(ASSET_MANIFEST)), 'w') as manifest_file:
+		json.dump({'atlases': atlas_names, 'images': manifest_images, 'sources': sources}, manifest_file)
+
+	print(f'Baked {image_count} images into {len(atlas_names)} atlases in {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+	pygame.init()
+	bake()
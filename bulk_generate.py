@@ -0,0 +1,154 @@
+"""
+Generates many seeded dungeon layouts across all cores and reports what
+the generator constants produce: rooms, floor ratio, unreachable rooms,
+corridor length, doors and generation time. Only the layout is built
+(dungeon.DungeonLayout), no display, tiles or sprites.
+
+	python bulk_generate.py --count 5000
+	python bulk_generate.py --count 2000 --cells 20 --min-size 6 --extra-edges 0.3 --csv seeds.csv
+
+Seeds that hit the separation pass limit, leave the player without a start
+tile, leave rooms unreachable or raise are listed at the end so they can be
+opened in the game with python main.py --seed N.
+"""
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import contextlib
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from settings import *
+from dungeon import DungeonLayout
+
+# Columns of the summary table, in order
+STATS = ['rooms', 'floor_ratio', 'unreachable_rooms', 'repaired_rooms', 'regions', 'corridor_length', 'corridor_tiles', 'doors', 'separation_passes', 'generation_ms']
+
+
+def room_tiles(room, width, height):
+	return [(x, y) for y in range(max(room.y, 0), min(room.y + room.height, height)) for x in range(max(room.x, 0), min(room.x + room.width, width))]
+
+
+def layout_stats(dungeon):
+	grid = dungeon.dungeon_layout
+	height, width = len(grid), len(grid[0])
+	floor = sum(row.count(' ') for row in grid)
+
+	# rooms the player cannot walk to from the start tile, after connect_regions repaired what it could
+	start = dungeon.regions.region(dungeon.player_tile) if dungeon.player_tile[0] is not None else 0
+	unreachable = sum(1 for room in dungeon.rooms if not start or dungeon.regions.room_region(room) != start)
+	in_rooms = {tile for room in dungeon.rooms for tile in room_tiles(room, width, height)}
+
+	# corridor centre lines follow the room centres, horizontal then vertical
+	corridor_length = 0
+	for a, b in dungeon.mst:
+		(x1, y1), (x2, y2) = dungeon.rooms[a].rect.center, dungeon.rooms[b].rect.center
+		corridor_length += abs(x1 - x2) + abs(y1 - y2)
+	corridor_tiles = sum(1 for y, row in enumerate(grid) for x, tile in enumerate(row) if tile == ' ' and (x, y) not in in_rooms)
+
+	return {
+		'rooms': len(dungeon.rooms),
+		'floor_ratio': floor / (width * height),
+		'unreachable_rooms': unreachable,
+		'repaired_rooms': dungeon.repaired_rooms,
+		'regions': dungeon.regions.count(),
+		'corridor_length': corridor_length,
+		'corridor_tiles': corridor_tiles,
+		'doors': len(dungeon.door_tiles) // 16,  # create_door adds 4x4 tiles per door
+		'separation_passes': dungeon.separation_passes,
+	}
+
+
+def measure(seed, map_size, cell_count, min_room_size, extra_edges, safety_margin, corridor_width):
+	# Runs in a worker: one layout, its stats, and whatever went wrong
+	result = {'seed': seed, 'error': ''}
+	with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+		start = time.perf_counter()
+		dungeon = DungeonLayout(seed, map_size, map_size, cell_count, min_room_size, extra_edges, safety_margin, corridor_width)
+		generation = dungeon.create_generation_pipeline()
+		try:
+			generation.run()
+		except Exception as error:
+			result['error'] = f'{type(error).__name__}: {error} in {generation.stage_name}'
+		result['generation_ms'] = (time.perf_counter() - start) * 1000
+	if result['error']:
+		return result
+	result.update(layout_stats(dungeon))
+	result['no_player_tile'] = dungeon.player_tile[0] is None
+	return result
+
+
+def summarize(results):
+	good = [result for result in results if not result['error']]
+	print(f'{len(results)} seeds, {len(results) - len(good)} failed to generate')
+	if not good:
+		return
+	print(f'{"stat":<18} {"mean":>9} {"min":>9} {"p5":>9} {"p50":>9} {"p95":>9} {"p99":>9} {"max":>9}')
+	for stat in STATS:
+		values = np.array([result[stat] for result in good], dtype=float)
+		p5, p50, p95, p99 = np.percentile(values, [5, 50, 95, 99])
+		print(f'{stat:<18} {values.mean():>9.3f} {values.min():>9.3f} {p5:>9.3f} {p50:>9.3f} {p95:>9.3f} {p99:>9.3f} {values.max():>9.3f}')
+
+	counts = np.bincount([result['rooms'] for result in good])
+	print('\nrooms per layout   ' + '  '.join(f'{count}: {number / len(good):.1%}' for count, number in enumerate(counts) if number))
+
+
+def print_flagged(results, limit):
+	flags = [
+		('generation raised', [result for result in results if result['error']]),
+		(f'separation hit {SEPARATION_MAX_PASSES} passes', [result for result in results if not result['error'] and result['separation_passes'] >= SEPARATION_MAX_PASSES]),
+		('no player start tile', [result for result in results if not result['error'] and result['no_player_tile']]),
+		('rooms repaired by connect_regions', [result for result in results if not result['error'] and result['repaired_rooms']]),
+		('unreachable rooms', [result for result in results if not result['error'] and result['unreachable_rooms']]),
+	]
+	for label, flagged in flags:
+		if not flagged:
+			continue
+		print(f'\n{label}: {len(flagged)} seeds ({len(flagged) / len(results):.2%})')
+		for result in flagged[:limit]:
+			print(f'  seed {result["seed"]}' + (f'  {result["error"]}' if result['error'] else ''))
+		if len(flagged) > limit:
+			print(f'  … {len(flagged) - limit} more')
+
+
+def write_csv(results, path):
+	columns = ['seed'] + STATS + ['no_player_tile', 'error']
+	with open(path, 'w', newline='') as file:
+		writer = csv.DictWriter(file, columns, restval='')
+		writer.writeheader()
+		writer.writerows(results)
+	print(f'Per-seed rows written to {path}')
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Generate many dungeon layouts in parallel and report on them')
+	parser.add_argument('--count', type=int, default=1000, help='number of seeds')
+	parser.add_argument('--start-seed', type=int, default=0, help='first seed, the rest follow on')
+	parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes (default: one per core)')
+	parser.add_argument('--map-size', type=int, default=MAP_WIDTH, help='map width and height in tiles')
+	parser.add_argument('--cells', type=int, default=CELL_COUNT, help='cells scattered before rooms are picked')
+	parser.add_argument('--min-size', type=int, default=ROOM_MIN_SIZE, help='cells must be larger than this to become rooms')
+	parser.add_argument('--extra-edges', type=float, default=EXTRA_EDGE_SHARE, help='share of non-MST edges that also get a corridor')
+	parser.add_argument('--margin', type=int, default=SAFETY_MARGIN, help='tiles kept clear along the map edge')
+	parser.add_argument('--corridor-width', type=int, default=CORRIDOR_WIDTH, help='corridor width in tiles')
+	parser.add_argument('--list', type=int, default=10, help='flagged seeds listed per problem')
+	parser.add_argument('--csv', metavar='PATH', help='write one row per seed')
+	args = parser.parse_args()
+
+	seeds = range(args.start_seed, args.start_seed + args.count)
+	job = partial(measure, map_size=args.map_size, cell_count=args.cells, min_room_size=args.min_size, extra_edges=args.extra_edges, safety_margin=args.margin, corridor_width=args.corridor_width)
+	print(f'{args.count} layouts on {args.map_size}x{args.map_size}, {args.cells} cells, min size {args.min_size}, extra edges {args.extra_edges}, margin {args.margin}, corridor width {args.corridor_width}, {args.workers} workers...')
+
+	start = time.perf_counter()
+	with ProcessPoolExecutor(args.workers) as executor:
+		results = list(executor.map(job, seeds, chunksize=max(1, args.count // (args.workers * 8))))
+	elapsed = time.perf_counter() - start
+
+	summarize(results)
+	print_flagged(results, args.list)
+	print(f'\n{args.count / elapsed:.0f} layouts/s over {args.workers} workers, {elapsed:.1f} s wall')
+	if args.csv:
+		write_csv(results, args.csv)
@@ -0,0 +1,351 @@
+import random
+import pygame
+import numpy as np  # pygame imports numpy already (pygame.surfarray), so a lazy import here would save nothing
+from settings import *
+from pipeline import StagedPipeline
+from startup import lazy_import
+from triangulation import bowyer_watson, kruskal_mst
+from regions import WalkableRegions
+
+# The layout half of level generation, kept free of sprites and the display
+# so bulk_generate.py's worker processes can run thousands of seeds.
+
+def use_builtin_generation(point_count):
+	# scipy and networkx are only worth their import time on large room counts
+	if GENERATION_BACKEND == 'auto':
+		return point_count <= BUILTIN_GENERATION_MAX_ROOMS
+	return GENERATION_BACKEND == 'builtin'
+
+def get_room_centers(rooms):
+	return [(room.rect.centerx, room.rect.centery) for room in rooms]
+
+def create_delaunay_triangulation(rooms):
+	points = get_room_centers(rooms)
+	if use_builtin_generation(len(points)):
+		return bowyer_watson(points)
+	Delaunay = lazy_import('scipy.spatial').Delaunay
+	return [tuple(simplex) for simplex in Delaunay(np.array(points)).simplices.tolist()]
+
+def get_delaunay_edges(triangles):
+	edges = set()
+	for a, b, c in triangles:
+		for edge in ((a, b), (b, c), (c, a)):
+			edges.add((min(edge), max(edge)))
+	return edges
+
+def create_mst(triangles, rooms):
+	points = get_room_centers(rooms)
+	edges = get_delaunay_edges(triangles)
+	if not edges:
+		# fewer than three rooms, nothing to triangulate
+		edges = {(i, i + 1) for i in range(len(points) - 1)}
+
+	if use_builtin_generation(len(points)):
+		return kruskal_mst(points, edges)
+
+	nx = lazy_import('networkx')
+	G = nx.Graph()
+	for a, b in edges:
+		G.add_edge(a, b, weight=((points[a][0] - points[b][0]) ** 2 + (points[a][1] - points[b][1]) ** 2) ** 0.5)
+	return [(min(edge), max(edge)) for edge in nx.minimum_spanning_tree(G).edges()]
+
+def add_extra_edges_to_mst(mst, delaunay_tri, percentage=0.05):
+	# Calculate additional edges not in the MST
+	additional_edges = sorted(get_delaunay_edges(delaunay_tri) - set(mst))
+	extra_edges = random.sample(additional_edges, k=int(len(additional_edges) * percentage))
+	mst.extend(extra_edges)
+
+def get_room_center(room):
+	return (room.x + room.width // 2, room.y + room.height // 2)
+
+def get_room_distance(room1, room2):
+	(x1, y1), (x2, y2) = get_room_center(room1), get_room_center(room2)
+	return abs(x1 - x2) + abs(y1 - y2)
+
+def connect_rooms_with_corridor(dungeon_layout, room1, room2, width=CORRIDOR_WIDTH):
+	x1, y1 = get_room_center(room1)
+	x2, y2 = get_room_center(room2)
+
+	# Horizontal corridor
+	for x in range(min(x1, x2), max(x1, x2) + 1):
+		for i in range(0, width):
+			dungeon_layout[y1 + i][x] = ' '
+
+	# Vertical corridor
+	for y in range(min(y1, y2), max(y1, y2) + 1):
+		for i in range(0, width):
+			dungeon_layout[y][x2 + i] = ' '
+
+class Cell:
+	def __init__(self, x, y, width, height):
+		self.rect = pygame.Rect(x, y, width, height)
+
+def generate_cells(number_of_cells, map_width, map_height, buffer=SAFETY_MARGIN):
+	cells = []
+	for _ in range(number_of_cells):
+		width = int(np.random.normal(loc=10, scale=3))
+		height = int(np.random.normal(loc=10, scale=3))
+		# Ensure cells are within bounds considering their dimensions
+		x = np.random.randint(buffer, map_width - width - buffer)
+		y = np.random.randint(buffer, map_height - height - buffer)
+		cells.append(Cell(x, y, width, height))
+	return cells
+
+def separate_cells(cells, max_iterations=SEPARATION_MAX_PASSES):
+	for _ in iterate_separation(cells, max_iterations):
+		pass
+
+def iterate_separation(cells, max_iterations=SEPARATION_MAX_PASSES):
+	# separate_cells one push-apart pass at a time, so generation can pause between passes
+	moved = True
+	iteration_count = 0
+
+	while moved and iteration_count < max_iterations:
+		moved = False
+		for i, cell_a in enumerate(cells):
+			for cell_b in cells[i+1:]:
+				if cell_a.rect.colliderect(cell_b.rect):
+					moved = True
+					# Calculate overlap
+					dx = min(cell_a.rect.right - cell_b.rect.left, cell_b.rect.right - cell_a.rect.left)
+					dy = min(cell_a.rect.bottom - cell_b.rect.top, cell_b.rect.bottom - cell_a.rect.top)
+
+					# Determine push direction
+					if dx < dy:
+						push_x = dx / 2
+						cell_a.rect.x -= push_x
+						cell_b.rect.x += push_x
+					else:
+						push_y = dy / 2
+						cell_a.rect.y -= push_y
+						cell_b.rect.y += push_y
+
+		iteration_count += 1
+		yield
+
+	if iteration_count >= max_iterations:
+		print("Warning: separate_cells reached maximum iterations")
+
+def select_rooms(cells, min_size, map_width, map_height, buffer=SAFETY_MARGIN):
+	return [Room(cell.rect.x, cell.rect.y, cell.rect.width, cell.rect.height)
+			for cell in cells
+			if cell.rect.width > min_size and cell.rect.height > min_size
+			and cell.rect.right < map_width - buffer  # Adjusted
+			and cell.rect.bottom < map_height - buffer]  # Adjusted
+
+
+class Room:
+	def __init__(self, x, y, width, height):
+		# Initialize the room based on its top-left corner, width, and height
+		self.x = x
+		self.y = y
+		self.width = width
+		self.height = height
+		# Create a pygame.Rect object for the room
+		self.rect = pygame.Rect(x, y, width, height)
+		
+	def create_room(self, dungeon_layout):
+		for x in range(self.x, self.x + self.width):
+			for y in range(self.y, self.y + self.height):
+				# Check bounds before accessing the dungeon layout
+				if 0 <= x < len(dungeon_layout[0]) and 0 <= y < len(dungeon_layout):
+					if dungeon_layout[y][x] != ' ':  # Avoid overwriting corridors
+						dungeon_layout[y][x] = ' '
+
+
+class DungeonLayout:
+	"""
+	Seeded dungeon layout: rooms, corridors, doors and the player's start
+	tile, with no sprites. Level builds on it and adds tiles and actors;
+	bulk_generate.py runs it alone. The tuning arguments default to settings.
+	"""
+
+	def __init__(self, seed=None, map_width=MAP_WIDTH, map_height=MAP_HEIGHT, cell_count=CELL_COUNT, min_room_size=ROOM_MIN_SIZE, extra_edges=EXTRA_EDGE_SHARE, safety_margin=SAFETY_MARGIN, corridor_width=CORRIDOR_WIDTH):
+		# every random choice in generation and AI comes from this seed
+		self.seed = seed if seed is not None else random.randrange(2 ** 32)
+		random.seed(self.seed)
+		np.random.seed(self.seed % 2 ** 32)  # numpy takes 32 bit seeds, recordings keep 64
+
+		self.map_width = map_width
+		self.map_height = map_height
+		self.cell_count = cell_count
+		self.min_room_size = min_room_size
+		self.extra_edges = extra_edges  # share of the non-MST Delaunay edges that also get a corridor
+		self.safety_margin = safety_margin
+		self.corridor_width = corridor_width
+
+		# Initialize the dungeon map as an instance attribute
+		self.dungeon_layout = [['x' for _ in range(map_width)] for _ in range(map_height)]
+
+		# Initialize object, enemy, and player layout
+		self.object_layout = [[' ' for _ in range(map_width)] for _ in range(map_height)]
+
+		# list of rooms
+		self.rooms = []
+		self.starting_room = None
+		self.player_tile = (None, None)
+		self.door_tiles = []
+
+		# connected walkable regions of the final layout, for reachability checks
+		self.regions = WalkableRegions()
+		self.repaired_rooms = 0
+
+	def layout_stages(self):
+		return [
+			('cells', self.generate_map_cells),
+			('separation', self.separate_map_cells),
+			('rooms', self.carve_rooms),
+			('triangulation', self.triangulate_rooms),
+			('mst', self.connect_room_graph),
+			('corridors', self.carve_corridors),
+			('wall fix', self.fix_walls),
+			('connectivity', self.connect_regions),
+		]
+
+	def create_generation_pipeline(self):
+		return StagedPipeline(self.layout_stages() + [
+			('doors', self.place_doors),
+			('player spot', self.find_player_spot),
+		])
+
+	def generate_map_cells(self):
+		self.cells = generate_cells(self.cell_count, self.map_width, self.map_height, self.safety_margin)
+
+	def separate_map_cells(self):
+		# separation_passes reaching SEPARATION_MAX_PASSES means the cells never stopped overlapping
+		self.separation_passes = 0
+		for _ in iterate_separation(self.cells):
+			self.separation_passes += 1
+			yield
+
+	def carve_rooms(self):
+		# Convert cells to rooms and add to self.rooms
+		self.rooms = select_rooms(self.cells, self.min_room_size, self.map_width, self.map_height, self.safety_margin)
+
+		# Fill rooms in the dungeon layout
+		for room in self.rooms:
+			print(f'Room rendered at position:', room.x, room.y)
+			room.create_room(self.dungeon_layout)
+
+	def triangulate_rooms(self):
+		self.delaunay_tri = create_delaunay_triangulation(self.rooms)
+
+	def connect_room_graph(self):
+		self.mst = create_mst(self.delaunay_tri, self.rooms)
+		add_extra_edges_to_mst(self.mst, self.delaunay_tri, self.extra_edges)
+
+	def carve_corridors(self):
+		for edge in self.mst:
+			connect_rooms_with_corridor(self.dungeon_layout, self.rooms[edge[0]], self.rooms[edge[1]], self.corridor_width)
+			yield
+
+	def fix_walls(self):
+		# Fix single-tile-thick walls, once: tiles are picked from the layout once connectivity is repaired
+		self.fix_border_and_walls(self.dungeon_layout)
+
+	def connect_regions(self):
+		# Rooms the corridors left cut off from the first room get a corridor to the closest room that is not;
+		# rooms the border swallowed whole have no floor left to reach
+		self.regions.label(self.dungeon_layout)
+		for _ in range(len(self.rooms)):
+			main = self.regions.room_region(self.rooms[0])
+			cut_off = [room for room in self.rooms if self.regions.room_region(room) not in (main, 0)]
+			if not main or not cut_off:
+				return
+			connected = [room for room in self.rooms if self.regions.room_region(room) == main]
+			room, target = min(((room, target) for room in cut_off for target in connected), key=lambda pair: get_room_distance(*pair))
+			print(f'Room at {room.x} {room.y} was unreachable, connected to room at {target.x} {target.y}')
+			connect_rooms_with_corridor(self.dungeon_layout, target, room, self.corridor_width)
+			self.mst.append((self.rooms.index(target), self.rooms.index(room)))
+			self.regions.label(self.dungeon_layout)
+			self.repaired_rooms += 1
+			yield
+
+	def fix_border_and_walls(self, dungeon_layout):
+		height = len(dungeon_layout)
+		width = len(dungeon_layout[0])
+		border_thickness = 3  # Number of tiles for the border
+
+		# Add a border of 'x' tiles around the map
+		for y in range(height):
+			for x in range(width):
+				if y < border_thickness or y >= height - border_thickness or \
+				x < border_thickness or x >= width - border_thickness:
+					dungeon_layout[y][x] = 'x'
+
+		# Fix single-tile-thick walls inside the map, skipping the border area
+		for y in range(border_thickness, height - border_thickness):
+			for x in range(border_thickness, width - border_thickness):
+				if dungeon_layout[y][x] == 'x':
+					# Check adjacent tiles
+					left = dungeon_layout[y][x - 1]
+					right = dungeon_layout[y][x + 1]
+					up = dungeon_layout[y - 1][x]
+					down = dungeon_layout[y + 1][x]
+
+					# Convert to ' ' if surrounded by ' ' on opposite sides
+					if (left == ' ' and right == ' ') or (up == ' ' and down == ' '):
+						dungeon_layout[y][x] = ' '
+
+	def place_doors(self):
+		self.door_tiles = []
+		door_sum = 0
+		# Additional code for door creation
+		for room in self.rooms:
+			central_x = room.x + room.width // 2
+			door_bottom_row_y = room.y + 1
+
+			door_x = central_x - 2  # Center the door
+
+			# Ensure there's enough space above the wall and the top wall is suitable
+			if door_bottom_row_y - 3 >= 0:
+				# Check if the bottom row of the door and two rows above it are suitable
+				bottom_row_ok = all(self.dungeon_layout[door_bottom_row_y][max(0, door_x + i)] == ' ' for i in range(4))
+				one_row_above_ok = all(self.dungeon_layout[door_bottom_row_y - 1][max(0, door_x + i)] == ' ' for i in range(4))
+				two_rows_above_ok = all(self.dungeon_layout[door_bottom_row_y - 2][max(0, door_x + i)] == 'x' for i in range(4))
+				three_rows_above_ok = all(self.dungeon_layout[door_bottom_row_y - 3][max(0, door_x + i)] == 'x' for i in range(4))
+				four_rows_above_ok = all(self.dungeon_layout[door_bottom_row_y - 4][max(0, door_x + i)] == 'x' for i in range(4))
+
+				if bottom_row_ok and one_row_above_ok and two_rows_above_ok and three_rows_above_ok and four_rows_above_ok and door_sum <=3:
+					self.create_door(door_x * TILESIZE, (door_bottom_row_y - 3) * TILESIZE)
+					door_sum += 1
+
+	def create_door(self, x, y):
+		door_width, door_height = 4, 4
+		for i in range(door_width):
+			for j in range(door_height):
+				door_tile_x = (x // TILESIZE) + i
+				door_tile_y = (y // TILESIZE) + j
+
+				if j == 3:  # Mark the bottom row of the door
+					self.dungeon_layout[door_tile_y][door_tile_x] = 'D'
+					self.regions.update_tile(self.dungeon_layout, door_tile_x, door_tile_y)
+
+				tile_coords = (i, j)
+				door_pos = (x + i * TILESIZE, y + j * TILESIZE)
+				self.door_tiles.append((door_pos, False, 'doors', tile_coords, 'door', None))
+
+	def find_valid_player_position(self, room):
+		# Calculate the center of the room
+		center_x = room.x + room.width // 2
+		center_y = room.y + room.height // 2
+
+		# Ensure the center is not out of bounds
+		center_x = max(min(center_x, self.map_width - 1), 0)
+		center_y = max(min(center_y, self.map_height - 1), 0)
+
+		# Check if the center is a wall tile; if so, find the nearest floor tile
+		if self.dungeon_layout[center_y][center_x] == 'x':
+			for y in range(room.y + 1, room.y + room.height - 1):
+				for x in range(room.x + 1, room.x + room.width - 1):
+					if self.dungeon_layout[y][x] == ' ':
+						return x, y
+		else:
+			return center_x, center_y
+
+		return None, None  # Return None if no valid position is found
+
+	def find_player_spot(self):
+		# The player starts in the first room, player_tile stays (None, None) if it has no floor
+		self.starting_room = self.rooms[0]
+		self.player_tile = self.find_valid_player_position(self.starting_room)
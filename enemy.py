@@ -1,13 +1,18 @@
 import pygame
 from settings import *
 from entity import Entity
+from timestep import get_ticks
 import logging
-import networkx as nx
+from startup import lazy_import
+from assets import load_frames
+from audio import play_sound
+from scaling import flipped
 
 logging.basicConfig(filename='game_debug.log', level=logging.DEBUG, format='%(asctime)s:%(levelname)s:%(message)s')
 
 # A* helper functions
 def create_graph_from_layout(dungeon_layout):
+		nx = lazy_import('networkx')
 		G = nx.grid_2d_graph(len(dungeon_layout[0]), len(dungeon_layout), create_using=nx.Graph())
 		for y, row in enumerate(dungeon_layout):
 			for x, tile in enumerate(row):
@@ -34,15 +39,25 @@ class Enemy(Entity):
 		'BigWorm': {'frame_size' : (128, 128), 'hitbox_scale': 0.3, 'hitbox_offset': (0, 10), 'attack': 29, 'death': 12, 'idle': 8, 'hurt' : 8, 'retreat' : 32, 'final_death' : 1, 'waiting' : 1}
 	}
 
-	def __init__(self, monster_name, pos, groups, obstacle_sprites, dungeon_layout, player):
+	def __init__(self, monster_name, pos, groups, obstacle_sprites, dungeon_layout, player, field_of_view=None, path_service=None, regions=None):
 		super().__init__(groups)
 		self.id = Enemy.id_counter  # Assign an ID to the enemy
 		Enemy.id_counter += 1  # Increment the counter
 		self.sprite_type = 'enemy'
+		self.display_surface = pygame.display.get_surface()
+
+		# rects are made once and moved in place by reset, so a pooled enemy keeps them
+		self.rect = pygame.Rect(0, 0, 0, 0)
+		self.hitbox = pygame.Rect(0, 0, 0, 0)
+		self.reset(monster_name, pos, obstacle_sprites, dungeon_layout, player, field_of_view, path_service, regions)
+
+	def reset(self, monster_name, pos, obstacle_sprites, dungeon_layout, player, field_of_view=None, path_service=None, regions=None):
+		# Everything one life of an enemy needs, also run when the pool hands it out again
+		self.direction.update(0, 0)
+		self.previous_topleft = None
 		self.facing_right = True
 		self.facing_right_at_death = True
 		self.attacking = False
-		self.display_surface = pygame.display.get_surface()
 
 		# Determine hitbox size and offset based on enemy type
 		enemy_type = monster_name.split('/')[0]
@@ -70,30 +85,30 @@ class Enemy(Entity):
 
 		# Set initial image and rect
 		self.image = self.animations[self.status][self.frame_index]
-		self.rect = self.image.get_rect(topleft=pos)
+		self.rect.size = self.image.get_size()
+		self.rect.topleft = pos
 		
 		print(f"{self.monster_type} {self.id} Image Position: {self.rect.topleft}")
 		
 		# Animation setup
-		self.last_update = pygame.time.get_ticks()
+		self.last_update = get_ticks()
 		
-		# Movement
-		self.rect = self.image.get_rect(topleft = pos)
-		self.move_timer = 0
-		self.pause_timer = 0
+		# Movement, wandering switches between moving and pausing on the 'wander_phase' timer
+		self.cancel_timers()  # a pooled enemy's timers belong to its last life
 		self.is_moving = True
-
+		self.wander_direction = pygame.math.Vector2()
 		self.random_move_duration = random.randint(1000, 3000)  # Duration for moving
 		self.random_pause_duration = random.randint(1000, 3000)  # Duration for pausing
+		self.start_timer('wander_phase', self.random_move_duration, self.switch_wander_phase)
 
 		# Add a timer for AI updates to reduce frequency
 		self.ai_update_timer = 0
-		self.ai_update_interval = 500  # Update AI every 500ms
+		self.ai_update_interval = 0  # off-screen AI runs every this many ms, 0 every tick; see Level.tune_enemy
 
 		# Adjust hitbox size and position
 		hitbox_width = int(frame_width * hitbox_scale_factor)
 		hitbox_height = int(frame_height * hitbox_scale_factor)
-		self.hitbox = pygame.Rect(0, 0, hitbox_width, hitbox_height)
+		self.hitbox.size = (hitbox_width, hitbox_height)
 		self.hitbox.center = (self.rect.centerx + hitbox_x_offset, self.rect.centery + hitbox_y_offset)
 		
 		self.obstacle_sprites = obstacle_sprites
@@ -108,30 +123,41 @@ class Enemy(Entity):
 		self.attack_radius = monster_info['attack_radius']
 		self.notice_radius = monster_info['notice_radius']
 		self.attack_type = monster_info['attack_type']
+		self.attack_sound = monster_info['attack_sound']
 		
 		# Player Interaction
 		self.can_attack = True
 		self.player = player
 		self.player_direction = pygame.math.Vector2()
 		self.player_distance = 0
+		self.field_of_view = field_of_view
+		self.sight_radius = self.notice_radius // TILESIZE + 1
 		
 		# invincibility timer
 		self.vulnerable = True
-		self.hit_time = None
 		self.invincibility_duration = 500
   
 		# collision variables
 		self.current_path = []  # Store the current A* path
 		self.dungeon_layout = dungeon_layout  # Store a reference to the dungeon layout for pathfinding
-		self.dungeon_graph = create_graph_from_layout(self.dungeon_layout)
+		self.dungeon_graph = None  # built on the first path search so networkx isn't loaded at startup
+		self.path_service = path_service  # searches off the main thread when set
+		self.regions = regions  # skips searches between unconnected regions when set
   
 		# Initialize the path update time tracking
-		self.last_path_update_time = pygame.time.get_ticks()
+		self.last_path_update_time = get_ticks()
 		self.path_update_interval = 200  # set interval in milliseconds, adjust as needed
   
 		# Initialize player position tracking variables
 		self.last_player_pos_x, self.last_player_pos_y = pos  # Set to enemy's initial position, or 0,0
 
+	def on_release(self):
+		# Back in the pool: drop the level's tiles, layout, player and services until reset hands in the next ones
+		self.cancel_timers()
+		self.obstacle_sprites = self.dungeon_layout = self.dungeon_graph = None
+		self.player = self.field_of_view = self.path_service = self.regions = None
+		self.current_path = []
+
 	def import_graphics(self, name):
 		self.animations = {'walk': [], 'waiting' : [], 'hurt': [], 'attack': [], 'death': [], 'idle': [], 'retreat': [], 'final_death' : []}  # Actions
 		
@@ -141,13 +167,8 @@ class Enemy(Entity):
 		for action in self.animations.keys():
 			try:
 				num_frames = self.enemy_frame_data[name.split('/')[0]][action]
-				action_sprite_sheet = pygame.image.load(f'graphics/_Crypt/Characters/{name}/{action}.png').convert_alpha()
-
-				for i in range(num_frames):
-					x = i * frame_width
-					y = 0
-					frame = self.get_image(action_sprite_sheet, x, y, frame_width, frame_height)
-					self.animations[action].append(frame)
+				# frames are shared between every enemy of the same kind
+				self.animations[action] = load_frames(f'graphics/_Crypt/Characters/{name}/{action}.png', (frame_width, frame_height), num_frames)
 			except KeyError:
 				# This action does not exist for this enemy type, so we skip it
 				pass
@@ -159,7 +180,7 @@ class Enemy(Entity):
 		return image
 	
 	def animate(self):
-		now = pygame.time.get_ticks()
+		now = get_ticks()
 		action = self.status
 
 		if action == 'final_death':
@@ -171,7 +192,7 @@ class Enemy(Entity):
 				self.frame_index = (self.frame_index + 1) % len(self.animations[action])
 				self.image = self.animations[action][self.frame_index]
 				if not self.facing_right:
-					self.image = pygame.transform.flip(self.image, True, False)
+					self.image = flipped(self.image)
      
 				if action == 'hurt' and self.frame_index == len(self.animations['hurt']) - 1:
 					self.status = 'idle'
@@ -187,8 +208,6 @@ class Enemy(Entity):
 					self.is_pursuing = False
 					
 	def get_damage(self, player, attack_type):
-		current_time = pygame.time.get_ticks()
-		
 		# Check if the enemy is a worm and if its status is 'waiting'
 		if self.monster_type in ['Worm', 'BigWorm'] and (self.status == 'waiting' or self.status == 'death' or (self.status == 'attack' and self.frame_index <= 14) or (self.status == 'retreat' and self.frame_index >= 14)):
 			# If the status is 'waiting', do not proceed with taking damage
@@ -201,31 +220,27 @@ class Enemy(Entity):
 			else:
 				pass # magic damage later
 			
-			self.hit_time = current_time
 			self.vulnerable = False
+			self.start_timer('vulnerable_again', self.invincibility_duration, self.vulnerable_again)
 			
 			if self.health <= 0:
+				play_sound('audio/death.wav', SOUND_PRIORITY_HIGH)
 				self.status = 'death'
 				self.frame_index = 0
 				self.final_death_image = self.animations['final_death'][0]
 				self.direction = pygame.math.Vector2()
 				if not self.facing_right:
-					self.final_death_image = pygame.transform.flip(self.final_death_image, True, False)
+					self.final_death_image = flipped(self.final_death_image)
 
 			else:
+				play_sound('audio/hit.wav')
 				self.status = 'hurt'
 				self.vulnerable = False
 				self.frame_index = 0
 				
-	def cooldowns(self):
-		current_time = pygame.time.get_ticks()
-		if not self.can_attack:
-			if current_time - self.attack_time >= self.attack_cooldown:
-				self.can_attack = True
-				
-		if not self.vulnerable:
-			if current_time - self.hit_time >= self.invincibility_duration:
-				self.vulnerable = True
+	def vulnerable_again(self):
+		# 'vulnerable_again' timer, started by get_damage
+		self.vulnerable = True
 	 
 	def check_death(self):
 		if self.health <= 0 and self.status != 'final_death':
@@ -251,6 +266,7 @@ class Enemy(Entity):
 			if self.status == 'waiting' and distance <= self.attack_radius:
 				self.status = 'attack'
 				self.frame_index = 0  # Reset frame index when starting attack
+				play_sound(self.attack_sound)
 
 			elif self.status == 'attack':
 				if self.frame_index == len(self.animations['attack']) - 1:
@@ -276,10 +292,12 @@ class Enemy(Entity):
 			if self.status == 'hurt':
 				return
 			if distance <= self.attack_radius and self.can_attack:
+				if self.status != 'attack':
+					play_sound(self.attack_sound)
 				self.status = 'attack'
 				self.is_wandering = False
 				self.is_pursuing = True
-			elif distance <= self.notice_radius:
+			elif distance <= self.notice_radius and (self.is_pursuing or self.can_see_player(player)):
 				self.status = 'walk'
 				self.is_wandering = False
 				self.is_pursuing = True
@@ -292,6 +310,14 @@ class Enemy(Entity):
 				self.is_wandering = True
 				self.is_pursuing = False
 
+	def can_see_player(self, player):
+		# walls block noticing the player; once pursuing, the enemy keeps track by distance
+		if not ENEMY_REQUIRES_SIGHT or self.field_of_view is None:
+			return True
+		own_tile = (self.rect.centerx // TILESIZE, self.rect.centery // TILESIZE)
+		player_tile = (player.rect.centerx // TILESIZE, player.rect.centery // TILESIZE)
+		return self.field_of_view.can_see(own_tile, player_tile, self.sight_radius)
+
 	def actions(self, player):
 		if self.status in ['death', 'final_death']:
 			return
@@ -318,38 +344,40 @@ class Enemy(Entity):
 			self.direction = direction
 
 	def update_player_info(self, player):
-		self.player_direction = self.get_player_distance_direction(player)[1]
-		self.player_distance = self.get_player_distance_direction(player)[0]
+		self.player_distance, self.player_direction = self.get_player_distance_direction(player)
 
-	def draw_hitbox(self, surface, hitbox_pos, color=(255, 0, 0), width=2):
-		# Draw a rectangle around the hitbox for debugging
-		pygame.draw.rect(surface, color, (hitbox_pos, self.hitbox.size), width)
+	def draw_hitbox(self, surface, hitbox_pos, size=None, color=(255, 0, 0), width=2):
+		# Draw a rectangle around the hitbox for debugging, size is the hitbox's on screen when zoomed
+		pygame.draw.rect(surface, color, (hitbox_pos, size or self.hitbox.size), width)
 
 	def randomize_movement(self):
-		current_time = pygame.time.get_ticks()
+		# Called every tick while wandering, switch_wander_phase starts and stops the moves
+		if self.is_moving:
+			self.status = 'walk'  # Continue the walking animation
 
-		# If currently moving, check if it's time to stop.
+	def switch_wander_phase(self):
+		# 'wander_phase' timer: the move or pause is over, start the other one
+		self.is_moving = not self.is_moving
 		if self.is_moving:
-			if current_time - self.move_timer > self.random_move_duration:
-				self.is_moving = False
-				self.status = 'idle'  # Stop the walking animation
-				self.direction = pygame.math.Vector2()  # Stop moving
-				self.pause_timer = current_time
-				self.random_pause_duration = random.randint(1000, 3000)  # Set pause duration
+			self.random_move_duration = random.randint(1000, 3000)  # Set move duration
+			# Choose a random direction
+			dx, dy = random.choice([-1, 0, 1]), random.choice([-1, 0, 1])
+			if dx != 0 or dy != 0:  # Ensure it's not a zero vector
+				self.wander_direction = pygame.math.Vector2(dx, dy).normalize()
 			else:
-				self.status = 'walk'  # Continue the walking animation
-		# If not currently moving, check if it's time to start.
+				self.wander_direction = pygame.math.Vector2(dx, dy)  # Keep as zero vector if both dx and dy are 0
+			self.start_timer('wander_phase', self.random_move_duration, self.switch_wander_phase)
 		else:
-			if current_time - self.pause_timer > self.random_pause_duration:
-				self.is_moving = True
-				self.move_timer = current_time
-				self.random_move_duration = random.randint(1000, 3000)  # Set move duration
-				# Choose a random direction
-				dx, dy = random.choice([-1, 0, 1]), random.choice([-1, 0, 1])
-				if dx != 0 or dy != 0:  # Ensure it's not a zero vector
-					self.direction = pygame.math.Vector2(dx, dy).normalize()
-				else:
-					self.direction = pygame.math.Vector2(dx, dy)  # Keep as zero vector if both dx and dy are 0
+			self.random_pause_duration = random.randint(1000, 3000)  # Set pause duration
+			self.start_timer('wander_phase', self.random_pause_duration, self.switch_wander_phase)
+
+		# only an enemy that is wandering right now turns or stops, hurt, attacking and dying ones carry on
+		if self.is_wandering and self.status not in ('death', 'final_death', 'attack', 'hurt'):
+			if self.is_moving:
+				self.direction = pygame.math.Vector2(self.wander_direction)
+			else:
+				self.status = 'idle'  # Stop the walking animation
+				self.direction = pygame.math.Vector2()  # Stop moving
 
 	def check_collision(self, dx, dy):
 		# Adjust the enemy's position if a collision is detected
@@ -367,13 +395,35 @@ class Enemy(Entity):
 		grid_start = (self.rect.centerx // TILESIZE, self.rect.centery // TILESIZE)
 		grid_end = (target.rect.centerx // TILESIZE, target.rect.centery // TILESIZE)
 
+		if self.regions is not None and not self.regions.connected(grid_start, grid_end):
+			# no path can exist, don't search for one or keep a stale one in flight
+			self.current_path = []
+			if self.path_service is not None:
+				self.path_service.forget(self.id)
+			return
+
+		if self.path_service is not None:
+			# keep the current path until the worker answers, see apply_path_result
+			self.path_service.request(self.id, grid_start, grid_end)
+			return
+
+		nx = lazy_import('networkx')
+		if self.dungeon_graph is None:
+			self.dungeon_graph = create_graph_from_layout(self.dungeon_layout)
+
 		try:
 			# Use NetworkX A* algorithm
 			raw_path = nx.astar_path(self.dungeon_graph, grid_start, grid_end, heuristic=manhattan_distance)
 			self.current_path = self.smooth_path(raw_path)
-		except nx.NetworkXNoPath:
+		except (nx.NetworkXNoPath, nx.NodeNotFound):
 			self.current_path = []  # No path found
 
+	def apply_path_result(self):
+		if self.path_service is not None:
+			raw_path = self.path_service.poll(self.id)
+			if raw_path is not None:
+				self.current_path = self.smooth_path(raw_path) if raw_path else []
+
 	def should_update_path(self, player):
 		# Define conditions for updating the path
 		player_pos = (player.rect.centerx // TILESIZE, player.rect.centery // TILESIZE)
@@ -523,15 +573,15 @@ class Enemy(Entity):
 
 		self.update_player_info(self.player)
 		self.actions(self.player)
+		self.apply_path_result()
 		
-		current_time = pygame.time.get_ticks()
+		current_time = get_ticks()
 		if self.is_pursuing:
 			if current_time - self.last_path_update_time > self.path_update_interval or self.should_update_path(self.player):
 				self.calculate_path(self.player)
 				self.last_path_update_time = current_time
 	
 		self.execute_movement()		
-		self.cooldowns()
 		self.check_death()
 		self.animate()
 		
@@ -1,5 +1,6 @@
 import pygame
 from settings import *
+from timestep import sim_clock
 
 
 class Entity(pygame.sprite.Sprite):
@@ -8,7 +9,29 @@ class Entity(pygame.sprite.Sprite):
 		self.frame_index = 0
 		self.animation_speed = ANIMATION_SPEED
 		self.direction = pygame.math.Vector2()
-		
+
+		# position at the start of the current simulation tick, for render interpolation
+		self.previous_topleft = None
+		self.timers = {}  # name -> timer on sim_clock
+
+	def start_timer(self, name, ms, callback):
+		# One timer per name, starting it again replaces the pending one
+		self.cancel_timer(name)
+		self.timers[name] = sim_clock.after(ms, callback)
+
+	def cancel_timer(self, name):
+		timer = self.timers.pop(name, None)
+		if timer is not None:
+			sim_clock.cancel(timer)
+
+	def cancel_timers(self):
+		for timer in self.timers.values():
+			sim_clock.cancel(timer)
+		self.timers.clear()
+
+	def store_previous_position(self):
+		self.previous_topleft = self.rect.topleft
+
 	def move(self,speed):
 		if self.direction.magnitude() != 0:
 			self.direction = self.direction.normalize()
@@ -0,0 +1,127 @@
+import pygame
+from settings import *
+
+# Octant transforms for recursive shadowcasting
+OCTANTS = [
+	(1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+	(-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1),
+]
+
+
+class FieldOfView:
+	"""
+	Recursive shadowcasting over the dungeon layout, 'x' tiles block sight.
+	Results are memoized per (tile, radius), so every viewer standing on the
+	same tile of a room shares one visibility set.
+	"""
+
+	def __init__(self, dungeon_layout):
+		self.dungeon_layout = dungeon_layout
+		self.cache = {}
+
+	def invalidate(self):
+		# Call after walls or doors in the layout change
+		self.cache.clear()
+
+	def in_bounds(self, x, y):
+		return 0 <= y < len(self.dungeon_layout) and 0 <= x < len(self.dungeon_layout[0])
+
+	def blocks_sight(self, x, y):
+		return not self.in_bounds(x, y) or self.dungeon_layout[y][x] == 'x'
+
+	def compute(self, origin, radius):
+		key = (origin, radius)
+		visible = self.cache.get(key)
+		if visible is None:
+			if len(self.cache) >= FOV_CACHE_SIZE:
+				self.cache.clear()
+			found = {origin}
+			for xx, xy, yx, yy in OCTANTS:
+				self.cast_light(origin, 1, 1.0, 0.0, radius, xx, xy, yx, yy, found)
+			visible = self.cache[key] = frozenset(found)
+		return visible
+
+	def cast_light(self, origin, row, start, end, radius, xx, xy, yx, yy, found):
+		if start < end:
+			return
+		cx, cy = origin
+		radius_sq = radius * radius
+		new_start = start
+		for distance in range(row, radius + 1):
+			dx, dy = -distance - 1, -distance
+			blocked = False
+			while dx <= 0:
+				dx += 1
+				x, y = cx + dx * xx + dy * xy, cy + dx * yx + dy * yy
+				left_slope, right_slope = (dx - 0.5) / (dy + 0.5), (dx + 0.5) / (dy - 0.5)
+				if start < right_slope:
+					continue
+				if end > left_slope:
+					break
+
+				if dx * dx + dy * dy < radius_sq and self.in_bounds(x, y):
+					found.add((x, y))
+
+				if blocked:
+					if self.blocks_sight(x, y):
+						new_start = right_slope
+					else:
+						blocked = False
+						start = new_start
+				elif self.blocks_sight(x, y) and distance < radius:
+					# Wall starts a shadow, scan the lit part beyond it first
+					blocked = True
+					self.cast_light(origin, distance + 1, start, left_slope, radius, xx, xy, yx, yy, found)
+					new_start = right_slope
+			if blocked:
+				break
+
+	def can_see(self, origin, target, radius):
+		return target in self.compute(origin, radius)
+
+
+class FogOfWar:
+	"""
+	Tile resolution fog: black where never seen, dimmed where seen before and
+	clear where currently visible. Only rescaled when the visible set or the
+	camera's tile changes.
+	"""
+
+	def __init__(self, map_width=MAP_WIDTH, map_height=MAP_HEIGHT):
+		self.display_surface = pygame.display.get_surface()
+		# pad by a screen at the widest zoom so the camera window never leaves the surface
+		self.pad_x = int(self.display_surface.get_width() / (TILESIZE * min(ZOOM_LEVELS))) + 2
+		self.pad_y = int(self.display_surface.get_height() / (TILESIZE * min(ZOOM_LEVELS))) + 2
+		self.fog_surface = pygame.Surface((map_width + self.pad_x * 2, map_height + self.pad_y * 2), pygame.SRCALPHA)
+		self.fog_surface.fill((0, 0, 0, 255))
+		self.visible = frozenset()
+		self.version = 0
+		self.scaled = None
+		self.scaled_key = None
+
+	def reveal(self, visible):
+		for x, y in self.visible - visible:
+			self.fog_surface.set_at((x + self.pad_x, y + self.pad_y), (0, 0, 0, FOG_SEEN_ALPHA))
+		for x, y in visible - self.visible:
+			self.fog_surface.set_at((x + self.pad_x, y + self.pad_y), (0, 0, 0, 0))
+		self.visible = visible
+		self.version += 1
+
+	def draw(self, offset, surface=None, scale=1):
+		# surface and scale are the camera's view, see YSortCameraGroup.set_view
+		surface = surface or self.display_surface
+		tile_size = TILESIZE * scale
+		offset_x, offset_y = int(offset.x * scale), int(offset.y * scale)
+		col, row = int(offset.x) // TILESIZE, int(offset.y) // TILESIZE
+		cols = int(surface.get_width() / tile_size) + 2
+		rows = int(surface.get_height() / tile_size) + 2
+
+		key = (col, row, cols, rows, scale, self.version)
+		if key != self.scaled_key:
+			left = min(max(col + self.pad_x, 0), self.fog_surface.get_width() - cols)
+			top = min(max(row + self.pad_y, 0), self.fog_surface.get_height() - rows)
+			window = self.fog_surface.subsurface((left, top, cols, rows))
+			self.scaled = pygame.transform.smoothscale(window, (round(cols * tile_size), round(rows * tile_size)))
+			self.scaled_key = key
+
+		surface.blit(self.scaled, (round(col * tile_size) - offset_x, round(row * tile_size) - offset_y))
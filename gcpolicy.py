@@ -0,0 +1,72 @@
+"""
+Keeps Python's garbage collector out of the frame loop. In 'frozen' mode
+everything alive once a level is built (tiles, sprites, layouts, caches)
+is moved out of the collector's sight with gc.freeze(), so the
+collections that still happen only walk what the frame loop allocates.
+During play the thresholds are raised to GC_THRESHOLDS; full collections
+are left to safe points such as level loads, where a pause can't be seen.
+Every collection's pause is timed through gc.callbacks and charged to the
+frame it happened in, see the gc_ms column of the frame telemetry.
+
+	python main.py --gc default --telemetry before.npy
+	python main.py --gc frozen --telemetry after.npy
+"""
+import gc
+import time
+from settings import *
+import telemetry
+
+
+class GarbageCollection:
+	def __init__(self, mode=GC_MODE):
+		self.mode = mode
+		self.default_thresholds = gc.get_threshold()
+		self.started = None
+		self.pauses = [0, 0, 0]  # collections per generation
+		self.pause_ms = 0.0
+		self.longest_ms = 0.0
+		gc.callbacks.append(self.on_collection)
+
+	def on_collection(self, phase, info):
+		if phase == 'start':
+			self.started = time.perf_counter()
+			return
+		if self.started is None:
+			return
+		seconds = time.perf_counter() - self.started
+		self.started = None
+		self.pauses[info['generation']] += 1
+		self.pause_ms += seconds * 1000
+		self.longest_ms = max(self.longest_ms, seconds * 1000)
+		if telemetry.frame_telemetry is not None:
+			telemetry.frame_telemetry.add_collection(seconds, info['collected'])
+
+	def before_level(self):
+		# Safe point: the last level's objects become collectable again and go now, not mid-play
+		if self.mode != 'frozen':
+			return
+		gc.unfreeze()
+		gc.set_threshold(*self.default_thresholds)
+		self.safe_point('level unload')
+
+	def level_ready(self):
+		# Safe point: generation garbage goes, what is left lives as long as the level
+		if self.mode != 'frozen':
+			return
+		self.safe_point('level load')
+		gc.freeze()
+		gc.set_threshold(*GC_THRESHOLDS)
+		print(f'GC: froze {gc.get_freeze_count()} objects, thresholds {GC_THRESHOLDS}')
+
+	def safe_point(self, reason):
+		start = time.perf_counter()
+		collected = gc.collect()
+		print(f'GC: {reason}, collected {collected} objects in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+	def print_stats(self):
+		print(f'GC: {sum(self.pauses)} collections (gen0 {self.pauses[0]}, gen1 {self.pauses[1]}, gen2 {self.pauses[2]}), '
+			  f'{self.pause_ms:.1f} ms in total, longest {self.longest_ms:.2f} ms, mode {self.mode}')
+
+	def close(self):
+		if self.on_collection in gc.callbacks:
+			gc.callbacks.remove(self.on_collection)
@@ -0,0 +1,75 @@
+"""
+Keeps the frame rate by trading quality. Game.run hands every frame's work
+time (pygame's raw frame time, the wait for the next frame left out) to
+QualityGovernor.frame(); when the rolling average runs over the frame
+budget the governor steps one tier down QUALITY_TIERS, and once there has
+been plenty of headroom for a while it steps one back up. The two
+thresholds, the hold after each change and the longer wait before going up
+keep it from flapping between tiers; a step up that has to be taken back
+soon after doubles that wait. Level.set_quality passes the tier on.
+
+	python main.py --quality low      # pin a tier, no governor
+"""
+from collections import deque
+from settings import *
+
+
+class QualityGovernor:
+	def __init__(self, level, tier=0, adaptive=True, tiers=QUALITY_TIERS, fps=FPS):
+		self.level = level
+		self.tiers = tiers
+		self.tier = tier
+		self.adaptive = adaptive
+		self.budget = 1000 / fps
+		self.frames = deque(maxlen=GOVERNOR_WINDOW)  # work ms of the latest frames
+		self.hold = GOVERNOR_HOLD_FRAMES
+		self.headroom_frames = 0
+		self.up_frames = GOVERNOR_UP_FRAMES  # headroom needed before stepping up
+		self.frame_count = 0
+		self.raised_at = None  # frame_count of the last step up
+		self.changes = 0
+		level.set_quality(tiers[tier])
+
+	def frame(self, work_ms):
+		if not self.adaptive:
+			return
+		self.frames.append(work_ms)
+		self.frame_count += 1
+		if self.hold:
+			self.hold -= 1
+			return
+		if len(self.frames) < self.frames.maxlen:
+			return
+
+		average = sum(self.frames) / len(self.frames)
+		if average > self.budget * GOVERNOR_DOWN:
+			self.headroom_frames = 0
+			if self.tier < len(self.tiers) - 1:
+				self.change(self.tier + 1, average)
+		elif average < self.budget * GOVERNOR_UP:
+			self.headroom_frames += 1
+			if self.headroom_frames >= self.up_frames and self.tier > 0:
+				self.change(self.tier - 1, average)
+		else:
+			self.headroom_frames = 0
+
+	def change(self, tier, average):
+		ordered = sorted(self.frames)
+		p95 = ordered[int(len(ordered) * 0.95)]
+		reason = 'over budget' if tier > self.tier else f'headroom for {self.headroom_frames} frames'
+		held = ', simulation intervals held for the recording' if self.level.deterministic else ''
+		print(f'Quality: {self.tiers[self.tier]["name"]} -> {self.tiers[tier]["name"]} ({reason}), '
+			  f'frame work mean {average:.1f} ms, p95 {p95:.1f} ms, worst {ordered[-1]:.1f} ms over {len(ordered)} frames, '
+			  f'budget {self.budget:.1f} ms{held}')
+		if tier < self.tier:
+			self.raised_at = self.frame_count
+		elif self.raised_at is not None and self.frame_count - self.raised_at < self.up_frames * 2:
+			self.up_frames *= 2
+			print(f'Quality: the step up did not hold, waiting {self.up_frames} frames of headroom before the next one')
+		self.tier = tier
+		self.changes += 1
+		self.level.set_quality(self.tiers[tier])
+		# the old tier's frames say nothing about the new one
+		self.frames.clear()
+		self.hold = GOVERNOR_HOLD_FRAMES
+		self.headroom_frames = 0
@@ -0,0 +1,251 @@
+import heapq
+
+# Kept free of pygame and settings, like pathfinding.py, which builds this in its workers.
+
+
+def label_clusters(grid, rooms, chunk_size):
+	"""
+	Splits the walkable (' ') tiles into clusters: a tile belongs to the
+	first room rect (x, y, width, height) that covers it, cluster ids follow
+	the rooms' order; the remaining corridor tiles become one cluster per
+	connected piece of each chunk_size square. Returns the row-major cluster
+	of every tile, -1 where it is not walkable, and the number of clusters.
+	"""
+	height, width = len(grid), len(grid[0])
+	clusters = [-1] * (width * height)
+	# rooms first, in generation order, so overlapping rooms keep the first one's tiles
+	for index, (room_x, room_y, room_width, room_height) in enumerate(rooms):
+		for y in range(max(room_y, 0), min(room_y + room_height, height)):
+			for x in range(max(room_x, 0), min(room_x + room_width, width)):
+				if grid[y][x] == ' ' and clusters[y * width + x] < 0:
+					clusters[y * width + x] = index
+
+	# then corridors, one cluster per connected piece of each chunk
+	next_cluster = len(rooms)
+	for y in range(height):
+		for x in range(width):
+			if grid[y][x] != ' ' or clusters[y * width + x] >= 0:
+				continue
+			chunk = (x // chunk_size, y // chunk_size)
+			clusters[y * width + x] = next_cluster
+			stack = [(x, y)]
+			while stack:
+				cx, cy = stack.pop()
+				for nx, ny in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)):
+					if 0 <= nx < width and 0 <= ny < height and clusters[ny * width + nx] < 0 and grid[ny][nx] == ' ' and (nx // chunk_size, ny // chunk_size) == chunk:
+						clusters[ny * width + nx] = next_cluster
+						stack.append((nx, ny))
+			next_cluster += 1
+	return clusters, next_cluster
+
+
+def touching_clusters(clusters, width, height):
+	# cluster -> the clusters it shares an edge with
+	neighbours = {}
+	for y in range(height):
+		for x in range(width):
+			a = clusters[y * width + x]
+			if a < 0:
+				continue
+			for b in (clusters[y * width + x + 1] if x + 1 < width else -1, clusters[(y + 1) * width + x] if y + 1 < height else -1):
+				if b >= 0 and b != a:
+					neighbours.setdefault(a, set()).add(b)
+					neighbours.setdefault(b, set()).add(a)
+	return neighbours
+
+
+class PortalGraph:
+	"""
+	Hierarchical path finding (HPA*) over the generator's own structure.
+	Every walkable tile belongs to one cluster: the first room that covers
+	it, or else a piece of corridor cut at chunk_size tile boundaries so no
+	cluster grows with the map. Wherever two clusters touch there is a
+	portal, a pair of tiles one step apart in the middle of the shared
+	edge. Portal to portal costs inside each cluster are worked out once,
+	so a query only searches the start and goal clusters, then an abstract
+	graph of portals, and then turns the first legs of that route back into
+	tiles. The enemy asks again when it reaches the end of them. Short
+	queries skip the portals, which would bend the path through the middle
+	of the shared edge, and search the tiles directly.
+	"""
+
+	def __init__(self, grid, rooms, chunk_size, refine_tiles):
+		self.grid = grid
+		self.height, self.width = len(grid), len(grid[0])
+		self.refine_tiles = refine_tiles
+		self.clusters, self.cluster_count = label_clusters(grid, rooms, chunk_size)  # row-major, -1 is not walkable
+		self.neighbours = touching_clusters(self.clusters, self.width, self.height)
+		self.portals = {}  # cluster -> portal tiles in it
+		self.edges = {}  # portal tile -> [(portal tile, cost)]
+		self.find_portals()
+		self.connect_portals()
+
+	def cluster(self, tile):
+		x, y = tile
+		if 0 <= x < self.width and 0 <= y < self.height:
+			return self.clusters[y * self.width + x]
+		return -1
+
+	def find_portals(self):
+		# Runs of touching tile pairs along one cluster edge, one portal in the middle of each run
+		runs = {}  # (cluster a, cluster b, axis, line) -> positions along the line, ascending
+		width, clusters = self.width, self.clusters
+		for y in range(self.height):
+			for x in range(width):
+				a = clusters[y * width + x]
+				if a < 0:
+					continue
+				if x + 1 < width:
+					b = clusters[y * width + x + 1]
+					if b >= 0 and b != a:
+						runs.setdefault((a, b, 'x', x), []).append(y)
+				if y + 1 < self.height:
+					b = clusters[(y + 1) * width + x]
+					if b >= 0 and b != a:
+						runs.setdefault((a, b, 'y', y), []).append(x)
+
+		for (a, b, axis, line), positions in runs.items():
+			start = 0
+			for index in range(1, len(positions) + 1):
+				if index == len(positions) or positions[index] != positions[index - 1] + 1:
+					middle = positions[(start + index - 1) // 2]
+					if axis == 'x':
+						self.add_portal(a, (line, middle), b, (line + 1, middle))
+					else:
+						self.add_portal(a, (middle, line), b, (middle, line + 1))
+					start = index
+
+	def add_portal(self, cluster_a, tile_a, cluster_b, tile_b):
+		for cluster, tile, other in ((cluster_a, tile_a, tile_b), (cluster_b, tile_b, tile_a)):
+			self.portals.setdefault(cluster, {})[tile] = None  # dict as an ordered set
+			self.edges.setdefault(tile, []).append((other, 1))
+
+	def connect_portals(self):
+		for cluster, tiles in self.portals.items():
+			for tile in tiles:
+				for other, cost in self.distances(tile, cluster, tiles).items():
+					if other != tile:
+						self.edges[tile].append((other, cost))
+
+	def distances(self, start, cluster, targets):
+		# Breadth-first steps from start to each target it can reach without leaving the cluster
+		found = {}
+		remaining = len(targets)
+		seen = {start}
+		frontier = [start]
+		steps = 0
+		while frontier and remaining:
+			next_frontier = []
+			for tile in frontier:
+				if tile in targets:
+					found[tile] = steps
+					remaining -= 1
+				x, y = tile
+				for neighbour in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+					if neighbour not in seen and self.cluster(neighbour) == cluster:
+						seen.add(neighbour)
+						next_frontier.append(neighbour)
+			frontier = next_frontier
+			steps += 1
+		return found
+
+	def cluster_path(self, start, goal, clusters, limit=None):
+		# A* that never leaves the set of clusters (None is any walkable tile), [] when the goal
+		# can't be reached inside them or more than limit tiles are expanded first
+		goal_x, goal_y = goal
+		open_heap = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), 0, start)]
+		came_from = {start: None}
+		cost = {start: 0}
+		expanded = 0
+		while open_heap:
+			_, current_cost, current = heapq.heappop(open_heap)
+			if current == goal:
+				path = []
+				while current is not None:
+					path.append(current)
+					current = came_from[current]
+				path.reverse()
+				return path
+			if current_cost > cost[current]:
+				continue
+			expanded += 1
+			if limit is not None and expanded > limit:
+				return []
+			x, y = current
+			for neighbour in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+				new_cost = current_cost + 1
+				cluster = self.cluster(neighbour)
+				if cluster >= 0 and (clusters is None or cluster in clusters) and new_cost < cost.get(neighbour, new_cost + 1):
+					cost[neighbour] = new_cost
+					came_from[neighbour] = current
+					heapq.heappush(open_heap, (new_cost + abs(neighbour[0] - goal_x) + abs(neighbour[1] - goal_y), new_cost, neighbour))
+		return []
+
+	def abstract_route(self, start, goal, start_costs, goal_costs):
+		# A* over the portals, start and goal joined to their clusters' portals for this query only
+		goal_x, goal_y = goal
+		open_heap = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), 0, start)]
+		came_from = {start: None}
+		cost = {start: 0}
+		while open_heap:
+			_, current_cost, current = heapq.heappop(open_heap)
+			if current == goal:
+				route = []
+				while current is not None:
+					route.append(current)
+					current = came_from[current]
+				route.reverse()
+				return route
+			if current_cost > cost[current]:
+				continue
+			links = [*start_costs.items(), *self.edges.get(start, ())] if current == start else self.edges.get(current, ())
+			if current in goal_costs:
+				links = [*links, (goal, goal_costs[current])]
+			for neighbour, step in links:
+				new_cost = current_cost + step
+				if new_cost < cost.get(neighbour, new_cost + 1):
+					cost[neighbour] = new_cost
+					came_from[neighbour] = current
+					heapq.heappush(open_heap, (new_cost + abs(neighbour[0] - goal_x) + abs(neighbour[1] - goal_y), new_cost, neighbour))
+		return []
+
+	def refine(self, route, refine_tiles):
+		# Tiles for the route's first legs, until the path is refine_tiles long; None refines it all
+		path = [route[0]]
+		for a, b in zip(route, route[1:]):
+			if self.cluster(a) != self.cluster(b):
+				path.append(b)  # portal crossing, the tiles are neighbours
+			else:
+				path.extend(self.cluster_path(a, b, (self.cluster(a),))[1:])
+			if refine_tiles is not None and len(path) >= refine_tiles:
+				break
+		return path
+
+	def find_path(self, start, goal, whole=False):
+		# Tiles from start towards goal, [] when there is no path; whole=False stops after refine_tiles
+		refine_tiles = None if whole else self.refine_tiles
+		start_cluster, goal_cluster = self.cluster(start), self.cluster(goal)
+		if start_cluster < 0 or goal_cluster < 0:
+			return []
+		if abs(start[0] - goal[0]) + abs(start[1] - goal[1]) <= self.refine_tiles:
+			# close by: plain A* over the tiles, given up if the way round turns out long
+			path = self.cluster_path(start, goal, None, self.refine_tiles * self.refine_tiles)
+			if path:
+				return path
+		if start_cluster == goal_cluster:
+			path = self.cluster_path(start, goal, (start_cluster,))
+			if path:
+				return path
+		elif goal_cluster in self.neighbours.get(start_cluster, ()):
+			# neighbouring clusters: search both, the portal between them may be far off the way
+			path = self.cluster_path(start, goal, (start_cluster, goal_cluster))
+			if path:
+				return path
+
+		start_costs = self.distances(start, start_cluster, self.portals.get(start_cluster, {}))
+		goal_costs = self.distances(goal, goal_cluster, self.portals.get(goal_cluster, {}))
+		route = self.abstract_route(start, goal, start_costs, goal_costs)
+		return self.refine(route, refine_tiles) if route else []
+
+	def portal_count(self):
+		return len(self.edges)
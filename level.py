@@ -8,146 +8,48 @@ import random
 from weapon import Weapon
 from ui import UI
 from enemy import Enemy
-import numpy as np
-from scipy.spatial import Delaunay
-import networkx as nx
-
-def create_delaunay_triangulation(rooms):
-	points = np.array([(room.rect.centerx, room.rect.centery) for room in rooms])
-	return Delaunay(points)
-
-def create_mst(triangles):
-	edges = set()
-	for simplex in triangles.simplices:
-		edges.add((simplex[0], simplex[1]))
-		edges.add((simplex[1], simplex[2]))
-		edges.add((simplex[2], simplex[0]))
-
-	G = nx.Graph(list(edges))
-	return nx.minimum_spanning_tree(G)
-
-def add_extra_edges_to_mst(mst, delaunay_tri, percentage=0.05):
-	# Extract edges from Delaunay triangulation
-	delaunay_edges = set()
-	for simplex in delaunay_tri.simplices:
-		delaunay_edges.add((simplex[0], simplex[1]))
-		delaunay_edges.add((simplex[1], simplex[2]))
-		delaunay_edges.add((simplex[0], simplex[2]))
-
-	# Calculate additional edges not in the MST
-	additional_edges = delaunay_edges - set(mst.edges)
-	extra_edges = random.sample(additional_edges, k=int(len(additional_edges) * percentage))
-	mst.add_edges_from(extra_edges)
-
-def get_room_center(room):
-	return (room.x + room.width // 2, room.y + room.height // 2)
-
-def connect_rooms_with_corridor(dungeon_layout, room1, room2):
-	x1, y1 = get_room_center(room1)
-	x2, y2 = get_room_center(room2)
-
-	# Horizontal corridor
-	for x in range(min(x1, x2), max(x1, x2) + 1):
-		for i in range(0, CORRIDOR_WIDTH):
-			dungeon_layout[y1 + i][x] = ' '
-
-	# Vertical corridor
-	for y in range(min(y1, y2), max(y1, y2) + 1):
-		for i in range(0, CORRIDOR_WIDTH):
-			dungeon_layout[y][x2 + i] = ' '
-
-def build_corridors_from_mst(mst, dungeon_layout, rooms):
-	for edge in mst.edges():
-		room1 = rooms[edge[0]]
-		room2 = rooms[edge[1]]
-		connect_rooms_with_corridor(dungeon_layout, room1, room2)
-
-class Cell:
-	def __init__(self, x, y, width, height):
-		self.rect = pygame.Rect(x, y, width, height)
-
-def generate_cells(number_of_cells, map_width, map_height, buffer=SAFETY_MARGIN):
-	cells = []
-	for _ in range(number_of_cells):
-		width = int(np.random.normal(loc=10, scale=3))
-		height = int(np.random.normal(loc=10, scale=3))
-		# Ensure cells are within bounds considering their dimensions
-		x = np.random.randint(buffer, map_width - width - buffer)
-		y = np.random.randint(buffer, map_height - height - buffer)
-		cells.append(Cell(x, y, width, height))
-	return cells
-
-def separate_cells(cells, max_iterations=10000):
-	moved = True
-	iteration_count = 0
-
-	while moved and iteration_count < max_iterations:
-		moved = False
-		for i, cell_a in enumerate(cells):
-			for cell_b in cells[i+1:]:
-				if cell_a.rect.colliderect(cell_b.rect):
-					moved = True
-					# Calculate overlap
-					dx = min(cell_a.rect.right - cell_b.rect.left, cell_b.rect.right - cell_a.rect.left)
-					dy = min(cell_a.rect.bottom - cell_b.rect.top, cell_b.rect.bottom - cell_a.rect.top)
-
-					# Determine push direction
-					if dx < dy:
-						push_x = dx / 2
-						cell_a.rect.x -= push_x
-						cell_b.rect.x += push_x
-					else:
-						push_y = dy / 2
-						cell_a.rect.y -= push_y
-						cell_b.rect.y += push_y
-
-		iteration_count += 1
-
-	if iteration_count >= max_iterations:
-		print("Warning: separate_cells reached maximum iterations")
-
-def select_rooms(cells, min_size, map_width, map_height, buffer=SAFETY_MARGIN):
-	return [Room(cell.rect.x, cell.rect.y, cell.rect.width, cell.rect.height)
-			for cell in cells
-			if cell.rect.width > min_size and cell.rect.height > min_size
-			and cell.rect.right < map_width - buffer  # Adjusted
-			and cell.rect.bottom < map_height - buffer]  # Adjusted
-
-
-class Room:
-	def __init__(self, x, y, width, height):
-		# Initialize the room based on its top-left corner, width, and height
-		self.x = x
-		self.y = y
-		self.width = width
-		self.height = height
-		# Create a pygame.Rect object for the room
-		self.rect = pygame.Rect(x, y, width, height)
-		
-	def create_room(self, dungeon_layout):
-		for x in range(self.x, self.x + self.width):
-			for y in range(self.y, self.y + self.height):
-				# Check bounds before accessing the dungeon layout
-				if 0 <= x < len(dungeon_layout[0]) and 0 <= y < len(dungeon_layout):
-					if dungeon_layout[y][x] != ' ':  # Avoid overwriting corridors
-						dungeon_layout[y][x] = ' '
-
-class Level:
+from spatial import SpatialHash
+from timestep import sim_clock, get_ticks
+from fov import FieldOfView, FogOfWar
+from audio import play_sound, new_audio_tick
+from pathfinding import PathService
+from hpa import label_clusters, touching_clusters
+from particles import init_particles
+from scaling import ChunkCache, scaled_frame
+from pool import SpritePool
+from pipeline import StagedPipeline
+from dungeon import DungeonLayout
+from telemetry import mark, count_tick
+import time
+from bisect import bisect_left, bisect_right
+
+# shared by every level, so a new level reuses the sprites the last one released
+weapon_pool = SpritePool('weapon', lambda groups, player: Weapon(player, groups))
+enemy_pool = SpritePool('enemy', lambda groups, monster_name, pos, *args: Enemy(monster_name, pos, groups, *args))
+
+class Level(DungeonLayout):
 	enemy_types = ['S', 'W', 'K', 'B']  # Different types of enemies
+	enemy_names = {'S': 'Spider/1', 'W': 'Worm/1', 'K': 'Skeleton/1', 'B': 'Worm/2'}
 	
-	def __init__(self):
+	def __init__(self, seed=None, deterministic=False, map_width=MAP_WIDTH, map_height=MAP_HEIGHT, cell_count=CELL_COUNT, enemy_count=None, enemy_mix=None, build=True):
 
 		# get the display surface 
 		self.display_surface = pygame.display.get_surface()
+		self.deterministic = deterministic
 
-		# Initialize the dungeon map as an instance attribute
-		self.dungeon_layout = [['x' for _ in range(MAP_WIDTH)] for _ in range(MAP_HEIGHT)]
+		# seed, layouts and rooms
+		super().__init__(seed, map_width, map_height, cell_count)
 
-		# Initialize object, enemy, and player layout
-		self.object_layout = [[' ' for _ in range(MAP_WIDTH)] for _ in range(MAP_HEIGHT)]
+		# population, only stress scenarios change the defaults;
+		# enemy_count None keeps the usual 1-2 per room up to MAX_ENEMIES,
+		# enemy_mix maps enemy_types letters to relative weights
+		self.enemy_count = enemy_count
+		self.enemy_mix = enemy_mix
 
 		# sprite group setup
 		self.visible_sprites = YSortCameraGroup()
+		self.render_scale = RENDER_SCALE  # before the quality tier's share
+		self.quality = QUALITY_TIERS[0]
 		self.obstacle_sprites = pygame.sprite.Group()
 		
 		# Load tilesheets
@@ -157,30 +59,54 @@ class Level:
 		Tile.load_tilesheet('corner', 'graphics/_Crypt/Tilesets/wall-1.png')
 		Tile.load_tilesheet('doors', 'graphics/_Crypt/Props/animated/doors/doors-metal-door frame 1-opening.png')
 
-		# list of rooms
-		self.rooms = []
-  
-		self.starting_room = None
-
 		# attack sprites
 		self.current_attack = None
 		self.attack_sprites = pygame.sprite.Group()
 		self.attackable_sprites = pygame.sprite.Group()
 
-		# graph of rooms
+		# tile -> area lookup (rooms, then corridor pieces), which areas touch and their bounds in pixels, see index_rooms
+		self.room_index = []
 		self.room_graph = {}
+		self.area_rects = {}
+
+		# enemies sleep with their area unless the player is within WAKE_HOPS areas of it or it could be on screen
+		self.area_enemies = {}  # area -> enemies registered there, a dict as an ordered set
+		self.wake_areas = {}  # area -> areas kept awake while the player is in it
+		self.view_areas = {}  # chunk -> areas kept awake while the player is in it
+		self.awake_areas = frozenset()
+		self.wake_from = None  # (area, chunk) of the player the awake areas were worked out for
+		# the widest view is used whatever the zoom, so a recording plays back the same at any zoom
+		notice_radius = max(monster['notice_radius'] for monster in monster_data.values())
+		self.wake_size = (int(WIDTH / min(ZOOM_LEVELS)) + notice_radius * 2, int(HEIGHT / min(ZOOM_LEVELS)) + notice_radius * 2)
+		self.awake_enemies = pygame.sprite.Group()
 
 		# initialize player
 		self.player = None
   
 		# for debug in main
 		self.enemy_sprites = pygame.sprite.Group()
-  
-  		# sprite setup
-		self.create_map()
-  
+
+		# broadphase for moving entities, rebuilt every tick
+		self.entity_hash = SpatialHash()
+
+		# line of sight for the fog and for enemies noticing the player
+		self.field_of_view = FieldOfView(self.dungeon_layout)
+		self.fog_of_war = FogOfWar(map_width, map_height) if FOG_OF_WAR else None
+		self.player_view_tile = None
+
+		# spell and hit effects
+		self.particles = init_particles()
+
+		# background path searches, started once the layout is final
+		self.path_service = PathService(PATHFINDING_WORKERS, PATHFINDING_PROCESSES, deterministic) if PATHFINDING_WORKERS > 0 else None
+
 		# UI
 		self.ui = UI()
+  
+		# sprite setup, build=False leaves it to build_step so a loading screen can run between slices
+		self.generation = self.create_generation_pipeline()
+		if build:
+			self.create_map()
 
 	def calculate_distance(self, room1, room2):
 		# Calculate the center points of both rooms
@@ -341,84 +267,85 @@ class Level:
 						self.object_layout[enemy_y][enemy_x] = enemy_type  # Place enemy type on Map2
 						placed = True
 
+	def create_generation_pipeline(self):
+		return StagedPipeline(self.layout_stages() + [
+			('autotile', self.autotile),
+			('doors', self.place_doors),
+			('room index', self.index_rooms),
+			('spawns', self.spawn_actors),
+			('sprite build', self.build_sprites),
+			('camera chunks', self.prepare_camera),
+		])
+
 	def create_map(self):
-		print("Starting map creation")
-		self.generate_procedural_map()
-		self.place_tiles_and_enemies()
-		self.fix_border_and_walls(self.dungeon_layout)
-		self.place_doors()
-		
+		# blocking build, the game steps the same pipeline with build_step instead
+		while not self.build_step():
+			pass
+
+	def build_step(self, budget_ms=None):
+		# Runs generation for up to budget_ms, True once the level is ready
+		if self.generation.done:
+			return True
+		if self.generation.index == 0 and self.generation.current is None:
+			print(f"Starting map creation with seed {self.seed}")
+		if not self.generation.step(budget_ms):
+			return False
+
+		self.field_of_view.invalidate()
+		if self.path_service:
+			portal_args = ([tuple(room.rect) for room in self.rooms], HPA_CHUNK_SIZE, HPA_REFINE_TILES) if PATHFINDING_HIERARCHICAL else None
+			self.path_service.set_grid(self.dungeon_layout, portal_args)
 		print('Map and objects generated')
 		for row in self.dungeon_layout:
 			print(''.join(row))
+		self.generation.report()
+		return True
 
-	def place_doors(self):
-		door_sum = 0
-		# Additional code for door creation
-		for room in self.rooms:
-			central_x = room.x + room.width // 2
-			door_bottom_row_y = room.y + 1
-
-			door_x = central_x - 2  # Center the door
-
-			# Ensure there's enough space above the wall and the top wall is suitable
-			if door_bottom_row_y - 3 >= 0:
-				# Check if the bottom row of the door and two rows above it are suitable
-				bottom_row_ok = all(self.dungeon_layout[door_bottom_row_y][max(0, door_x + i)] == ' ' for i in range(4))
-				one_row_above_ok = all(self.dungeon_layout[door_bottom_row_y - 1][max(0, door_x + i)] == ' ' for i in range(4))
-				two_rows_above_ok = all(self.dungeon_layout[door_bottom_row_y - 2][max(0, door_x + i)] == 'x' for i in range(4))
-				three_rows_above_ok = all(self.dungeon_layout[door_bottom_row_y - 3][max(0, door_x + i)] == 'x' for i in range(4))
-				four_rows_above_ok = all(self.dungeon_layout[door_bottom_row_y - 4][max(0, door_x + i)] == 'x' for i in range(4))
-
-				if bottom_row_ok and one_row_above_ok and two_rows_above_ok and three_rows_above_ok and four_rows_above_ok and door_sum <=3:
-					self.create_door(door_x * TILESIZE, (door_bottom_row_y - 3) * TILESIZE)
-					door_sum += 1
-
-	def place_tiles_and_enemies(self):
-		player_created = False
+	def autotile(self):
+		# Pick every tile's graphic from its neighbours; the sprites are made in build_sprites
+		self.tile_rows = []
 		for row_index, row in enumerate(self.dungeon_layout):
-			for col_index, cell in enumerate(row):
-				self.place_tile(row_index, col_index)
-				self.try_place_player(cell, row_index, col_index, player_created)
-		self.place_enemies()
+			self.tile_rows.append([tile for col_index in range(len(row)) for tile in self.autotile_cell(row_index, col_index)])
+			yield
 
-	def place_tile(self, row_index, col_index):
-		x, y = col_index * TILESIZE, row_index * TILESIZE
+	def autotile_cell(self, row_index, col_index):
+		# (pos, obstacle, tilesheet, tile coordinates, tile type, edge type) for each tile on this cell
+		pos = (col_index * TILESIZE, row_index * TILESIZE)
 		tile_type, tile_coords, edge_type = self.get_tile_type(self.dungeon_layout, row_index, col_index)
-		if tile_type:
-			obstacle_group = self.obstacle_sprites if tile_type in ['wall', 'overlay', 'corner'] else None
-			Tile((x, y), self.visible_sprites, obstacle_group, tile_type, tile_coords, tile_type, edge_type)
-			self.try_place_overlay_or_corner_tile(row_index, col_index)
-
-	def try_place_overlay_or_corner_tile(self, row_index, col_index):
-		overlay_tile = self.get_overlay_tile(self.dungeon_layout, row_index, col_index)
-		if overlay_tile:
-			tile_type, tile_coords, edge_type, is_obstacle = overlay_tile
-			obstacle_group = self.obstacle_sprites if is_obstacle else None
-			Tile((col_index * TILESIZE, row_index * TILESIZE), self.visible_sprites, obstacle_group, tile_type, tile_coords, tile_type, edge_type)
-		corner_tile = self.get_corner_tile(self.dungeon_layout, row_index, col_index)
-		if corner_tile:
-			tile_type, tile_coords, edge_type, is_obstacle = corner_tile
-			obstacle_group = self.obstacle_sprites if is_obstacle else None
-			Tile((col_index * TILESIZE, row_index * TILESIZE), self.visible_sprites, obstacle_group, tile_type, tile_coords, tile_type, edge_type)
-
-	def try_place_player(self, cell, row_index, col_index, player_created_flag):
-		x, y = col_index * TILESIZE, row_index * TILESIZE
-		if cell == 'p' and not player_created_flag:
-			self.player = Player((x, y), [self.visible_sprites], self.obstacle_sprites, self.create_attack, self.destroy_attack, self.create_magic)
-			player_created_flag = True
+		if not tile_type:
+			return []
+		tiles = [(pos, tile_type in ['wall', 'overlay', 'corner'], tile_type, tile_coords, tile_type, edge_type)]
+		for extra_tile in (self.get_overlay_tile(self.dungeon_layout, row_index, col_index), self.get_corner_tile(self.dungeon_layout, row_index, col_index)):
+			if extra_tile:
+				tile_type, tile_coords, edge_type, is_obstacle = extra_tile
+				tiles.append((pos, is_obstacle, tile_type, tile_coords, tile_type, edge_type))
+		return tiles
+
+	def build_sprites(self):
+		for tiles in self.tile_rows + [self.door_tiles]:
+			for pos, is_obstacle, tilesheet, tile_coords, tile_type, edge_type in tiles:
+				Tile(pos, self.visible_sprites, self.obstacle_sprites if is_obstacle else None, tilesheet, tile_coords, tile_type, edge_type)
+			yield
+		self.tile_rows = []
+		self.door_tiles = []
+
+	def prepare_camera(self):
+		# Tile chunks at the lowest zoom and quality tier, stretched over the view while another scale's chunks are built
 		if self.player is None:
-			print("Player was not created!")
+			return None
+		lowest_zoom = min(ZOOM_LEVELS)
+		lowest = lowest_zoom * self.render_scale * min(tier['render_scale'] for tier in QUALITY_TIERS)
+		return self.visible_sprites.prepare_chunks(lowest, lowest_zoom, self.player.rect.center)
 
 	def place_enemies(self):
+		if self.enemy_count is not None:
+			self.fill_enemies(self.enemy_count)
+			return
 	 
 		enemies_sum = 0
 		for room in self.rooms:
 			# Calculate inner area bounds to place enemies
-			start_x = max(room.x + 3, 3)
-			end_x = min(room.x + room.width - 3, MAP_WIDTH - 3)
-			start_y = max(room.y + 3, 3)
-			end_y = min(room.y + room.height - 3, MAP_HEIGHT - 3)
+			start_x, end_x, start_y, end_y = self.enemy_area(room)
 
 			# Place enemies randomly in rooms, ensuring they are away from walls
 			for _ in range(random.randint(1, 2)):  # Random number of enemies
@@ -429,13 +356,42 @@ class Level:
 					enemy_x = random.randint(start_x, end_x)
 					enemy_y = random.randint(start_y, end_y)
 
-					if enemies_sum < 4:
+					if enemies_sum < MAX_ENEMIES:
 						if self.is_valid_enemy_position(enemy_x, enemy_y):
-							enemy_type = random.choice(self.enemy_types)  # Randomly choose an enemy type
+							enemy_type = self.choose_enemy_type()
 							self.create_enemy(enemy_type, enemy_x, enemy_y)
 							enemies_sum += 1
 							placed = True
 
+	def fill_enemies(self, count):
+		# Spread exactly count enemies over the rooms, several may share a spot
+		rooms = [room for room in self.rooms if room != self.starting_room]
+		spots = []
+		for room in rooms:
+			start_x, end_x, start_y, end_y = self.enemy_area(room)
+			spots.append([(x, y) for y in range(start_y, end_y + 1) for x in range(start_x, end_x + 1) if self.is_valid_enemy_position(x, y)])
+		spots = [room_spots for room_spots in spots if room_spots]
+		if not spots:
+			print('No room has space for enemies')
+			return
+		for index in range(count):
+			enemy_x, enemy_y = random.choice(spots[index % len(spots)])
+			self.create_enemy(self.choose_enemy_type(), enemy_x, enemy_y)
+
+	def enemy_area(self, room):
+		# Inner bounds of a room, away from the walls
+		start_x = max(room.x + 3, 3)
+		end_x = min(room.x + room.width - 3, self.map_width - 3)
+		start_y = max(room.y + 3, 3)
+		end_y = min(room.y + room.height - 3, self.map_height - 3)
+		return start_x, end_x, start_y, end_y
+
+	def choose_enemy_type(self):
+		if self.enemy_mix:
+			types = list(self.enemy_mix)
+			return random.choices(types, weights=[self.enemy_mix[enemy_type] for enemy_type in types])[0]
+		return random.choice(self.enemy_types)  # Randomly choose an enemy type
+
 	def is_valid_enemy_position(self, x, y):
 		# Check if the position is suitable for placing an enemy
 		for i in range(-3, 4):  # Check in a 7x7 grid centered on the position
@@ -446,107 +402,229 @@ class Level:
 
 	def create_enemy(self, enemy_type, col_index, row_index):
 		x, y = col_index * TILESIZE, row_index * TILESIZE
-		enemy_name = {
-			'S': 'Spider/1',
-			'W': 'Worm/1',
-			'K': 'Skeleton/1',
-			'B': 'Worm/2'
-		}.get(enemy_type)
+		enemy_name = self.enemy_names.get(enemy_type)
 		if enemy_name:
-			Enemy(enemy_name, (x, y), [self.visible_sprites, self.attackable_sprites, self.enemy_sprites], self.obstacle_sprites, self.dungeon_layout, self.player)
+			enemy = enemy_pool.acquire([self.visible_sprites, self.attackable_sprites, self.enemy_sprites], enemy_name, (x, y), self.obstacle_sprites, self.dungeon_layout, self.player, self.field_of_view, self.path_service, self.regions)
+			self.register_enemy(enemy)
+			self.tune_enemy(enemy)
 			print(f'{enemy_name} enemy rendered at position:', x, y)
 
-	def create_door(self, x, y):
-		door_width, door_height = 4, 4
-		for i in range(door_width):
-			for j in range(door_height):
-				door_tile_x = (x // TILESIZE) + i
-				door_tile_y = (y // TILESIZE) + j
-
-				if j == 3:  # Mark the bottom row of the door
-					self.dungeon_layout[door_tile_y][door_tile_x] = 'D'
-
-				tile_coords = (i, j)
-				door_pos = (x + i * TILESIZE, y + j * TILESIZE)
-				Tile(door_pos, self.visible_sprites, None, 'doors', tile_coords, 'door')
+	def set_quality(self, tier):
+		# Hand a QUALITY_TIERS entry to everything it tunes, see governor.py
+		self.quality = tier
+		self.visible_sprites.set_view(render_scale=self.render_scale * tier['render_scale'])
+		self.particles.limit = int(self.particles.capacity * tier['particles'])
+		for enemy in self.enemy_sprites:
+			self.tune_enemy(enemy)
+
+	def tune_enemy(self, enemy):
+		# recordings and replays keep the intervals they were made with, they change what enemies do
+		if not self.deterministic:
+			enemy.path_update_interval = self.quality['path_update_interval']
+			enemy.ai_update_interval = self.quality['offscreen_ai_interval']
+
+	def release_enemy(self, enemy):
+		enemy.cancel_timers()
+		if self.path_service:
+			self.path_service.forget(enemy.id)
+		self.area_enemies.get(enemy.home_area, {}).pop(enemy, None)
+		self.visible_sprites.sleeping.discard(enemy)
+		enemy_pool.release(enemy)
+
+	def index_rooms(self):
+		# Rooms keep their index in self.rooms as area ids, corridors are cut into pieces like the path workers do
+		self.room_index, _ = label_clusters(self.dungeon_layout, [tuple(room.rect) for room in self.rooms], HPA_CHUNK_SIZE)
+		self.room_graph = touching_clusters(self.room_index, self.map_width, self.map_height)
+		self.area_rects = {}
+		for index, area in enumerate(self.room_index):
+			if area >= 0:
+				tile = pygame.Rect(index % self.map_width * TILESIZE, index // self.map_width * TILESIZE, TILESIZE, TILESIZE)
+				if area in self.area_rects:
+					self.area_rects[area].union_ip(tile)
+				else:
+					self.area_rects[area] = tile
+
+	def area_at(self, pos):
+		# Area of the tile under a pixel position, -1 off the walkable tiles
+		col, row = int(pos[0]) // TILESIZE, int(pos[1]) // TILESIZE
+		if 0 <= col < self.map_width and 0 <= row < self.map_height:
+			return self.room_index[row * self.map_width + col]
+		return -1
+
+	def areas_near(self, area):
+		# area and every area up to WAKE_HOPS steps away in room_graph, worked out once per area
+		near = self.wake_areas.get(area)
+		if near is None:
+			near, frontier = {area}, {area}
+			for _ in range(WAKE_HOPS):
+				frontier = {other for current in frontier for other in self.room_graph.get(current, ())} - near
+				near |= frontier
+			near = self.wake_areas[area] = frozenset(near)
+		return near
+
+	def areas_in_view(self, chunk):
+		# areas touching wake_size around any point of a chunk of HPA_CHUNK_SIZE tiles, worked out once per chunk
+		near = self.view_areas.get(chunk)
+		if near is None:
+			size = HPA_CHUNK_SIZE * TILESIZE
+			view = pygame.Rect(chunk[0] * size, chunk[1] * size, size, size).inflate(self.wake_size)
+			near = self.view_areas[chunk] = frozenset(area for area, rect in self.area_rects.items() if rect.colliderect(view))
+		return near
+
+	def register_enemy(self, enemy):
+		enemy.home_area = self.area_at(enemy.hitbox.center)
+		self.area_enemies.setdefault(enemy.home_area, {})[enemy] = None
+		if not ENEMY_SLEEP or enemy.home_area in self.awake_areas:
+			self.wake_enemy(enemy)
+		else:
+			self.sleep_enemy(enemy)
+
+	def wake_enemy(self, enemy):
+		self.awake_enemies.add(enemy)
+		self.visible_sprites.sleeping.discard(enemy)
+
+	def sleep_enemy(self, enemy):
+		# Still drawn, but no longer updated, hashed or searching for paths
+		self.awake_enemies.remove(enemy)
+		self.visible_sprites.sleeping.add(enemy)
+		if self.path_service:
+			self.path_service.forget(enemy.id)
+
+	def update_awake_areas(self):
+		# One check per tick against the player's area and chunk, enemies only change state when either changes
+		if not ENEMY_SLEEP:
+			return
+		x, y = self.player.hitbox.center
+		area = self.area_at((x, y))
+		chunk = (int(x) // (HPA_CHUNK_SIZE * TILESIZE), int(y) // (HPA_CHUNK_SIZE * TILESIZE))
+		if area < 0 or (area, chunk) == self.wake_from:
+			return
+		self.wake_from = (area, chunk)
+		previous, self.awake_areas = self.awake_areas, self.areas_near(area) | self.areas_in_view(chunk)
+		for old in previous - self.awake_areas:
+			# enemies that followed the player out of their area move with it, and stay up if it is awake
+			for enemy in list(self.area_enemies.get(old, ())):
+				current = self.area_at(enemy.hitbox.center)
+				if current >= 0 and current != old:
+					del self.area_enemies[old][enemy]
+					self.area_enemies.setdefault(current, {})[enemy] = None
+					enemy.home_area = current
+				if enemy.home_area not in self.awake_areas:
+					self.sleep_enemy(enemy)
+		for new in self.awake_areas - previous:
+			for enemy in self.area_enemies.get(new, ()):
+				self.wake_enemy(enemy)
+
+	def close(self):
+		# Hand pooled sprites back and stop the path workers
+		self.destroy_attack()
+		for enemy in list(self.enemy_sprites):
+			self.release_enemy(enemy)
+		if self.path_service:
+			self.path_service.close()
 
 	def create_attack(self):
-		self.current_attack = Weapon(self.player, [self.visible_sprites, self.attack_sprites])
+		self.current_attack = weapon_pool.acquire([self.visible_sprites, self.attack_sprites], self.player)
+		play_sound('audio/sword.wav', SOUND_PRIORITY_LOW)
 		
 	def destroy_attack(self):
 		if self.current_attack:
-			self.current_attack.kill()
+			weapon_pool.release(self.current_attack)
 		self.current_attack = None
 	
+	def update_field_of_view(self):
+		# only recast when the player steps onto another tile
+		tile = (self.player.rect.centerx // TILESIZE, self.player.rect.centery // TILESIZE)
+		if tile != self.player_view_tile:
+			self.player_view_tile = tile
+			if self.fog_of_war:
+				self.fog_of_war.reveal(self.field_of_view.compute(tile, FOV_RADIUS))
+
+	def update_entity_hash(self):
+		self.entity_hash.rebuild([self.player, *self.awake_enemies, *self.attack_sprites])
+
 	def player_attack_logic(self):
 		if self.attack_sprites:
 			for attack_sprite in self.attack_sprites:
-				collision_sprites = pygame.sprite.spritecollide(attack_sprite, self.attackable_sprites, False)
+				collision_sprites = self.entity_hash.query_rect(attack_sprite.rect, exclude=attack_sprite)
 				for target_sprite in collision_sprites:
-					if target_sprite.sprite_type == 'enemy' and target_sprite.status != 'final_death':
+					if target_sprite in self.attackable_sprites and target_sprite.sprite_type == 'enemy' and target_sprite.status != 'final_death':
+						was_vulnerable = target_sprite.vulnerable
 						target_sprite.get_damage(self.player, attack_sprite.sprite_type)
+						if was_vulnerable and not target_sprite.vulnerable:
+							self.particles.emit('sparkle', target_sprite.hitbox.center)
+							if target_sprite.status == 'death':
+								self.particles.emit('smoke', target_sprite.hitbox.center)
+
+	def enemy_contact_logic(self):
+		for sprite in self.entity_hash.query_rect(self.player.hitbox, exclude=self.player):
+			if getattr(sprite, 'sprite_type', None) == 'enemy' and sprite.status not in ['waiting', 'retreat', 'death', 'final_death']:
+				if self.player.vulnerable:
+					self.particles.emit(monster_data[sprite.monster_type]['attack_type'], self.player.hitbox.center)
+				self.player.get_damage(CONTACT_DAMAGE)
+
+	def enemy_separation(self):
+		# Push overlapping enemies apart; worms never move so the other enemy takes the whole push
+		for enemy in self.awake_enemies:
+			if enemy.speed == 0 or enemy.status in ['death', 'final_death']:
+				continue
+			for other in self.entity_hash.query_radius(enemy.hitbox.center, SEPARATION_RADIUS, exclude=enemy):
+				if getattr(other, 'sprite_type', None) != 'enemy' or other.status == 'final_death':
+					continue
+				overlap = enemy.hitbox.clip(other.hitbox)
+				if not overlap:
+					continue
+				share = 1 if other.speed == 0 else 0.5
+				if overlap.width < overlap.height:
+					push = overlap.width * share
+					push_x, push_y = (-push if enemy.hitbox.centerx < other.hitbox.centerx else push), 0
+				else:
+					push = overlap.height * share
+					push_x, push_y = 0, (-push if enemy.hitbox.centery < other.hitbox.centery else push)
+				moved = enemy.hitbox.move(round(push_x), round(push_y))
+				if self.is_rect_walkable(moved):
+					enemy.hitbox = moved
+					enemy.rect.center = enemy.hitbox.center
+					self.entity_hash.update(enemy)
+
+	def is_rect_walkable(self, rect):
+		for x, y in (rect.topleft, rect.topright, rect.bottomleft, rect.bottomright):
+			col, row = x // TILESIZE, y // TILESIZE
+			if not (0 <= row < self.map_height and 0 <= col < self.map_width) or self.dungeon_layout[row][col] == 'x':
+				return False
+		return True
 
 	def create_magic(self, style, strength, cost):
-		print(style)
-		print(strength)
-		print(cost)
-
-	def find_valid_player_position(self, room):
-		# Calculate the center of the room
-		center_x = room.x + room.width // 2
-		center_y = room.y + room.height // 2
-
-		# Ensure the center is not out of bounds
-		center_x = max(min(center_x, MAP_WIDTH - 1), 0)
-		center_y = max(min(center_y, MAP_HEIGHT - 1), 0)
-
-		# Check if the center is a wall tile; if so, find the nearest floor tile
-		if self.dungeon_layout[center_y][center_x] == 'x':
-			for y in range(room.y + 1, room.y + room.height - 1):
-				for x in range(room.x + 1, room.x + room.width - 1):
-					if self.dungeon_layout[y][x] == ' ':
-						return x, y
-		else:
-			return center_x, center_y
-
-		return None, None  # Return None if no valid position is found
-
-	def generate_procedural_map(self):
-		# Generate and separate cells
-		cells = generate_cells(15, MAP_WIDTH, MAP_HEIGHT)
-		separate_cells(cells)
-
-		# Convert cells to rooms and add to self.rooms
-		self.rooms = select_rooms(cells, min_size=8, map_width=MAP_WIDTH, map_height=MAP_HEIGHT)
-
-		# Fill rooms in the dungeon layout
-		for room in self.rooms:
-			print(f'Room rendered at position:', room.x, room.y)
-			room.create_room(self.dungeon_layout)
-			
-		# Step 3: Construct MST and corridors
-		delaunay_tri = create_delaunay_triangulation(self.rooms)
-		mst = create_mst(delaunay_tri)
-		add_extra_edges_to_mst(mst, delaunay_tri, percentage=0.15)  # Adjust percentage as needed
-		build_corridors_from_mst(mst, self.dungeon_layout, self.rooms)
-
+		if self.player.energy < cost:
+			return
+		self.player.energy -= cost
+		center = self.player.hitbox.center
+		if style == 'heal':
+			play_sound('audio/heal.wav')
+			self.player.health = min(self.player.health + strength, self.player.stats['health'])
+			self.particles.emit('aura', center)
+			self.particles.emit('heal', (center[0], center[1] - TILESIZE))
+		elif style == 'flame':
+			play_sound('audio/Fire.wav')
+			direction = FACING_VECTORS[self.player.status]
+			start = (center[0] + direction[0] * TILESIZE, center[1] + direction[1] * TILESIZE)
+			velocity = (direction[0] * FLAME_SPEED, direction[1] * FLAME_SPEED)
+			self.particles.emit('flame', start, FLAME_PARTICLES, velocity, spread=FLAME_SPREAD, scatter=TILESIZE // 4)
+
+	def spawn_actors(self):
 		# Place the player in the first room
-		first_room = self.rooms[0]  # Select the first room
-		self.starting_room = first_room
-		player_x, player_y = self.find_valid_player_position(first_room)
+		self.find_player_spot()
+		player_x, player_y = self.player_tile
 		if player_x is not None and player_y is not None:
 			self.player = Player((player_x * TILESIZE, player_y * TILESIZE), [self.visible_sprites], self.obstacle_sprites, self.create_attack, self.destroy_attack, self.create_magic)
+			self.update_awake_areas()
 		else:
 			print("Failed to place the player in a valid position")
 
 		# Populate the dungeon with objects
 		self.populate_objects()
-  
-		# Fix single-tile-thick walls
-		self.fix_border_and_walls(self.dungeon_layout)
+		self.place_enemies()
 
-		print('Map and objects generated')
-	
 	def add_room(self, room, corridor_width):
 		# Adjusted to consider buffer margin
 		overlap = False
@@ -564,8 +642,8 @@ class Level:
 		# Check if room is too close to the edges considering buffer
 		too_close_to_edge = (room.x < buffer or 
 							room.y < buffer or 
-							room.x + room.width + corridor_width > MAP_WIDTH - buffer or 
-							room.y + room.height + corridor_width > MAP_HEIGHT - buffer)
+							room.x + room.width + corridor_width > self.map_width - buffer or 
+							room.y + room.height + corridor_width > self.map_height - buffer)
 		
 		if not overlap and not too_close_to_edge:
 			room.create_room(self.dungeon_layout)
@@ -618,44 +696,56 @@ class Level:
 		else:
 			return not (in_room1 or in_room2)
 
-	def fix_border_and_walls(self, dungeon_layout):
-		height = MAP_HEIGHT
-		width = MAP_WIDTH
-		border_thickness = 3  # Number of tiles for the border
-
-		# Add a border of 'x' tiles around the map
-		for y in range(height):
-			for x in range(width):
-				if y < border_thickness or y >= height - border_thickness or \
-				x < border_thickness or x >= width - border_thickness:
-					dungeon_layout[y][x] = 'x'
-
-		# Fix single-tile-thick walls inside the map, skipping the border area
-		for y in range(border_thickness, height - border_thickness):
-			for x in range(border_thickness, width - border_thickness):
-				if dungeon_layout[y][x] == 'x':
-					# Check adjacent tiles
-					left = dungeon_layout[y][x - 1]
-					right = dungeon_layout[y][x + 1]
-					up = dungeon_layout[y - 1][x]
-					down = dungeon_layout[y + 1][x]
-
-					# Convert to ' ' if surrounded by ' ' on opposite sides
-					if (left == ' ' and right == ' ') or (up == ' ' and down == ' '):
-						dungeon_layout[y][x] = ' '
-
-	def run(self):
-		# update and draw the game
+	def update(self, input_state=None):
+		# advance the simulation by one fixed tick
 		if self.player is None:
 			raise ValueError("Player object has not been initialized before running the level.")
-		
-		self.visible_sprites.custom_draw(self.player)
 
+		self.player.input_state = input_state
+		count_tick()
+		start = time.perf_counter()
+
+		new_audio_tick()
+		self.player.store_previous_position()
+		for enemy in self.awake_enemies:
+			enemy.store_previous_position()
+
+		self.update_awake_areas()
+		self.update_field_of_view()
+		start = mark('fov', start)
+		self.update_entity_hash()
 		self.player_attack_logic()
+		self.enemy_contact_logic()
+		self.enemy_separation()
+		start = mark('entities', start)
   
 		self.visible_sprites.enemy_update(self.player)
+		start = mark('enemy_ai', start)
 		
 		self.visible_sprites.update()
+		start = mark('sprites', start)
+		self.particles.update()
+		mark('particles', start)
+
+	def draw(self, alpha=1.0):
+		# alpha is how far we are between the previous and the current tick
+		start = time.perf_counter()
+		self.visible_sprites.custom_draw(self.player, alpha)
+		start = mark('draw', start)
+		view, scale = self.visible_sprites.view_surface, self.visible_sprites.scale
+		self.particles.draw(view, self.visible_sprites.offset, scale)
+		start = mark('particles', start)
+		if self.fog_of_war:
+			self.fog_of_war.draw(self.visible_sprites.offset, view, scale)
+		start = mark('fog', start)
+		self.visible_sprites.present()
+		mark('upscale', start)
+
+	def run(self):
+		# update and draw the game in lockstep, one tick per frame
+		self.draw()
+		sim_clock.advance(1000 / TICK_RATE)
+		self.update()
 		
 
 class YSortCameraGroup(pygame.sprite.Group):
@@ -664,50 +754,213 @@ class YSortCameraGroup(pygame.sprite.Group):
 		# general setup 
 		super().__init__()
 		self.display_surface = pygame.display.get_surface()
-		self.half_width = self.display_surface.get_size()[0] // 2
-		self.half_height = self.display_surface.get_size()[1] // 2
 		self.offset = pygame.math.Vector2()
+		self.chunks = ChunkCache()
+		self.zoom = ZOOM_START
+		self.render_scale = RENDER_SCALE
+		self.set_view()
+
+		# tiles never move, so they are sorted once and re-sorted only when tiles come or go
+		self.static_dirty = True
+		self.ground_tiles, self.ground_keys = [], []
+		self.top_tiles, self.top_keys = [], []
+		self.tile_margin = 0
+		self.actors = {}  # everything that is not a tile, in the order it joined the group
+		self.sleeping = set()  # enemies in areas far from the player, drawn but not updated
+
+		# (surface, position) pairs per layer, reused every frame and each sent with one blits call
+		self.ground_layer, self.enemy_layer, self.player_layer, self.weapon_layer, self.top_layer = [], [], [], [], []
+		self.floor_size = None  # world pixels kept as chunk floor around the player, see prepare_chunks
+		self.draw_stats = {'sprites': 0, 'blit_calls': 0, 'python_ms': 0.0, 'sdl_ms': 0.0}
+
+	def set_view(self, zoom=None, render_scale=None):
+		# The world is drawn into view_surface at scale (zoom times render scale), present() scales it up to the window
+		if zoom is not None:
+			self.zoom = zoom
+		if render_scale is not None:
+			self.render_scale = render_scale
+		width, height = self.display_surface.get_size()
+		if self.render_scale == 1:
+			self.view_surface = self.display_surface
+		else:
+			self.view_surface = pygame.Surface((max(1, round(width * self.render_scale)), max(1, round(height * self.render_scale))), 0, self.display_surface)
+		self.scale = self.snap(self.zoom * self.render_scale)
+		# half the view in world pixels, the camera keeps the player in the middle
+		self.half_width = self.view_surface.get_width() / self.scale / 2
+		self.half_height = self.view_surface.get_height() / self.scale / 2
+
+	def snap(self, scale):
+		# snapped so a chunk is a whole number of pixels and chunks meet without seams
+		chunk_size = self.chunks.chunk_size
+		return max(1, round(chunk_size * scale)) / chunk_size
+
+	def prepare_chunks(self, scale, zoom, centre):
+		# Generator, a pipeline stage: chunks at scale for what the view zoomed out to zoom shows around centre, see ChunkCache
+		scale = self.snap(scale)
+		if scale >= 1:
+			return
+		if self.static_dirty:
+			self.rebuild_static()
+		width, height = self.display_surface.get_size()
+		margin = self.chunks.chunk_size * 2
+		self.floor_size = (width / zoom + margin, height / zoom + margin)
+		yield from self.chunks.build_floor(scale, self.floor_area(centre))
+
+	def floor_area(self, centre):
+		area = pygame.Rect((0, 0), self.floor_size)
+		area.center = centre
+		return area
+
+	def step_zoom(self, steps):
+		levels = sorted(ZOOM_LEVELS)
+		index = min(range(len(levels)), key=lambda index: abs(levels[index] - self.zoom))
+		zoom = levels[min(max(index + steps, 0), len(levels) - 1)]
+		if zoom != self.zoom:
+			self.set_view(zoom=zoom)
+			print(f'Zoom {zoom}x, drawing at {self.scale:g}x')
+
+	def present(self):
+		# Scale a lower resolution view up to the window, once per frame
+		if self.view_surface is not self.display_surface:
+			pygame.transform.scale(self.view_surface, self.display_surface.get_size(), self.display_surface)
+
+	def add_internal(self, sprite, layer=None):
+		super().add_internal(sprite, layer)
+		if isinstance(sprite, Tile):
+			self.static_dirty = True
+		else:
+			self.actors[sprite] = None
 
-	def custom_draw(self,player):
-
-		# getting the offset 
-		self.offset.x = player.rect.centerx - self.half_width
-		self.offset.y = player.rect.centery - self.half_height
-  
-		 # Draw all sprites except enemies and top-edge walls
-		for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
-			if sprite != player and not hasattr(sprite, 'sprite_type') and not (hasattr(sprite, 'edge_type') and sprite.edge_type == 'top'):
-				offset_pos = sprite.rect.topleft - self.offset
-				self.display_surface.blit(sprite.image, offset_pos)
-
-		# Now draw enemies
-		for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
-			if hasattr(sprite, 'sprite_type') and sprite.sprite_type == 'enemy':
-				offset_pos = sprite.rect.topleft - self.offset
-				self.display_surface.blit(sprite.image, offset_pos)
-				# Draw the hitbox for enemies
-				hitbox_pos = sprite.hitbox.topleft - self.offset
-				sprite.draw_hitbox(self.display_surface, hitbox_pos)
-
-		# Draw player
-		offset_pos = player.rect.topleft - self.offset
-		self.display_surface.blit(player.image, offset_pos)
-
-		# Draw the weapon
-		for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
-			if hasattr(sprite, 'sprite_type') and sprite.sprite_type == 'weapon':
-				weapon_offset_pos = sprite.rect.topleft - self.offset
-				self.display_surface.blit(sprite.image, weapon_offset_pos)
-
-		# Draw top-edge wall tiles last
-		for sprite in self.sprites():
-			if hasattr(sprite, 'edge_type') and sprite.edge_type == 'top':
-				offset_pos = sprite.rect.topleft - self.offset
-				self.display_surface.blit(sprite.image, offset_pos)
+	def remove_internal(self, sprite):
+		super().remove_internal(sprite)
+		if isinstance(sprite, Tile):
+			self.static_dirty = True
+		else:
+			self.actors.pop(sprite, None)
+
+	def rebuild_static(self):
+		tiles = [sprite for sprite in self.sprites() if isinstance(sprite, Tile)]
+		self.ground_tiles = sorted((tile for tile in tiles if tile.edge_type != 'top'), key=lambda tile: tile.rect.centery)
+		self.top_tiles = sorted((tile for tile in tiles if tile.edge_type == 'top'), key=lambda tile: tile.rect.centery)
+		self.ground_keys = [tile.rect.centery for tile in self.ground_tiles]
+		self.top_keys = [tile.rect.centery for tile in self.top_tiles]
+		self.tile_margin = max((max(tile.rect.width, tile.rect.height) for tile in tiles), default=0)
+		self.chunks.set_tiles('ground', self.ground_tiles)
+		self.chunks.set_tiles('top', self.top_tiles)
+		self.static_dirty = False
+
+	def collect_tiles(self, tiles, keys, offset_x, offset_y, layer):
+		# Tile by tile at scale 1, only the rows around the screen are looked at, keys are sorted by centery
+		width, height = self.view_surface.get_size()
+		margin = self.tile_margin
+		first = bisect_left(keys, offset_y - margin)
+		last = bisect_right(keys, offset_y + height + margin)
+		for tile in tiles[first:last]:
+			rect = tile.rect
+			x = rect.x - offset_x
+			if -margin < x < width:
+				layer.append((tile.image, (x, rect.y - offset_y)))
+
+	def interpolated_topleft(self, sprite, alpha):
+		previous = getattr(sprite, 'previous_topleft', None)
+		if previous is None or alpha >= 1:
+			return sprite.rect.topleft
+		x, y = sprite.rect.topleft
+		return previous[0] + (x - previous[0]) * alpha, previous[1] + (y - previous[1]) * alpha
+
+	def blit_layer(self, layer):
+		if layer:
+			self.view_surface.blits(layer, doreturn=False)
+			self.draw_stats['blit_calls'] += 1
+			self.draw_stats['sprites'] += len(layer)
+
+	def custom_draw(self, player, alpha=1.0):
+		start = time.perf_counter()
+		sdl_seconds = 0.0
+		self.draw_stats['sprites'] = self.draw_stats['blit_calls'] = 0
+		if self.static_dirty:
+			self.rebuild_static()
+
+		# getting the offset from the interpolated player position so the camera moves smoothly
+		player_x, player_y = self.interpolated_topleft(player, alpha)
+		self.offset.x = player_x + player.rect.width // 2 - self.half_width
+		self.offset.y = player_y + player.rect.height // 2 - self.half_height
+		# positions below are in view pixels, world pixels times scale
+		scale = self.scale
+		offset_x, offset_y = int(self.offset.x * scale), int(self.offset.y * scale)
+		width, height = self.view_surface.get_size()
+
+		# Floor, walls and doors except top-edge walls
+		ground_layer = self.ground_layer
+		ground_layer.clear()
+		if scale == 1:
+			self.collect_tiles(self.ground_tiles, self.ground_keys, offset_x, offset_y, ground_layer)
+		else:
+			self.chunks.begin_frame()
+			self.chunks.collect('ground', scale, offset_x, offset_y, width, height, ground_layer)
+
+		# Enemies, with their hitboxes drawn for debugging
+		enemy_layer = self.enemy_layer
+		enemy_layer.clear()
+		enemies = sorted((sprite for sprite in self.actors if getattr(sprite, 'sprite_type', None) == 'enemy'), key=lambda sprite: sprite.rect.centery)
+		hitboxes = []
+		for sprite in enemies:
+			render_x, render_y = self.interpolated_topleft(sprite, alpha)
+			enemy_layer.append((scaled_frame(sprite.image, scale), (int(render_x * scale) - offset_x, int(render_y * scale) - offset_y)))
+			hitbox_pos = (int((sprite.hitbox.x + render_x - sprite.rect.x) * scale) - offset_x, int((sprite.hitbox.y + render_y - sprite.rect.y) * scale) - offset_y)
+			hitboxes.append((sprite, hitbox_pos, (round(sprite.hitbox.width * scale), round(sprite.hitbox.height * scale))))
+
+		# Player
+		player_layer = self.player_layer
+		player_layer.clear()
+		player_layer.append((scaled_frame(player.image, scale), (int(player_x * scale) - offset_x, int(player_y * scale) - offset_y)))
+
+		# Weapon
+		weapon_layer = self.weapon_layer
+		weapon_layer.clear()
+		for sprite in sorted((sprite for sprite in self.actors if getattr(sprite, 'sprite_type', None) == 'weapon'), key=lambda sprite: sprite.rect.centery):
+			weapon_layer.append((scaled_frame(sprite.image, scale), (int(sprite.rect.x * scale) - offset_x, int(sprite.rect.y * scale) - offset_y)))
+
+		# Top-edge wall tiles last
+		top_layer = self.top_layer
+		top_layer.clear()
+		if scale == 1:
+			self.collect_tiles(self.top_tiles, self.top_keys, offset_x, offset_y, top_layer)
+		else:
+			self.chunks.collect('top', scale, offset_x, offset_y, width, height, top_layer)
+
+		for layer in (ground_layer, enemy_layer):
+			blit_start = time.perf_counter()
+			self.blit_layer(layer)
+			sdl_seconds += time.perf_counter() - blit_start
+		for sprite, hitbox_pos, hitbox_size in hitboxes:
+			sprite.draw_hitbox(self.view_surface, hitbox_pos, hitbox_size)
+		for layer in (player_layer, weapon_layer, top_layer):
+			blit_start = time.perf_counter()
+			self.blit_layer(layer)
+			sdl_seconds += time.perf_counter() - blit_start
+
+		if self.floor_size:
+			self.chunks.top_up_floor(self.floor_area(player.rect.center))
+
+		self.draw_stats['sdl_ms'] = sdl_seconds * 1000
+		self.draw_stats['python_ms'] = (time.perf_counter() - start - sdl_seconds) * 1000
+
+	def update(self, *args, **kwargs):
+		# tiles have nothing to update and sleeping enemies are skipped, see Level.update_awake_areas
+		for sprite in list(self.actors):
+			if sprite not in self.sleeping:
+				sprite.update(*args, **kwargs)
 
 	def enemy_update(self, player):
-		enemy_sprites = [sprite for sprite in self.sprites() if hasattr(sprite, 'sprite_type') and sprite.sprite_type == 'enemy']
+		enemy_sprites = [sprite for sprite in self.actors if getattr(sprite, 'sprite_type', None) == 'enemy' and sprite not in self.sleeping]
+		# enemies outside the view think every ai_update_interval ms when the quality tier sets one
+		view = pygame.Rect(int(self.offset.x), int(self.offset.y), int(self.half_width * 2), int(self.half_height * 2))
+		now = get_ticks()
 		for enemy in enemy_sprites:
-			
+			if enemy.ai_update_interval and not view.colliderect(enemy.rect):
+				if now - enemy.ai_update_timer < enemy.ai_update_interval:
+					continue
+				enemy.ai_update_timer = now
 			enemy.enemy_update(player)
 		
\ No newline at end of file
@@ -1,52 +1,173 @@
+import startup
+startup.start_import_timing()
+
 import pygame, sys
+import argparse
 from settings import *
 from level import Level
+from timestep import FixedTimestep, sim_clock
+from postfx import PostProcessing
+from audio import init_audio
+from replay import InputRecorder, InputReplay, capture_input
+from telemetry import start_telemetry, mark
+from memory import MemoryMonitor
+from governor import QualityGovernor
+from gcpolicy import GarbageCollection
+from pool import print_pool_stats
+import tracemalloc
+import time
 from debug import *
 
+startup.stop_import_timing()
+
 class Game:
-	def __init__(self):
+	def __init__(self, seed=None, record_path=None, replay_path=None, report_startup=False, telemetry_path=None, memory_trace=False, render_scale=RENDER_SCALE, quality='auto', gc_mode=GC_MODE):
 		  
+		# python allocations are only traced on request, tracing slows everything down
+		if memory_trace:
+			tracemalloc.start(MEMORY_TRACE_FRAMES)
+		self.memory = MemoryMonitor()
+		self.gc = GarbageCollection(gc_mode)
+
 		# general setup
 		pygame.init()
 		self.screen = pygame.display.set_mode((WIDTH,HEIGHT))
 		pygame.display.set_caption('Veiled Hollow')
 		self.clock = pygame.time.Clock()
-		#self.vignette = self.create_vignette_surface((WIDTH, HEIGHT))
-		self.level = Level()
+		self.timestep = FixedTimestep()
+		self.audio = init_audio()
+		self.report_startup = report_startup
 
-	def create_vignette_surface(self, screen_size, intensity=400):
-		vignette_surface = pygame.Surface(screen_size).convert_alpha()
-		width, height = screen_size
+		# input recording and replay, a replay brings its own seed
+		self.replay = InputReplay(replay_path) if replay_path else None
+		if self.replay:
+			seed = self.replay.seed
+			print(f'Replaying {self.replay.ticks} ticks from {replay_path}')
+		deterministic = bool(record_path or replay_path)
+		self.level = Level(seed, deterministic, build=False)
+		self.level.render_scale = render_scale
+		self.load_level()
 
-		for x in range(width):
-			for y in range(height):
-				distance_from_center = ((x - width / 2) ** 2 + (y - height / 2) ** 2) ** 0.5
-				max_distance = (width ** 2 + height ** 2) ** 0.5
+		# quality tier, 'auto' lets the governor pick it from measured frame times
+		tier_names = [tier['name'] for tier in QUALITY_TIERS]
+		self.governor = QualityGovernor(self.level, 0 if quality == 'auto' else tier_names.index(quality), quality == 'auto' and QUALITY_GOVERNOR)
+		self.recorder = InputRecorder(record_path, self.level.seed, TICK_RATE) if record_path else None
 
-				alpha = min(intensity * distance_from_center / max_distance, 255)
-				vignette_surface.set_at((x, y), (0, 0, 0, alpha))
+		# per-frame timings, flushed on exit or with TELEMETRY_FLUSH_KEY
+		self.telemetry_path = telemetry_path
+		self.telemetry = start_telemetry() if telemetry_path else None
 
-		return vignette_surface
+		# post processing overlays
+		self.postfx = PostProcessing()
+		if VIGNETTE_INTENSITY is not None:
+			self.postfx.enable('vignette', VIGNETTE_INTENSITY)
+		if DARKNESS_INTENSITY is not None:
+			self.postfx.enable('darkness', DARKNESS_INTENSITY)
 
-	def run(self):
-		while True:
+	def load_level(self):
+		# Generate in time-boxed slices and keep the window responsive in between
+		self.gc.before_level()
+		while not self.level.build_step(LOADING_SLICE_MS):
 			for event in pygame.event.get():
 				if event.type == pygame.QUIT:
+					self.level.close()
 					pygame.quit()
 					sys.exit()
+			self.level.ui.show_loading(self.level.generation.stage_name, self.level.generation.progress)
+			pygame.display.update()
+		self.gc.level_ready()
+
+	def next_input_state(self):
+		if self.replay:
+			state = self.replay.next_state()
+			if state is None:
+				print('Replay finished')
+				self.quit()
+			return state
+		state = capture_input()
+		if self.recorder:
+			self.recorder.record(state)
+		return state
+
+	def flush_telemetry(self):
+		if self.telemetry:
+			self.telemetry.flush(self.telemetry_path)
+
+	def quit(self):
+		self.flush_telemetry()
+		self.gc.print_stats()
+		if self.recorder:
+			self.recorder.close()
+		self.level.close()
+		print_pool_stats()
+		pygame.quit()
+		sys.exit()
+
+	def run(self):
+		self.audio.play_music()
+		self.clock.tick()  # don't count level generation as the first frame
+		while True:
+			if self.telemetry:
+				self.telemetry.next_frame()
+			start = time.perf_counter()
+			for event in pygame.event.get():
+				if event.type == pygame.QUIT:
+					self.quit()
+				if event.type == pygame.KEYDOWN and event.key == TELEMETRY_FLUSH_KEY:
+					self.flush_telemetry()
+				if event.type == pygame.KEYDOWN and event.key == MEMORY_REPORT_KEY:
+					self.memory.report(self.level, self.postfx)
+				if event.type == pygame.KEYDOWN and event.key in (ZOOM_IN_KEY, ZOOM_OUT_KEY):
+					self.level.visible_sprites.step_zoom(1 if event.key == ZOOM_IN_KEY else -1)
+			start = mark('events', start)
+
+			# Run as many fixed simulation ticks as the elapsed time asks for;
+			# a slow frame is made up with extra ticks, never with a bigger step
+			frame_time = self.clock.tick(FPS)
+			start = mark('clock_tick', start)
+			self.governor.frame(self.clock.get_rawtime())
+			for _ in range(self.timestep.advance(frame_time)):
+				sim_clock.advance(self.timestep.step_ms)
+				self.level.update(self.next_input_state())
 
-			self.level.run()
+			self.level.draw(self.timestep.alpha)
 			
-			# Draw the vignette over the screen
-			#self.screen.blit(self.vignette, (0, 0))
+			# Draw the vignette and darkness over the screen
+			start = time.perf_counter()
+			self.postfx.apply()
+			start = mark('postfx', start)
 
 			self.level.ui.display(self.level.player)  
+			start = mark('ui', start)
    
 			pygame.display.update()
-			
-			self.clock.tick(FPS)
+			mark('present', start)
+
+			if self.report_startup:
+				startup.report_startup()
+				self.report_startup = False
+
+def parse_seed(text):
+	# recordings keep the seed as an unsigned 64 bit number, see replay.HEADER
+	seed = int(text)
+	if not 0 <= seed < 2 ** 64:
+		raise argparse.ArgumentTypeError(f'seed must be between 0 and {2 ** 64 - 1}, not {seed}')
+	return seed
+
 
 if __name__ == '__main__':
-	game = Game()
+	parser = argparse.ArgumentParser(description='Veiled Hollow')
+	parser.add_argument('--seed', type=parse_seed, help='level seed, random when omitted')
+	parser.add_argument('--record', metavar='PATH', help='record per-tick input to PATH')
+	parser.add_argument('--replay', metavar='PATH', help='replay a recording made with --record')
+	parser.add_argument('--startup-report', action='store_true', help='print import and startup timings')
+	parser.add_argument('--telemetry', metavar='PATH', help='write per-frame timings to PATH (.npy or .csv)')
+	parser.add_argument('--memory-trace', action='store_true', help='trace python allocations for the memory report key')
+	parser.add_argument('--render-scale', type=float, default=RENDER_SCALE, help='draw the world at this share of the window size and scale it up, e.g. 0.5')
+	parser.add_argument('--gc', choices=['default', 'frozen'], default=GC_MODE, help='garbage collection during play, see gcpolicy.py')
+	parser.add_argument('--quality', choices=['auto'] + [tier['name'] for tier in QUALITY_TIERS], default='auto', help='quality tier, auto adapts it to the frame time')
+	args = parser.parse_args()
+
+	game = Game(args.seed, args.record, args.replay, args.startup_report, args.telemetry, args.memory_trace, args.render_scale, args.quality, args.gc)
 
 	game.run()
@@ -0,0 +1,264 @@
+"""
+Memory accounting per subsystem: surfaces by pixel storage, path graphs by
+node and edge counts, containers by their Python size, and, when
+tracemalloc is tracing, Python allocations grouped by module.
+
+	python main.py --memory-trace      # F10 prints the report and saves a snapshot
+	python memory.py diff A.snap B.snap [--lines]
+	python memory.py generations 5     # build levels back to back, diff first and last
+"""
+import os
+import sys
+import gc
+import tracemalloc
+from settings import *
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def module_label(filename):
+	# level.py for our own modules, numpy/… for packages, <stdlib> for the rest
+	if filename.startswith(PROJECT_DIR):
+		return os.path.relpath(filename, PROJECT_DIR)
+	parts = filename.replace(os.sep, '/').split('/')
+	if 'site-packages' in parts:
+		return parts[parts.index('site-packages') + 1] + '/…'
+	if filename.startswith('<'):
+		return filename
+	return '<stdlib>'
+
+
+class MemoryReport:
+	"""
+	Rows of (category, objects, bytes, note). Surfaces are counted by the
+	pixel buffer they live in, so subsurfaces of an atlas or tilesheet cost
+	nothing once the sheet itself has been counted in an earlier row.
+	"""
+
+	def __init__(self):
+		self.rows = []
+		self.claimed = set()  # ids of pixel buffers already counted
+
+	def surfaces(self, category, surfaces, note=''):
+		count, size, shared = 0, 0, 0
+		for surface in surfaces:
+			if surface is None:
+				continue
+			count += 1
+			root = surface.get_abs_parent()
+			if id(root) in self.claimed:
+				shared += 1
+				continue
+			self.claimed.add(id(root))
+			size += root.get_width() * root.get_height() * root.get_bytesize()
+		if shared:
+			note = f'{shared} share pixels counted above' + (f', {note}' if note else '')
+		self.rows.append((category, count, size, note))
+
+	def add(self, category, objects, size, note=''):
+		self.rows.append((category, objects, size, note))
+
+	def total(self):
+		return sum(row[2] for row in self.rows)
+
+	def print(self):
+		print(f'{"category":<24} {"objects":>8} {"KB":>10}  note')
+		for category, objects, size, note in self.rows:
+			print(f'{category:<24} {objects:>8} {size / 1024:>10.1f}  {note}')
+		print(f'{"total":<24} {"":>8} {self.total() / 1024:>10.1f}')
+
+
+def container_size(container):
+	# A list/dict/set and the containers directly inside it, not the shared leaves
+	size = sys.getsizeof(container)
+	items = container.values() if isinstance(container, dict) else container
+	for item in items:
+		if isinstance(item, (list, tuple, dict, set, frozenset)):
+			size += sys.getsizeof(item)
+	return size
+
+
+def graph_size(graph):
+	# networkx Graph: the adjacency dicts plus each edge's attribute dict, which both ends share
+	size = sys.getsizeof(graph._adj) + sys.getsizeof(graph._node)
+	seen = set()
+	for neighbours in graph._adj.values():
+		size += sys.getsizeof(neighbours)
+		for attributes in neighbours.values():
+			if id(attributes) not in seen:
+				seen.add(id(attributes))
+				size += sys.getsizeof(attributes)
+	return size
+
+
+def build_report(level, postfx=None):
+	import assets
+	import particles
+	import scaling
+	import telemetry
+	from pool import pool_stats
+	from tile import Tile
+	from timestep import sim_clock
+
+	report = MemoryReport()
+
+	# shared image storage first, so sprites showing those images count as shared
+	report.surfaces('atlas pages', [atlas for atlas in assets._atlases if not isinstance(atlas, str)])
+	report.surfaces('tilesheets', Tile.tilesheets.values())
+	report.surfaces('image cache', assets._images.values(), f'{len(assets._images)} keys')
+
+	tiles = [sprite for sprite in level.visible_sprites if isinstance(sprite, Tile)]
+	report.surfaces('tile sprites', [tile.image for tile in tiles])
+	report.surfaces('player frames', [image for frames in level.player.animations.values() for image in frames] + [level.player.image])
+	enemies = list(level.enemy_sprites)
+	report.surfaces('enemy frames', [image for enemy in enemies for frames in enemy.animations.values() for image in frames], f'{len(enemies)} enemies')
+	report.surfaces('scaled and flipped frames', scaling.cached_frames(), 'made once per frame and scale, see scaling.py')
+	report.surfaces('particle frames', [image for frames in particles._animations.values() for image in frames])
+	system = level.particles
+	report.add('particle arrays', system.capacity, sum(array.nbytes for array in (system.position, system.velocity, system.age, system.lifetime, system.animation, system.alive)), f'{system.live_count()} live')
+
+	ui = level.ui
+	report.surfaces('hud', [ui.hud_surface, *ui.text_surfaces.values(), *ui.weapon_graphics, *ui.magic_graphics])
+	if level.fog_of_war:
+		report.surfaces('fog of war', [level.fog_of_war.fog_surface, level.fog_of_war.scaled])
+	if postfx is not None:
+		report.surfaces('postfx overlay', [postfx.overlay])
+		report.add('postfx alpha arrays', len(postfx.alpha_cache), sum(array.nbytes for array in postfx.alpha_cache.values()))
+	report.surfaces('display', [level.display_surface])
+	camera = level.visible_sprites
+	if camera.view_surface is not level.display_surface:
+		report.surfaces('camera view', [camera.view_surface], f'render scale {camera.render_scale:g}')
+	report.surfaces('tile chunks', [chunk for chunk in camera.chunks.chunks.values() if chunk], f'{camera.chunks.built} built, limit {RENDER_CHUNK_CACHE_MB} MB')
+	report.surfaces('tile chunk floor', [chunk for chunk in camera.chunks.floor.values() if chunk], f'at {camera.chunks.floor_scale}x, stretched in while chunks are built')
+
+	# path finding
+	graphs = [enemy.dungeon_graph for enemy in enemies if enemy.dungeon_graph is not None]
+	unique_graphs = {id(graph): graph for graph in graphs}.values()
+	nodes = sum(graph.number_of_nodes() for graph in unique_graphs)
+	edges = sum(graph.number_of_edges() for graph in unique_graphs)
+	report.add('enemy networkx graphs', len(graphs), sum(graph_size(graph) for graph in unique_graphs), f'{nodes} nodes, {edges} edges, {len(unique_graphs)} distinct')
+	if level.path_service:
+		report.add('path service', len(level.path_service.pending), 0, 'grid snapshot lives in the worker processes')
+
+	# sprite pools, created per minute should stay near zero once the pools are warm
+	for name, created, reused, free, per_minute in pool_stats():
+		report.add(f'pool {name}', created, 0, f'{reused} reused, {free} free, {per_minute:.2f} created per minute')
+
+	# containers
+	groups = {'visible_sprites': level.visible_sprites, 'obstacle_sprites': level.obstacle_sprites, 'attackable_sprites': level.attackable_sprites, 'enemy_sprites': level.enemy_sprites, 'attack_sprites': level.attack_sprites}
+	report.add('sprite groups', sum(len(group) for group in groups.values()), sum(sys.getsizeof(group.spritedict) for group in groups.values()), ', '.join(f'{name} {len(group)}' for name, group in groups.items()))
+	report.add('camera layers', len(camera.ground_tiles) + len(camera.top_tiles), sum(sys.getsizeof(item) for item in (camera.ground_tiles, camera.ground_keys, camera.top_tiles, camera.top_keys, camera.actors)))
+	report.add('layouts', 2, container_size(level.dungeon_layout) + container_size(level.object_layout), f'{len(level.dungeon_layout[0])}x{len(level.dungeon_layout)} tiles')
+	fov_cache = level.field_of_view.cache
+	report.add('fov cache', len(fov_cache), container_size(fov_cache), f'limit {FOV_CACHE_SIZE}')
+	report.add('room index', len(level.room_graph), sys.getsizeof(level.room_index) + container_size(level.room_graph), f'areas, {len(level.awake_enemies)} of {len(enemies)} enemies awake')
+	report.add('walkable regions', level.regions.count(), sys.getsizeof(level.regions.labels), 'labels per tile')
+	report.add('gc frozen', gc.get_freeze_count(), 0, f'thresholds {gc.get_threshold()}, see gcpolicy.py')
+	report.add('sim timers', len(sim_clock.timers), sys.getsizeof(sim_clock.timers), f'{sim_clock.pending()} pending, {sim_clock.fired} fired')
+	report.add('spatial hash', len(level.entity_hash.cells), container_size(level.entity_hash.cells), 'cells')
+	if telemetry.frame_telemetry is not None:
+		report.add('telemetry buffer', telemetry.frame_telemetry.capacity, telemetry.frame_telemetry.frames.nbytes)
+	return report
+
+
+def print_modules(snapshot, limit=15):
+	# tracemalloc statistics folded from files into modules
+	totals = {}
+	for stat in snapshot.statistics('filename'):
+		label = module_label(stat.traceback[0].filename)
+		size, count = totals.get(label, (0, 0))
+		totals[label] = (size + stat.size, count + stat.count)
+	print(f'{"python allocations by module":<32} {"blocks":>9} {"KB":>10}')
+	for label, (size, count) in sorted(totals.items(), key=lambda item: -item[1][0])[:limit]:
+		print(f'{label:<32} {count:>9} {size / 1024:>10.1f}')
+
+
+def print_diff(old, new, key_type='filename', limit=15):
+	# filename diffs are folded into modules like print_modules, lineno diffs are shown as they are
+	changes = {}
+	for stat in compare_snapshots(old, new, key_type):
+		frame = stat.traceback[0]
+		where = module_label(frame.filename) + (f':{frame.lineno}' if key_type == 'lineno' else '')
+		size, count = changes.get(where, (0, 0))
+		changes[where] = (size + stat.size_diff, count + stat.count_diff)
+	print(f'{"change between snapshots":<60} {"KB":>10} {"blocks":>8}')
+	for where, (size, count) in sorted(changes.items(), key=lambda item: -abs(item[1][0]))[:limit]:
+		print(f'{where:<60} {size / 1024:>+10.1f} {count:>+8}')
+
+
+def compare_snapshots(old, new, key_type):
+	# Biggest changes first, without the tracer's own allocations
+	ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')]
+	return new.filter_traces(ignore).compare_to(old.filter_traces(ignore), key_type)
+
+
+class MemoryMonitor:
+	# Backs the hotkey: each press prints the report, saves a snapshot and diffs it with the last one
+	def __init__(self, snapshot_dir=MEMORY_SNAPSHOT_DIR):
+		self.snapshot_dir = snapshot_dir
+		self.previous = None
+		self.count = 0
+
+	def report(self, level, postfx=None):
+		gc.collect()
+		build_report(level, postfx).print()
+		if not tracemalloc.is_tracing():
+			print('tracemalloc is off, start the game with --memory-trace for per-module numbers')
+			return
+		snapshot = tracemalloc.take_snapshot()
+		print_modules(snapshot)
+		os.makedirs(self.snapshot_dir, exist_ok=True)
+		path = os.path.join(self.snapshot_dir, f'snapshot-{os.getpid()}-{self.count}.snap')
+		snapshot.dump(path)
+		self.count += 1
+		print(f'Snapshot saved to {path}')
+		if self.previous is not None:
+			print_diff(self.previous, snapshot)
+		self.previous = snapshot
+
+
+def generations(count, seed=1):
+	# Build, run briefly and tear down count levels; whatever survives a generation shows up in the diff
+	os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+	os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+	import contextlib
+	import pygame
+	from level import Level
+	from replay import InputState
+	from timestep import sim_clock
+
+	pygame.init()
+	pygame.display.set_mode((WIDTH, HEIGHT))
+	tracemalloc.start(MEMORY_TRACE_FRAMES)
+	first = None
+	for generation in range(count):
+		with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+			level = Level(seed + generation)
+			for _ in range(60):
+				sim_clock.advance(1000 / TICK_RATE)
+				level.update(InputState())
+			level.draw()
+		if generation == count - 1:
+			build_report(level).print()
+		level.close()
+		level.visible_sprites.empty()
+		del level
+		gc.collect()
+		if first is None:
+			first = tracemalloc.take_snapshot()
+	last = tracemalloc.take_snapshot()
+	print(f'\nafter {count} generations:')
+	print_diff(first, last)
+	print()
+	print_diff(first, last, 'lineno', limit=10)
+
+
+if __name__ == '__main__':
+	if len(sys.argv) >= 4 and sys.argv[1] == 'diff':
+		key_type = 'lineno' if '--lines' in sys.argv else 'filename'
+		print_diff(tracemalloc.Snapshot.load(sys.argv[2]), tracemalloc.Snapshot.load(sys.argv[3]), key_type)
+	elif len(sys.argv) >= 2 and sys.argv[1] == 'generations':
+		generations(int(sys.argv[2]) if len(sys.argv) > 2 else 5)
+	else:
+		print('usage: python memory.py diff A.snap B.snap [--lines] | generations [COUNT]')
+		sys.exit(1)
@@ -0,0 +1,136 @@
+import os
+import re
+import numpy as np
+import pygame
+from settings import *
+from assets import load_image
+from scaling import scaled_frame
+
+_animations = {}  # particle name -> list of frames, shared by every particle system
+
+
+def load_animation(name):
+	# Frames of graphics/particles/<name>, or of its frames/ folder when it has one
+	if name not in _animations:
+		directory = f'{PARTICLE_DIR}/{name}'
+		if os.path.isdir(f'{directory}/frames'):
+			directory += '/frames'
+		names = [file for file in os.listdir(directory) if file.lower().endswith('.png')]
+		names.sort(key=lambda file: int(re.findall(r'\d+', file)[-1]))
+		_animations[name] = [load_image(f'{directory}/{file}') for file in names]
+	return _animations[name]
+
+
+class ParticleSystem:
+	"""
+	Short lived animated effects kept in preallocated NumPy arrays: position,
+	velocity, age, lifetime and animation per slot. Updating is a handful of
+	array operations whatever the particle count, and every visible particle
+	is drawn with a single Surface.blits call.
+	"""
+
+	def __init__(self, capacity=PARTICLE_CAPACITY):
+		self.capacity = capacity
+		self.position = np.zeros((capacity, 2), dtype=np.float32)  # centre, world pixels
+		self.velocity = np.zeros((capacity, 2), dtype=np.float32)  # pixels per tick
+		self.age = np.zeros(capacity, dtype=np.float32)  # ms
+		self.lifetime = np.ones(capacity, dtype=np.float32)  # ms
+		self.animation = np.zeros(capacity, dtype=np.int16)
+		self.alive = np.zeros(capacity, dtype=bool)
+		self.dropped = 0  # particles not spawned because every slot was taken
+		self.limit = capacity  # most particles alive at once, lowered by the quality tier
+
+		# per animation id: frames, frame count and half the frame size
+		self.animation_ids = {}
+		self.frames = []
+		self.frame_counts = np.zeros(0, dtype=np.int32)
+		self.half_sizes = np.zeros((0, 2), dtype=np.float32)
+
+	def animation_id(self, name):
+		if name not in self.animation_ids:
+			frames = load_animation(name)
+			self.animation_ids[name] = len(self.frames)
+			self.frames.append(frames)
+			self.frame_counts = np.append(self.frame_counts, len(frames))
+			half_size = np.array([[frames[0].get_width() / 2, frames[0].get_height() / 2]], dtype=np.float32)
+			self.half_sizes = np.vstack((self.half_sizes, half_size))
+		return self.animation_ids[name]
+
+	def emit(self, name, pos, count=1, velocity=(0, 0), spread=0.0, scatter=0, lifetime=None):
+		"""
+		Spawns count particles of an animation centred on pos. velocity is in
+		pixels per tick, spread rotates it by up to that many degrees either
+		way and scatter jitters the start position by up to that many pixels.
+		"""
+		if self.limit < self.capacity:
+			slots = np.flatnonzero(~self.alive)[:max(0, min(count, self.limit - self.live_count()))]
+		else:
+			slots = np.flatnonzero(~self.alive)[:count]
+		self.dropped += count - len(slots)
+		if len(slots) == 0:
+			return
+		animation = self.animation_id(name)
+		count = len(slots)
+
+		angles = np.radians(np.random.uniform(-spread, spread, count)) if spread else np.zeros(count)
+		cos, sin = np.cos(angles), np.sin(angles)
+		self.velocity[slots, 0] = velocity[0] * cos - velocity[1] * sin
+		self.velocity[slots, 1] = velocity[0] * sin + velocity[1] * cos
+		self.position[slots] = pos
+		if scatter:
+			self.position[slots] += np.random.uniform(-scatter, scatter, (count, 2))
+		self.age[slots] = 0
+		self.lifetime[slots] = lifetime or self.frame_counts[animation] * PARTICLE_FRAME_MS
+		self.animation[slots] = animation
+		self.alive[slots] = True
+
+	def update(self, step_ms=1000 / TICK_RATE):
+		# One simulation tick for every particle at once
+		self.position += self.velocity
+		self.age += step_ms
+		self.alive &= self.age < self.lifetime
+
+	def draw(self, surface, offset, scale=1):
+		# scale is the camera's, see YSortCameraGroup.set_view
+		live = np.flatnonzero(self.alive)
+		if len(live) == 0:
+			return
+		animation = self.animation[live]
+		half_size = self.half_sizes[animation]
+		topleft = (self.position[live] - half_size) * scale - (offset.x * scale, offset.y * scale)
+		half_size = half_size * scale
+
+		# cull against the camera, anything touching the screen is drawn
+		width, height = surface.get_size()
+		on_screen = ((topleft[:, 0] < width) & (topleft[:, 1] < height) &
+					 (topleft[:, 0] + half_size[:, 0] * 2 > 0) & (topleft[:, 1] + half_size[:, 1] * 2 > 0))
+		if not on_screen.any():
+			return
+		live, animation, topleft = live[on_screen], animation[on_screen], topleft[on_screen].astype(np.int32)
+		frame = np.minimum((self.age[live] / self.lifetime[live] * self.frame_counts[animation]).astype(np.int32), self.frame_counts[animation] - 1)
+
+		frames = self.frames
+		surface.blits([(scaled_frame(frames[a][f], scale), (x, y)) for a, f, x, y in zip(animation.tolist(), frame.tolist(), topleft[:, 0].tolist(), topleft[:, 1].tolist())], doreturn=False)
+
+	def clear(self):
+		self.alive[:] = False
+
+	def live_count(self):
+		return int(self.alive.sum())
+
+
+particle_system = None
+
+
+def init_particles():
+	global particle_system
+	if particle_system is None:
+		particle_system = ParticleSystem()
+	particle_system.clear()
+	return particle_system
+
+
+def emit_particles(name, pos, count=1, velocity=(0, 0), spread=0.0, scatter=0, lifetime=None):
+	# Safe to call from anywhere, does nothing until init_particles() has run
+	if particle_system is not None:
+		particle_system.emit(name, pos, count, velocity, spread, scatter, lifetime)
@@ -0,0 +1,70 @@
+"""
+Compares the path workers' two searches on one generated layout: A* tile
+by tile over the whole map, and the portal graph (hpa.py) planning over
+rooms and corridor chunks. Only the layout is built, no display.
+
+	python path_bench.py --map-size 512 --cells 800 --queries 200
+"""
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import contextlib
+import random
+import time
+import numpy as np
+from settings import *
+from dungeon import DungeonLayout
+from pathfinding import snapshot_layout, astar
+from hpa import PortalGraph
+
+
+def timed(function, *args, **kwargs):
+	start = time.perf_counter()
+	result = function(*args, **kwargs)
+	return result, (time.perf_counter() - start) * 1000
+
+
+def run(map_size, cell_count, queries, seed, chunk_size, refine_tiles):
+	with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+		dungeon = DungeonLayout(seed, map_size, map_size, cell_count)
+		dungeon.create_generation_pipeline().run()
+	grid = snapshot_layout(dungeon.dungeon_layout)
+	portals, build_ms = timed(PortalGraph, grid, [tuple(room.rect) for room in dungeon.rooms], chunk_size, refine_tiles)
+	print(f'{map_size}x{map_size}, {len(dungeon.rooms)} rooms: {portals.cluster_count} clusters, {portals.portal_count()} portals, built in {build_ms:.0f} ms')
+
+	# pairs of floor tiles in the same region, so every search has an answer
+	floor = [(x, y) for y, row in enumerate(grid) for x, tile in enumerate(row) if tile == ' ']
+	rng = random.Random(seed)
+	pairs = []
+	while len(pairs) < queries:
+		start, goal = rng.choice(floor), rng.choice(floor)
+		if dungeon.regions.connected(start, goal):
+			pairs.append((start, goal))
+
+	stats = {name: np.zeros(queries) for name in ('astar_ms', 'hpa_ms', 'whole_ms', 'distance', 'ratio')}
+	for index, (start, goal) in enumerate(pairs):
+		best, stats['astar_ms'][index] = timed(astar, grid, start, goal)
+		_, stats['hpa_ms'][index] = timed(portals.find_path, start, goal)
+		whole, stats['whole_ms'][index] = timed(portals.find_path, start, goal, whole=True)
+		stats['distance'][index] = len(best) - 1
+		stats['ratio'][index] = (len(whole) - 1) / max(len(best) - 1, 1)
+	return stats
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark tile A* against the portal graph')
+	parser.add_argument('--map-size', type=int, default=512, help='map width and height in tiles')
+	parser.add_argument('--cells', type=int, default=800, help='cells scattered before rooms are picked')
+	parser.add_argument('--queries', type=int, default=200, help='random start and goal pairs')
+	parser.add_argument('--seed', type=int, default=1)
+	parser.add_argument('--chunk-size', type=int, default=HPA_CHUNK_SIZE)
+	parser.add_argument('--refine', type=int, default=HPA_REFINE_TILES, help='tiles handed back per query')
+	args = parser.parse_args()
+
+	stats = run(args.map_size, args.cells, args.queries, args.seed, args.chunk_size, args.refine)
+	print(f'{args.queries} queries, mean distance {stats["distance"].mean():.0f} tiles, longest {stats["distance"].max():.0f}')
+	print(f'{"search":<28} {"mean ms":>9} {"p95 ms":>9} {"max ms":>9}')
+	for name, label in (('astar_ms', 'A* over tiles'), ('hpa_ms', f'portals, first {args.refine} tiles'), ('whole_ms', 'portals, whole path')):
+		print(f'{label:<28} {stats[name].mean():>9.3f} {np.percentile(stats[name], 95):>9.3f} {stats[name].max():>9.3f}')
+	print(f'whole portal path vs shortest: {stats["ratio"].mean():.3f}x mean, {stats["ratio"].max():.3f}x worst')
@@ -0,0 +1,126 @@
+import heapq
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from hpa import PortalGraph
+
+# Kept free of pygame so a forked worker process (the default on Linux) needs
+# nothing else loaded. Under the spawn start method (Windows, macOS) each
+# worker also re-imports the game's main module as __mp_main__, pygame,
+# level and the rest of main.py's imports with it.
+
+_grid = None  # read-only walkability snapshot owned by each worker
+_portals = None  # the worker's PortalGraph of that snapshot, None searches tile by tile
+
+
+def snapshot_layout(dungeon_layout):
+	# Immutable copy of the layout, one string per row, ' ' is walkable
+	return tuple(''.join(row) for row in dungeon_layout)
+
+
+def astar(grid, start, goal):
+	"""
+	4-connected A* over a layout snapshot with a Manhattan heuristic, the
+	same search nx.astar_path ran on the enemies' grid graphs.
+	Returns the list of tiles from start to goal, or [] when there is none.
+	"""
+	height, width = len(grid), len(grid[0])
+
+	def walkable(tile):
+		x, y = tile
+		return 0 <= x < width and 0 <= y < height and grid[y][x] == ' '
+
+	if not walkable(start) or not walkable(goal):
+		return []
+
+	goal_x, goal_y = goal
+	open_heap = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), 0, start)]
+	came_from = {start: None}
+	cost = {start: 0}
+	while open_heap:
+		_, current_cost, current = heapq.heappop(open_heap)
+		if current == goal:
+			path = []
+			while current is not None:
+				path.append(current)
+				current = came_from[current]
+			path.reverse()
+			return path
+		if current_cost > cost[current]:
+			continue  # stale heap entry
+		x, y = current
+		for neighbour in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+			new_cost = current_cost + 1
+			if walkable(neighbour) and new_cost < cost.get(neighbour, new_cost + 1):
+				cost[neighbour] = new_cost
+				came_from[neighbour] = current
+				heapq.heappush(open_heap, (new_cost + abs(neighbour[0] - goal_x) + abs(neighbour[1] - goal_y), new_cost, neighbour))
+	return []
+
+
+def _init_worker(grid, portal_args=None):
+	global _grid, _portals
+	_grid = grid
+	_portals = PortalGraph(grid, *portal_args) if portal_args is not None else None
+
+
+def _search(start, goal):
+	if _portals is not None:
+		return _portals.find_path(start, goal)
+	return astar(_grid, start, goal)
+
+
+class PathService:
+	"""
+	Runs enemy path searches on a worker pool so the frame never waits on
+	one. Each enemy has at most one search in flight: asking again for the
+	same goal reuses it, asking for a new goal cancels the stale one.
+	Finished paths are picked up with poll() on a later tick.
+
+	In deterministic mode (recording and replay) poll() waits for the answer,
+	so a path always lands on the tick after it was requested.
+	"""
+
+	def __init__(self, workers=1, use_processes=True, deterministic=False):
+		self.workers = workers
+		self.use_processes = use_processes
+		self.deterministic = deterministic
+		self.executor = None
+		self.pending = {}  # enemy id -> (future, goal)
+
+	def set_grid(self, dungeon_layout, portal_args=None):
+		# (Re)start the pool with a snapshot of the final layout; portal_args are
+		# PortalGraph's (rooms, chunk_size, refine_tiles), each worker builds its own
+		self.close()
+		executor_type = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+		self.executor = executor_type(max_workers=self.workers, initializer=_init_worker, initargs=(snapshot_layout(dungeon_layout), portal_args))
+
+	def request(self, enemy_id, start, goal):
+		if self.executor is None:
+			return
+		pending = self.pending.get(enemy_id)
+		if pending is not None:
+			future, pending_goal = pending
+			if pending_goal == goal:
+				return  # coalesce with the search already in flight
+			future.cancel()  # target moved, the old answer is no use
+		self.pending[enemy_id] = (self.executor.submit(_search, start, goal), goal)
+
+	def poll(self, enemy_id):
+		# Finished path for this enemy or None, only blocks in deterministic mode
+		pending = self.pending.get(enemy_id)
+		if pending is None or not (self.deterministic or pending[0].done()):
+			return None
+		future, _ = self.pending.pop(enemy_id)
+		if future.cancelled() or future.exception() is not None:
+			return None
+		return future.result()
+
+	def forget(self, enemy_id):
+		pending = self.pending.pop(enemy_id, None)
+		if pending is not None:
+			pending[0].cancel()
+
+	def close(self):
+		self.pending.clear()
+		if self.executor is not None:
+			self.executor.shutdown(wait=False, cancel_futures=True)
+			self.executor = None
@@ -0,0 +1,69 @@
+import time
+
+
+class StagedPipeline:
+	"""
+	Named stages run in order. A stage is either a plain function or a
+	generator function that yields wherever it is safe to pause; step()
+	runs stages until its time box is used up and the next call resumes
+	exactly where the last one stopped. Time and slices are kept per stage.
+	"""
+
+	def __init__(self, stages):
+		self.stages = stages  # [(name, function)]
+		self.index = 0
+		self.current = None
+		self.timings = {name: 0.0 for name, _ in stages}  # ms
+		self.slices = {name: 0 for name, _ in stages}
+
+	@property
+	def done(self):
+		return self.index >= len(self.stages)
+
+	@property
+	def stage_name(self):
+		return self.stages[self.index][0] if not self.done else 'done'
+
+	@property
+	def progress(self):
+		return self.index / len(self.stages)
+
+	def step(self, budget_ms=None):
+		# Returns True once every stage has finished, budget_ms None runs them all
+		deadline = time.perf_counter() + budget_ms / 1000 if budget_ms is not None else None
+		while not self.done:
+			name, stage = self.stages[self.index]
+			start = time.perf_counter()
+			finished = True
+			if self.current is None:
+				self.current = stage()
+			if self.current is not None:
+				try:
+					while True:
+						next(self.current)
+						if deadline is not None and time.perf_counter() >= deadline:
+							finished = False
+							break
+				except StopIteration:
+					pass
+			self.timings[name] += (time.perf_counter() - start) * 1000
+			self.slices[name] += 1
+			if not finished:
+				return False
+			self.index += 1
+			self.current = None
+			if deadline is not None and time.perf_counter() >= deadline:
+				return self.done
+		return True
+
+	def run(self):
+		self.step()
+
+	def total_ms(self):
+		return sum(self.timings.values())
+
+	def report(self):
+		print(f'{"stage":<14} {"ms":>9} {"slices":>7}')
+		for name, _ in self.stages:
+			print(f'{name:<14} {self.timings[name]:>9.1f} {self.slices[name]:>7}')
+		print(f'{"total":<14} {self.total_ms():>9.1f}')
@@ -1,12 +1,16 @@
 import pygame 
 from settings import *
 from entity import Entity
+from timestep import get_ticks
+from assets import load_image
+from audio import play_sound
+from replay import capture_input
 import math
 
 class Player(Entity):
 	def __init__(self,pos,groups,obstacle_sprites, create_attack, destroy_attack, create_magic):
 		super().__init__(groups)
-		self.image = pygame.transform.scale(pygame.image.load('graphics/player/_Warrior/WalkDown/1.png'), (PLAYER_WIDTH, PLAYER_HEIGHT)).convert_alpha()
+		self.image = load_image('graphics/player/_Warrior/WalkDown/1.png', (PLAYER_WIDTH, PLAYER_HEIGHT))
 		self.rect = self.image.get_rect(topleft = pos)
 		self.hitbox = self.rect.inflate(0,-26)
 		self.is_floor = False
@@ -16,21 +20,20 @@ class Player(Entity):
 		self.attacking = False
 		self.attack_cooldown = 50
 		self.status = 'down'
-		self.attack_time = None
 		self.current_frame = 0
 		self.animation_speed = ANIMATION_SPEED
 
 		self.obstacle_sprites = obstacle_sprites
   
 		# Initialize last_update for animation timing
-		self.last_update = pygame.time.get_ticks()
+		self.last_update = get_ticks()
   
 		# Load animation frames
 		self.animations = {
-			'right': [pygame.transform.scale(pygame.image.load(f'graphics/player/_Warrior/WalkRight/{i}.png'), (PLAYER_WIDTH, PLAYER_HEIGHT)).convert_alpha() for i in range(1,5)],
-			'left': [pygame.transform.scale(pygame.image.load(f'graphics/player/_Warrior/WalkLeft/{i}.png'), (PLAYER_WIDTH, PLAYER_HEIGHT)).convert_alpha() for i in range(1,5)],
-			'up' : [pygame.transform.scale(pygame.image.load(f'graphics/player/_Warrior/WalkUp/{i}.png'), (PLAYER_WIDTH, PLAYER_HEIGHT)).convert_alpha() for i in range(1,5)],
-			'down' : [pygame.transform.scale(pygame.image.load(f'graphics/player/_Warrior/WalkDown/{i}.png'), (PLAYER_WIDTH, PLAYER_HEIGHT)).convert_alpha() for i in range(1,5)]
+			'right': [load_image(f'graphics/player/_Warrior/WalkRight/{i}.png', (PLAYER_WIDTH, PLAYER_HEIGHT)) for i in range(1,5)],
+			'left': [load_image(f'graphics/player/_Warrior/WalkLeft/{i}.png', (PLAYER_WIDTH, PLAYER_HEIGHT)) for i in range(1,5)],
+			'up' : [load_image(f'graphics/player/_Warrior/WalkUp/{i}.png', (PLAYER_WIDTH, PLAYER_HEIGHT)) for i in range(1,5)],
+			'down' : [load_image(f'graphics/player/_Warrior/WalkDown/{i}.png', (PLAYER_WIDTH, PLAYER_HEIGHT)) for i in range(1,5)]
 		}
   
 		# Weapon
@@ -39,7 +42,6 @@ class Player(Entity):
 		self.weapon_index = 0
 		self.weapon = list(weapon_data.keys())[self.weapon_index]
 		self.can_switch_weapon = True
-		self.weapon_switch_time = None
 		self.switch_duration_cooldown = 200
   
 		# magic
@@ -47,7 +49,6 @@ class Player(Entity):
 		self.magic_index = 0
 		self.magic = list(magic_data.keys())[self.magic_index]
 		self.can_switch_magic = True
-		self.magic_switch_time = None
   
 		# Stats
 		self.stats = {'health' : 100, 'energy' : 60, 'attack' : 10, 'magic' : 4, 'speed' : 4}
@@ -56,9 +57,16 @@ class Player(Entity):
 		self.exp = 123
 		self.speed = self.stats['speed']
 
+		# input for the current tick, set by the level; None reads pygame directly
+		self.input_state = None
+
+		# damage timer
+		self.vulnerable = True
+		self.invulnerability_duration = 500
+
 	# Revised player animate method
 	def animate(self):
-		now = pygame.time.get_ticks()
+		now = get_ticks()
 		if self.direction.magnitude() != 0:  # Check if the player is moving
 			if now - self.last_update >= self.animation_speed * 1000:
 				self.last_update = now
@@ -69,13 +77,20 @@ class Player(Entity):
 		self.image = self.animations[self.status][int(self.current_frame)]
 
 	
+	def get_damage(self, amount):
+		if self.vulnerable:
+			play_sound('audio/hit.wav', SOUND_PRIORITY_HIGH)
+			self.health = max(self.health - amount, 0)
+			self.vulnerable = False
+			self.start_timer('vulnerable_again', self.invulnerability_duration, self.vulnerable_again)
+
 	def get_full_weapon_damage(self):
 		base_damage = self.stats['attack']
 		weapon_damage = weapon_data[self.weapon]['damage']
 		return base_damage + weapon_damage
  
-	def update_direction_based_on_mouse(self):
-		mouse_x, mouse_y = pygame.mouse.get_pos()
+	def update_direction_based_on_mouse(self, state):
+		mouse_x, mouse_y = state.mouse_pos
 		screen_center_x = WIDTH // 2
 		screen_center_y = HEIGHT // 2
 
@@ -92,38 +107,39 @@ class Player(Entity):
 				self.status = 'up' if mouse_y < screen_center_y else 'down'
 	
 	def input(self):
-		self.update_direction_based_on_mouse()
+		# recorded or live, both go through the same InputState
+		state = self.input_state if self.input_state is not None else capture_input()
+		self.update_direction_based_on_mouse(state)
 
 		# Movement keys
-		keys = pygame.key.get_pressed()
 		if not self.attacking:
-			if keys[pygame.K_w]:
+			if state.key(pygame.K_w):
 				self.direction.y = -1
-			elif keys[pygame.K_s]:
+			elif state.key(pygame.K_s):
 				self.direction.y = 1
 			else:
 				self.direction.y = 0
 
-			if keys[pygame.K_d]:
+			if state.key(pygame.K_d):
 				self.direction.x = 1
-			elif keys[pygame.K_a]:
+			elif state.key(pygame.K_a):
 				self.direction.x = -1
 			else:
 				self.direction.x = 0
    
 		# Attack input (left mouse button)
-		if pygame.mouse.get_pressed()[0] and not self.attacking:
+		if state.mouse_pressed(0) and not self.attacking:
 			self.attacking = True
-			self.attack_time = pygame.time.get_ticks()
+			self.start_timer('attack_ready', self.attack_cooldown + weapon_data[self.weapon]['cooldown'], self.attack_ready)
 			self.create_attack()
 			print(f'direction while attacking: {self.status}')
 			
 			print('attack')
 
 		# Magic input (right mouse button)
-		if pygame.mouse.get_pressed()[2] and not self.attacking:
+		if state.mouse_pressed(2) and not self.attacking:
 			self.attacking = True
-			self.attack_time = pygame.time.get_ticks()
+			self.start_timer('attack_ready', self.attack_cooldown + weapon_data[self.weapon]['cooldown'], self.attack_ready)
 			style = list(magic_data.keys())[self.magic_index]
 			strength = list(magic_data.values())[self.magic_index]['strength'] + self.stats['magic']
 			cost = list(magic_data.values())[self.magic_index]['cost']
@@ -131,9 +147,9 @@ class Player(Entity):
 			print('magic')
    
 		# switch weapon
-		if keys[pygame.K_e] and self.can_switch_weapon:
+		if state.key(pygame.K_e) and self.can_switch_weapon:
 			self.can_switch_weapon = False
-			self.weapon_switch_time = pygame.time.get_ticks()
+			self.start_timer('weapon_switch_ready', self.switch_duration_cooldown, self.weapon_switch_ready)
 			if self.weapon_index < len(list(weapon_data.keys())) - 1:
 				self.weapon_index += 1
 			else:
@@ -141,9 +157,9 @@ class Player(Entity):
 			self.weapon = list(weapon_data.keys())[self.weapon_index]
 
 		# switch weapon backward
-		if keys[pygame.K_q] and self.can_switch_weapon:
+		if state.key(pygame.K_q) and self.can_switch_weapon:
 			self.can_switch_weapon = False
-			self.weapon_switch_time = pygame.time.get_ticks()
+			self.start_timer('weapon_switch_ready', self.switch_duration_cooldown, self.weapon_switch_ready)
 			if self.weapon_index > 0:
 				self.weapon_index -= 1
 			else:
@@ -151,9 +167,9 @@ class Player(Entity):
 			self.weapon = list(weapon_data.keys())[self.weapon_index]
    
 		# switch magic
-		if keys[pygame.K_c] and self.can_switch_magic:
+		if state.key(pygame.K_c) and self.can_switch_magic:
 			self.can_switch_magic = False
-			self.magic_switch_time = pygame.time.get_ticks()
+			self.start_timer('magic_switch_ready', self.switch_duration_cooldown, self.magic_switch_ready)
 			if self.magic_index < len(list(magic_data.keys())) - 1:
 				self.magic_index += 1
 			else:
@@ -161,34 +177,37 @@ class Player(Entity):
 			self.magic = list(magic_data.keys())[self.magic_index]
 
 		# switch magic backward
-		if keys[pygame.K_x] and self.can_switch_magic:
+		if state.key(pygame.K_x) and self.can_switch_magic:
 			self.can_switch_magic = False
-			self.magic_switch_time = pygame.time.get_ticks()
+			self.start_timer('magic_switch_ready', self.switch_duration_cooldown, self.magic_switch_ready)
 			if self.magic_index > 0:
 				self.magic_index -= 1
 			else:
 				self.magic_index = len(list(magic_data.keys())) - 1
 			self.magic = list(magic_data.keys())[self.magic_index]
 
-	def cooldowns(self):
-		current_time = pygame.time.get_ticks()
-  
-		if self.attacking:
-			if current_time - self.attack_time >= self.attack_cooldown + weapon_data[self.weapon]['cooldown']:
-				self.attacking = False
-				self.destroy_attack()
+	# cooldowns, run by the timers started above when they run out
+	def attack_ready(self):
+		self.attacking = False
+		self.destroy_attack()
+
+	def weapon_switch_ready(self):
+		self.can_switch_weapon = True
+
+	def magic_switch_ready(self):
+		self.can_switch_magic = True
 
-		if not self.can_switch_weapon:
-			if current_time - self.weapon_switch_time >= self.switch_duration_cooldown:
-				self.can_switch_weapon = True
+	def vulnerable_again(self):
+		self.vulnerable = True
 
-		if not self.can_switch_magic:
-			if current_time - self.magic_switch_time >= self.switch_duration_cooldown:
-				self.can_switch_magic = True
+	def energy_recovery(self):
+		# spells cost energy, it trickles back every tick
+		if self.energy < self.stats['energy']:
+			self.energy = min(self.energy + 0.01 * self.stats['magic'], self.stats['energy'])
 
 	def update(self):
 		self.input()
-		self.cooldowns()
+		self.energy_recovery()
 		if not self.attacking:
 			self.move(self.speed)
 
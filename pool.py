@@ -0,0 +1,57 @@
+from timestep import sim_clock
+
+pools = {}  # name -> SpritePool, for the allocation report
+
+
+class SpritePool:
+	"""
+	Keeps released sprites for reuse. acquire() hands out a pooled sprite,
+	calls its reset() with the new arguments and puts it back in its groups,
+	so surfaces, rects and vectors survive between lives; only an empty pool
+	builds a new sprite with create(groups, *args). release() calls the
+	sprite's on_release() when it has one, so a free sprite can let go of
+	the level it was part of.
+	"""
+
+	def __init__(self, name, create):
+		self.name = name
+		self.create = create
+		self.free = []
+		self.created = 0
+		self.reused = 0
+		self.released = 0
+		pools[name] = self
+
+	def acquire(self, groups, *args):
+		if self.free:
+			sprite = self.free.pop()
+			sprite.reset(*args)
+			sprite.add(*groups)
+			self.reused += 1
+		else:
+			sprite = self.create(groups, *args)
+			self.created += 1
+		return sprite
+
+	def release(self, sprite):
+		sprite.kill()
+		on_release = getattr(sprite, 'on_release', None)
+		if on_release:
+			on_release()
+		self.free.append(sprite)
+		self.released += 1
+
+	def in_use(self):
+		return self.created - len(self.free)
+
+
+def pool_stats():
+	# (name, created, reused, free, new sprites per simulated minute) for every pool
+	minutes = sim_clock.ticks / 60000
+	return [(pool.name, pool.created, pool.reused, len(pool.free), pool.created / minutes if minutes else 0.0) for pool in pools.values()]
+
+
+def print_pool_stats():
+	print(f'{"pool":<10} {"created":>8} {"reused":>8} {"free":>6} {"new/min":>8}')
+	for name, created, reused, free, per_minute in pool_stats():
+		print(f'{name:<10} {created:>8} {reused:>8} {free:>6} {per_minute:>8.2f}')
@@ -0,0 +1,88 @@
+import os
+import numpy as np
+import pygame
+from settings import *
+
+
+def distance_from_center(size):
+	# (width, height) array of each pixel's distance to the screen centre, surfarray layout
+	width, height = size
+	x = np.arange(width, dtype=np.float32) - width / 2
+	y = np.arange(height, dtype=np.float32) - height / 2
+	return np.sqrt(x[:, None] ** 2 + y[None, :] ** 2)
+
+
+def vignette_alpha(size, intensity):
+	# Same falloff the old per-pixel set_at loop in main.py produced
+	width, height = size
+	max_distance = (width ** 2 + height ** 2) ** 0.5
+	return np.minimum(intensity * distance_from_center(size) / max_distance, 255)
+
+
+def darkness_alpha(size, intensity, light_radius=DARKNESS_LIGHT_RADIUS):
+	# Clear circle around the player fading to intensity alpha at the screen corners
+	width, height = size
+	outer = (width ** 2 + height ** 2) ** 0.5 / 2
+	falloff = np.clip((distance_from_center(size) - light_radius) / max(outer - light_radius, 1), 0, 1)
+	return falloff * min(intensity, 255)
+
+
+class PostProcessing:
+	"""
+	Full-screen overlays built with NumPy once per (effect, resolution,
+	intensity) and composited into a single surface, so applying them costs
+	one alpha blit per frame.
+	"""
+	effects = {'vignette': vignette_alpha, 'darkness': darkness_alpha}
+
+	def __init__(self, cache_dir=POSTFX_CACHE_DIR):
+		self.display_surface = pygame.display.get_surface()
+		self.cache_dir = cache_dir
+		self.alpha_cache = {}  # (effect, size, intensity) -> float alpha array
+		self.enabled = {}  # effect -> intensity
+		self.overlay = None
+
+	def load_alpha(self, effect, size, intensity):
+		key = (effect, size, intensity)
+		if key not in self.alpha_cache:
+			path = None
+			if self.cache_dir:
+				path = os.path.join(self.cache_dir, f'{effect}_{size[0]}x{size[1]}_{intensity}.npy')
+			if path and os.path.exists(path):
+				alpha = np.load(path)
+			else:
+				alpha = self.effects[effect](size, intensity).astype(np.float32)
+				if path:
+					os.makedirs(self.cache_dir, exist_ok=True)
+					np.save(path, alpha)
+			self.alpha_cache[key] = alpha
+		return self.alpha_cache[key]
+
+	def enable(self, effect, intensity):
+		self.enabled[effect] = intensity
+		self.overlay = None
+
+	def disable(self, effect):
+		self.enabled.pop(effect, None)
+		self.overlay = None
+
+	def build_overlay(self):
+		size = self.display_surface.get_size()
+		# Stacking black layers: remaining light is the product of what each one lets through
+		transmitted = np.ones(size, dtype=np.float32)
+		for effect, intensity in self.enabled.items():
+			transmitted *= 1 - self.load_alpha(effect, size, intensity) / 255
+
+		overlay = pygame.Surface(size, pygame.SRCALPHA)
+		overlay.fill((0, 0, 0, 255))
+		pixels = pygame.surfarray.pixels_alpha(overlay)
+		pixels[:] = ((1 - transmitted) * 255).astype(np.uint8)
+		del pixels  # unlock the surface
+		return overlay
+
+	def apply(self):
+		if not self.enabled:
+			return
+		if self.overlay is None or self.overlay.get_size() != self.display_surface.get_size():
+			self.overlay = self.build_overlay()
+		self.display_surface.blit(self.overlay, (0, 0))
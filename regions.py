@@ -0,0 +1,107 @@
+# Kept free of pygame, like pathfinding.py, so bulk_generate.py workers stay light.
+
+
+class WalkableRegions:
+	"""
+	Labels the 4-connected regions of ' ' tiles, the same tiles the A*
+	searches may walk on. connected() is then a lookup, so a search that
+	can only fail is never started. update_tile() keeps the labels right
+	when a single tile changes, e.g. a door marking its bottom row.
+	"""
+
+	def __init__(self):
+		self.width = 0
+		self.height = 0
+		self.labels = []  # row-major, 0 is not walkable
+		self.next_label = 1
+
+	def label(self, dungeon_layout):
+		self.height, self.width = len(dungeon_layout), len(dungeon_layout[0])
+		self.labels = [0] * (self.width * self.height)
+		self.next_label = 1
+		for y, row in enumerate(dungeon_layout):
+			for x, tile in enumerate(row):
+				if tile == ' ' and not self.labels[y * self.width + x]:
+					self.flood(dungeon_layout, x, y, self.next_label)
+					self.next_label += 1
+
+	def flood(self, dungeon_layout, x, y, region, within=0):
+		# Give region to every walkable tile reachable from (x, y) whose label is within
+		width, height, labels = self.width, self.height, self.labels
+		labels[y * width + x] = region
+		stack = [(x, y)]
+		while stack:
+			x, y = stack.pop()
+			for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+				if 0 <= nx < width and 0 <= ny < height and labels[ny * width + nx] == within and dungeon_layout[ny][nx] == ' ':
+					labels[ny * width + nx] = region
+					stack.append((nx, ny))
+
+	def region(self, tile):
+		x, y = tile
+		if 0 <= x < self.width and 0 <= y < self.height:
+			return self.labels[y * self.width + x]
+		return 0
+
+	def connected(self, start, goal):
+		region = self.region(start)
+		return region != 0 and region == self.region(goal)
+
+	def room_region(self, room):
+		# The region of the room's centre, or of any walkable tile in it when the centre is not
+		region = self.region(room.rect.center)
+		if region:
+			return region
+		for y in range(room.rect.top, room.rect.bottom):
+			for x in range(room.rect.left, room.rect.right):
+				region = self.region((x, y))
+				if region:
+					return region
+		return 0
+
+	def count(self):
+		return len(set(self.labels) - {0})
+
+	def locally_connected(self, x, y):
+		# True when the walkable neighbours of (x, y) still meet inside its 3x3 box, then closing it splits nothing
+		box = {(nx, ny) for ny in (y - 1, y, y + 1) for nx in (x - 1, x, x + 1) if (nx, ny) != (x, y) and self.region((nx, ny))}
+		sides = [tile for tile in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)) if tile in box]
+		if len(sides) <= 1:
+			return True
+		seen = {sides[0]}
+		stack = [sides[0]]
+		while stack:
+			cx, cy = stack.pop()
+			for tile in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)):
+				if tile in box and tile not in seen:
+					seen.add(tile)
+					stack.append(tile)
+		return all(tile in seen for tile in sides)
+
+	def update_tile(self, dungeon_layout, x, y):
+		# Call after dungeon_layout[y][x] changed
+		index = y * self.width + x
+		old = self.labels[index]
+		if dungeon_layout[y][x] == ' ':
+			if old:
+				return
+			# opened: join the neighbouring regions, merging them if there are several
+			neighbours = {self.region(tile) for tile in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1))} - {0}
+			if not neighbours:
+				self.labels[index] = self.next_label
+				self.next_label += 1
+				return
+			region = min(neighbours)
+			self.labels[index] = region
+			others = neighbours - {region}
+			if others:
+				self.labels = [region if label in others else label for label in self.labels]
+		elif old:
+			# closed: the region may have split, flood it again from each side
+			self.labels[index] = 0
+			if self.locally_connected(x, y):
+				return
+			for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+				if self.region((nx, ny)) == old:
+					self.flood(dungeon_layout, nx, ny, self.next_label, within=old)
+					self.next_label += 1
@@ -0,0 +1,108 @@
+import struct
+import pygame
+from settings import *
+
+# Keys Player.input reads, one bit each in the recorded key mask
+RECORDED_KEYS = [pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d, pygame.K_q, pygame.K_e, pygame.K_c, pygame.K_x]
+KEY_BITS = {key: 1 << bit for bit, key in enumerate(RECORDED_KEYS)}
+
+MAGIC = b'VHRP'
+# Recordings only play back on the version they were made with:
+# 2: spawns moved after the wall fix, a seed builds a different level than in 1
+# 3: enemies drop paths to unreachable goals at once
+# 4: paths planned over rooms
+# 5: enemies far from the player sleep
+# 6: cooldowns and wandering run on sim_clock timers
+# 7: short paths and paths into a neighbouring cluster skip the portals
+# 8: enemies in areas that could be on screen stay awake
+VERSION = 8
+HEADER = struct.Struct('<4sBQH')  # magic, version, level seed, tick rate
+RUN = struct.Struct('<HBhhB')  # ticks the state lasted, key mask, mouse x, mouse y, button mask
+
+
+class InputState:
+	"""
+	Everything Player.input looks at during one simulation tick. Live play
+	captures it from pygame, replays read it back from a recording.
+	"""
+	__slots__ = ('key_mask', 'mouse_pos', 'button_mask')
+
+	def __init__(self, key_mask=0, mouse_pos=(0, 0), button_mask=0):
+		self.key_mask = key_mask
+		self.mouse_pos = mouse_pos
+		self.button_mask = button_mask
+
+	def key(self, key):
+		return bool(self.key_mask & KEY_BITS[key])
+
+	def mouse_pressed(self, button):
+		# button uses pygame.mouse.get_pressed indices: 0 left, 2 right
+		return bool(self.button_mask & (1 << button))
+
+	def packed(self):
+		return (self.key_mask, self.mouse_pos[0], self.mouse_pos[1], self.button_mask)
+
+
+def capture_input():
+	keys = pygame.key.get_pressed()
+	buttons = pygame.mouse.get_pressed()
+	key_mask = 0
+	for key, bit in KEY_BITS.items():
+		if keys[key]:
+			key_mask |= bit
+	button_mask = (1 if buttons[0] else 0) | (4 if buttons[2] else 0)
+	return InputState(key_mask, pygame.mouse.get_pos(), button_mask)
+
+
+class InputRecorder:
+	# Run-length encoded: holding a key for a second costs one record, not sixty
+	def __init__(self, path, seed, tick_rate):
+		self.file = open(path, 'wb')
+		self.file.write(HEADER.pack(MAGIC, VERSION, seed, tick_rate))
+		self.current = None
+		self.count = 0
+
+	def record(self, state):
+		packed = state.packed()
+		if packed == self.current and self.count < 0xFFFF:
+			self.count += 1
+			return
+		self.flush_run()
+		self.current = packed
+		self.count = 1
+
+	def flush_run(self):
+		if self.count:
+			self.file.write(RUN.pack(self.count, *self.current))
+
+	def close(self):
+		if not self.file.closed:
+			self.flush_run()
+			self.file.close()
+
+
+class InputReplay:
+	def __init__(self, path):
+		with open(path, 'rb') as replay_file:
+			data = replay_file.read()
+		magic, version, self.seed, self.tick_rate = HEADER.unpack_from(data)
+		if magic != MAGIC or version != VERSION:
+			raise ValueError(f'{path} is not a version {VERSION} input recording')
+		if self.tick_rate != TICK_RATE:
+			# a tick is a different slice of time at another rate, the simulation would not repeat
+			raise ValueError(f'{path} was recorded at {self.tick_rate} ticks per second, the game runs at {TICK_RATE}')
+		self.runs = [RUN.unpack_from(data, offset) for offset in range(HEADER.size, len(data), RUN.size)]
+		self.run_index = 0
+		self.remaining = self.runs[0][0] if self.runs else 0
+		self.ticks = sum(run[0] for run in self.runs)
+
+	def next_state(self):
+		# InputState for the next tick, None once the recording is used up
+		while self.remaining == 0:
+			self.run_index += 1
+			if self.run_index >= len(self.runs):
+				return None
+			self.remaining = self.runs[self.run_index][0]
+		self.remaining -= 1
+		_, key_mask, mouse_x, mouse_y, button_mask = self.runs[self.run_index]
+		return InputState(key_mask, (mouse_x, mouse_y), button_mask)
@@ -0,0 +1,183 @@
+from collections import OrderedDict
+from math import ceil
+import time
+from weakref import WeakKeyDictionary
+import pygame
+from settings import *
+
+# scale -> {frame: scaled copy}, weak so frames that are dropped take their copies with them
+_scaled = {}
+_flipped = WeakKeyDictionary()
+
+
+def resize(surface, size):
+	# Smooth when shrinking, like a mipmap level, nearest when growing so the pixel art stays sharp
+	if size[0] < surface.get_width():
+		return pygame.transform.smoothscale(surface, size)
+	return pygame.transform.scale(surface, size)
+
+
+def scaled_frame(image, scale):
+	# The frame at scale, made the first time it is asked for
+	if scale == 1:
+		return image
+	frames = _scaled.setdefault(scale, WeakKeyDictionary())
+	frame = frames.get(image)
+	if frame is None:
+		width, height = image.get_size()
+		frame = frames[image] = resize(image, (max(1, round(width * scale)), max(1, round(height * scale))))
+	return frame
+
+
+def flipped(image):
+	# One mirrored copy per frame, shared by everything facing left
+	mirror = _flipped.get(image)
+	if mirror is None:
+		mirror = _flipped[image] = pygame.transform.flip(image, True, False)
+	return mirror
+
+
+def cached_frames():
+	return [frame for frames in _scaled.values() for frame in frames.values()] + list(_flipped.values())
+
+
+class ChunkCache:
+	"""
+	Tiles never move, so away from scale 1 they are drawn from square chunks
+	of chunk_tiles tiles, composed and scaled once per scale like a mipmap
+	level and then blitted whole. The least recently drawn chunks are dropped
+	once the cache holds more than budget_mb.
+
+	Building a chunk takes a couple of milliseconds, too long to build a whole
+	screen of them in the frame after a zoom or quality change. So a copy
+	of the chunks around the player is kept at the lowest scale the camera
+	can reach (the floor, built while the level loads and topped up as the
+	player moves), and once a frame has spent its build time the visible part
+	of each missing chunk is stretched from the floor until its turn comes.
+	"""
+
+	def __init__(self, chunk_tiles=RENDER_CHUNK_TILES, budget_mb=RENDER_CHUNK_CACHE_MB):
+		self.chunk_size = chunk_tiles * TILESIZE  # world pixels
+		self.budget = budget_mb * 1024 * 1024
+		self.tiles = {}  # (layer, column, row) -> [(image, position in the chunk)] in draw order
+		self.chunks = OrderedDict()  # (layer, scale, column, row) -> surface, None when empty, oldest first
+		self.bytes = 0
+		self.built = 0
+		self.floor_scale = None
+		self.floor = {}  # (layer, column, row) -> surface at floor_scale, None when empty
+		self.floor_centre = None  # chunk the floor was last trimmed around
+		self.deadline = None  # perf_counter time after which this frame builds no more, None is no limit
+
+	def set_tiles(self, layer, tiles):
+		# tiles in the order they are drawn; chunks already built for the layer are thrown away
+		size = self.chunk_size
+		for key in [key for key in self.tiles if key[0] == layer]:
+			del self.tiles[key]
+		for key in [key for key in self.chunks if key[0] == layer]:
+			self.forget(key)
+		for key in [key for key in self.floor if key[0] == layer]:
+			del self.floor[key]
+		for tile in tiles:
+			rect = tile.rect
+			# a tile crossing a chunk edge goes into every chunk it touches
+			for row in range(rect.top // size, (rect.bottom - 1) // size + 1):
+				for column in range(rect.left // size, (rect.right - 1) // size + 1):
+					self.tiles.setdefault((layer, column, row), []).append((tile.image, (rect.x - column * size, rect.y - row * size)))
+
+	def forget(self, key):
+		surface = self.chunks.pop(key)
+		if surface:
+			self.bytes -= surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+	def build(self, layer, scale, column, row):
+		tiles = self.tiles.get((layer, column, row))
+		if not tiles:
+			return None
+		chunk = pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA)
+		chunk.blits(tiles, doreturn=False)
+		span = round(self.chunk_size * scale)
+		self.built += 1
+		return resize(chunk, (span, span)).convert_alpha()
+
+	def begin_frame(self, budget_ms=RENDER_CHUNK_BUILD_MS):
+		self.deadline = time.perf_counter() + budget_ms / 1000
+
+	def chunk(self, layer, scale, column, row):
+		# The chunk, or its floor copy when this frame is out of build time and the floor has one
+		key = (layer, scale, column, row)
+		if key in self.chunks:
+			self.chunks.move_to_end(key)
+			return self.chunks[key]
+		floor = self.floor.get((layer, column, row), False)  # False when the floor doesn't reach here
+		if scale == self.floor_scale and floor is not False:
+			return floor
+		if floor is not False and self.deadline is not None and time.perf_counter() > self.deadline:
+			return floor
+		surface = self.chunks[key] = self.build(layer, scale, column, row)
+		if surface:
+			self.bytes += surface.get_bytesize() * surface.get_width() * surface.get_height()
+			while self.bytes > self.budget and len(self.chunks) > 1:
+				self.forget(next(iter(self.chunks)))
+		return surface
+
+	def collect(self, layer, scale, left, top, width, height, pairs):
+		# (surface, position) pairs for the chunks under a view whose top left is (left, top) in scaled pixels
+		span = round(self.chunk_size * scale)
+		view = pygame.Rect(0, 0, width, height)
+		for row in range(top // span, (top + height) // span + 1):
+			for column in range(left // span, (left + width) // span + 1):
+				position = (column * span - left, row * span - top)
+				surface = self.chunk(layer, scale, column, row)
+				if surface and surface.get_width() != span:
+					surface, position = self.stand_in(surface, span, position, view)
+				if surface:
+					pairs.append((surface, position))
+
+	def stand_in(self, floor, span, position, view):
+		# The part of a floor chunk under view stretched to span, and where it goes; only what shows is scaled
+		visible = view.clip(pygame.Rect(position, (span, span)))
+		if not visible:
+			return None, position
+		ratio = floor.get_width() / span
+		source = pygame.Rect(int((visible.x - position[0]) * ratio), int((visible.y - position[1]) * ratio),
+							 ceil(visible.width * ratio) + 1, ceil(visible.height * ratio) + 1).clip(floor.get_rect())
+		part = pygame.transform.scale(floor.subsurface(source), (round(source.width / ratio), round(source.height / ratio)))
+		return part, (position[0] + round(source.x / ratio), position[1] + round(source.y / ratio))
+
+	def floor_keys(self, area):
+		# (layer, column, row) of every chunk touching area, a rect in world pixels
+		size = self.chunk_size
+		return [(layer, column, row) for layer in ('ground', 'top')
+				for row in range(area.top // size, (area.bottom - 1) // size + 1)
+				for column in range(area.left // size, (area.right - 1) // size + 1)]
+
+	def build_floor(self, scale, area):
+		# Generator, a pipeline stage: the floor for every chunk touching area, one chunk per step
+		if scale != self.floor_scale:
+			self.floor.clear()
+			self.floor_scale = scale
+		for key in self.floor_keys(area):
+			if key not in self.floor:
+				self.floor[key] = self.build(key[0], scale, key[1], key[2])
+				yield
+
+	def top_up_floor(self, area, builds=1):
+		# Keeps the floor under area as the player moves, dropping what is more than an area away
+		if self.floor_scale is None:
+			return
+		centre = (area.centerx // self.chunk_size, area.centery // self.chunk_size)
+		if centre != self.floor_centre:
+			self.floor_centre = centre
+			keep = set(self.floor_keys(area.inflate(area.width, area.height)))
+			for key in [key for key in self.floor if key not in keep]:
+				del self.floor[key]
+		for key in self.floor_keys(area):
+			if builds <= 0:
+				break
+			if key not in self.floor:
+				self.floor[key] = self.build(key[0], self.floor_scale, key[1], key[2])
+				builds -= 1
+
+	def clear(self):
+		self.chunks.clear()
+		self.bytes = 0
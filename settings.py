@@ -5,11 +5,91 @@ import random
 WIDTH    = 1280	
 HEIGHT   = 720
 FPS      = 60
+TICK_RATE = 60
+MAX_CATCHUP_TICKS = 5
 TILESIZE = 32
 SAFETY_MARGIN = 3
 CORRIDOR_WIDTH = 5
 ANIMATION_SPEED = 0.06
 
+# enemy path searches run on a worker pool, 0 workers searches inline
+PATHFINDING_WORKERS = 2
+PATHFINDING_PROCESSES = True
+
+# workers plan long paths over rooms and corridor chunks (HPA*, see hpa.py)
+# and hand back the first HPA_REFINE_TILES tiles, enemies ask again at the end
+PATHFINDING_HIERARCHICAL = True
+HPA_CHUNK_SIZE = 16
+HPA_REFINE_TILES = 24
+
+# enemies more than WAKE_HOPS areas (rooms or corridor pieces) from the player sleep, unless their area
+# reaches into the widest camera view (see ZOOM_LEVELS) grown by the longest notice_radius
+ENEMY_SLEEP = True
+WAKE_HOPS = 2
+
+# camera, the world is drawn at RENDER_SCALE of the window and scaled up once per frame;
+# away from scale 1 tiles come from pre-scaled chunks of RENDER_CHUNK_TILES tiles
+RENDER_SCALE = 1.0
+ZOOM_LEVELS = (0.5, 0.75, 1.0, 1.5)
+ZOOM_START = 1.0
+ZOOM_IN_KEY = pygame.K_EQUALS
+ZOOM_OUT_KEY = pygame.K_MINUS
+RENDER_CHUNK_TILES = 16
+RENDER_CHUNK_CACHE_MB = 64
+RENDER_CHUNK_BUILD_MS = 2  # chunk building per frame, the rest wait drawn stretched from the lowest-resolution copy
+
+# quality tiers from best to cheapest, the governor (governor.py) steps through them by measured frame time.
+# render_scale multiplies RENDER_SCALE, particles is the share of PARTICLE_CAPACITY that may be alive;
+# path_update_interval and offscreen_ai_interval (ms, 0 is every tick) change the simulation, so recordings and replays keep the first tier's
+QUALITY_TIERS = [
+    {'name': 'high', 'render_scale': 1.0, 'particles': 1.0, 'path_update_interval': 200, 'offscreen_ai_interval': 0},
+    {'name': 'medium', 'render_scale': 1.0, 'particles': 0.5, 'path_update_interval': 300, 'offscreen_ai_interval': 100},
+    {'name': 'low', 'render_scale': 0.75, 'particles': 0.5, 'path_update_interval': 400, 'offscreen_ai_interval': 250},
+    {'name': 'lowest', 'render_scale': 0.5, 'particles': 0.25, 'path_update_interval': 600, 'offscreen_ai_interval': 500},
+]
+QUALITY_GOVERNOR = True
+GOVERNOR_WINDOW = 90  # frames in the rolling average
+GOVERNOR_DOWN = 0.95  # step down when the average frame work is above this share of the frame budget
+GOVERNOR_UP = 0.6  # step up after GOVERNOR_UP_FRAMES frames in a row below this share
+GOVERNOR_UP_FRAMES = 300
+GOVERNOR_HOLD_FRAMES = 120  # no decisions for this long after a change
+
+# field of view, radius in tiles
+FOV_RADIUS = 12
+FOV_CACHE_SIZE = 4096
+FOG_OF_WAR = True
+FOG_SEEN_ALPHA = 170
+ENEMY_REQUIRES_SIGHT = True
+
+# post processing, intensity None switches an effect off
+VIGNETTE_INTENSITY = 400
+DARKNESS_INTENSITY = None
+DARKNESS_LIGHT_RADIUS = 160
+POSTFX_CACHE_DIR = None  # e.g. 'cache/postfx' to keep built overlays on disk
+
+# audio
+SOUND_DIRS = ['audio', 'audio/attack']
+MUSIC_PATH = 'audio/main.ogg'
+AUDIO_CHANNELS = 8
+SFX_VOLUME = 0.5
+MUSIC_VOLUME = 0.4
+SOUND_PRIORITY_LOW = 1
+SOUND_PRIORITY_NORMAL = 2
+SOUND_PRIORITY_HIGH = 3
+
+# frame telemetry, 10 minutes of frames at 60 FPS
+TELEMETRY_CAPACITY = 36000
+TELEMETRY_FLUSH_KEY = pygame.K_F9
+
+# garbage collection, see gcpolicy.py; 'frozen' freezes the built level and raises the thresholds during play, 'default' leaves gc alone
+GC_MODE = 'frozen'
+GC_THRESHOLDS = (10000, 20, 1000)
+
+# memory report, tracemalloc only runs with --memory-trace
+MEMORY_REPORT_KEY = pygame.K_F10
+MEMORY_SNAPSHOT_DIR = 'cache/memory'
+MEMORY_TRACE_FRAMES = 1
+
 # ui
 BAR_HEIGHT = 20
 HEALTH_BAR_WIDTH = 200
@@ -17,6 +97,7 @@ ENERGY_BAR_WIDTH = 140
 ITEM_BOX_SIZE = 80
 UI_FONT = 'graphics/font/joystix.ttf'
 UI_FONT_SIZE = 18
+UI_TEXT_CACHE_SIZE = 64
 
 # general colors
 WATER_COLOR = '#71ddee'
@@ -33,10 +114,37 @@ UI_BORDER_COLOR_ACTIVE = 'gold'
 MAP_WIDTH = 80
 MAP_HEIGHT = 80
 
+# defaults for Level, stress.py overrides them per scenario
+CELL_COUNT = 15
+MAX_ENEMIES = 4
+
+# layout tuning, bulk_generate.py overrides them to compare settings over many seeds
+ROOM_MIN_SIZE = 8  # cells need to be wider and taller than this to become rooms
+EXTRA_EDGE_SHARE = 0.15  # share of the non-MST Delaunay edges that also get a corridor
+SEPARATION_MAX_PASSES = 10000
+
+# level generation runs in slices of this many ms while the loading screen is up
+LOADING_SLICE_MS = 12
+
+# 'auto' uses the built-in Delaunay/MST up to BUILTIN_GENERATION_MAX_ROOMS rooms, 'builtin' or 'scipy' force one
+GENERATION_BACKEND = 'auto'
+BUILTIN_GENERATION_MAX_ROOMS = 64
+
+# baked assets, see bake_assets.py
+USE_BAKED_ASSETS = True
+ASSET_BAKE_DIR = 'graphics/baked'
+ASSET_MANIFEST = 'graphics/baked/manifest.json'
+ATLAS_SIZE = 2048
+
 # Define Player setup
 PLAYER_WIDTH = 40
 PLAYER_HEIGHT = 40
 
+# entity broadphase and contact
+SPATIAL_CELL_SIZE = TILESIZE * 2
+SEPARATION_RADIUS = TILESIZE * 2
+CONTACT_DAMAGE = 5
+
 # weapons
 weapon_data = {
     'sword' : {'cooldown': 100, 'damage' : 15, 'graphic' : 'graphics/weapons/sword/full.png'},
@@ -50,6 +158,15 @@ weapon_data = {
 magic_data = {'flame' : {'strength' : 5, 'cost' : 20, 'graphic' : 'graphics/particles/flame/fire.png'},
               'heal' : {'strength' : 20, 'cost' : 10, 'graphic' : 'graphics/particles/heal/heal.png'}}
 
+# particles, one animation per folder under PARTICLE_DIR
+PARTICLE_DIR = 'graphics/particles'
+PARTICLE_CAPACITY = 256  # all alive costs about 2 ms a frame to update and draw at 1280x720
+PARTICLE_FRAME_MS = 80
+FLAME_PARTICLES = 6
+FLAME_SPEED = 4  # pixels per tick
+FLAME_SPREAD = 12  # degrees either side of the facing direction
+FACING_VECTORS = {'up': (0, -1), 'down': (0, 1), 'left': (-1, 0), 'right': (1, 0)}
+
 # enemy
 monster_data = {'Worm' : {'health' : 10, 'damage' : 80, 'attack_type' : 'slash', 'attack_sound' : 'audio/attack/slash.wav', 'speed' : 0, 'resistance' : 3, 'attack_radius' : 80, 'notice_radius' : 120, 'exp' : 100},
                 'BigWorm' : {'health' : 10, 'damage' : 80, 'attack_type' : 'claw', 'attack_sound' : 'audio/attack/claw.wav', 'speed' : 0, 'resistance' : 3, 'attack_radius' : 80, 'notice_radius' : 120, 'exp' : 100}, 
@@ -0,0 +1,86 @@
+import pygame
+from settings import *
+
+
+class SpatialHash:
+	"""
+	Uniform grid over world pixels used as a broadphase for moving entities.
+	Sprites are bucketed by their hitbox, so a query only looks at the few
+	cells it touches instead of every sprite in a group.
+	"""
+
+	def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+		self.cell_size = cell_size
+		self.cells = {}  # (cx, cy) -> list of sprites
+		self.sprite_cells = {}  # sprite -> (cx0, cy0, cx1, cy1) it was inserted with
+
+	def cell_range(self, rect):
+		size = self.cell_size
+		return (rect.left // size, rect.top // size, (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+	def clear(self):
+		self.cells.clear()
+		self.sprite_cells.clear()
+
+	def insert(self, sprite):
+		cell_range = self.cell_range(sprite.hitbox)
+		cx0, cy0, cx1, cy1 = cell_range
+		for cx in range(cx0, cx1 + 1):
+			for cy in range(cy0, cy1 + 1):
+				self.cells.setdefault((cx, cy), []).append(sprite)
+		self.sprite_cells[sprite] = cell_range
+
+	def remove(self, sprite):
+		cell_range = self.sprite_cells.pop(sprite, None)
+		if cell_range is None:
+			return
+		cx0, cy0, cx1, cy1 = cell_range
+		for cx in range(cx0, cx1 + 1):
+			for cy in range(cy0, cy1 + 1):
+				bucket = self.cells.get((cx, cy))
+				if bucket:
+					bucket.remove(sprite)
+					if not bucket:
+						del self.cells[(cx, cy)]
+
+	def update(self, sprite):
+		# Only touch the buckets when the sprite actually crossed a cell border
+		if self.sprite_cells.get(sprite) != self.cell_range(sprite.hitbox):
+			self.remove(sprite)
+			self.insert(sprite)
+
+	def rebuild(self, sprites):
+		self.clear()
+		for sprite in sprites:
+			self.insert(sprite)
+
+	def candidates(self, rect):
+		found = []
+		seen = set()
+		cx0, cy0, cx1, cy1 = self.cell_range(rect)
+		for cx in range(cx0, cx1 + 1):
+			for cy in range(cy0, cy1 + 1):
+				for sprite in self.cells.get((cx, cy), ()):
+					if sprite not in seen:
+						seen.add(sprite)
+						found.append(sprite)
+		return found
+
+	def query_rect(self, rect, exclude=None):
+		# Who overlaps this rect
+		return [sprite for sprite in self.candidates(rect)
+				if sprite is not exclude and sprite.hitbox.colliderect(rect)]
+
+	def query_radius(self, center, radius, exclude=None):
+		# Who has its hitbox centre within radius of the given point
+		x, y = center
+		area = pygame.Rect(x - radius, y - radius, radius * 2 + 1, radius * 2 + 1)
+		radius_sq = radius * radius
+		found = []
+		for sprite in self.candidates(area):
+			if sprite is exclude:
+				continue
+			sx, sy = sprite.hitbox.center
+			if (sx - x) ** 2 + (sy - y) ** 2 <= radius_sq:
+				found.append(sprite)
+		return found
@@ -0,0 +1,54 @@
+import builtins
+import importlib
+import sys
+import time
+
+# Imported first by main.py so this is as close to process launch as we get
+LAUNCH_TIME = time.perf_counter()
+
+import_times = {}  # top-level module name -> seconds spent on its first import
+_original_import = builtins.__import__
+_import_depth = 0
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+	global _import_depth
+	top_level = name.partition('.')[0]
+	if level != 0 or top_level in sys.modules or top_level in import_times:
+		return _original_import(name, globals, locals, fromlist, level)
+
+	_import_depth += 1
+	start = time.perf_counter()
+	try:
+		return _original_import(name, globals, locals, fromlist, level)
+	finally:
+		_import_depth -= 1
+		import_times[top_level] = (time.perf_counter() - start, _import_depth)
+
+
+def start_import_timing():
+	builtins.__import__ = _timed_import
+
+
+def stop_import_timing():
+	builtins.__import__ = _original_import
+
+
+def lazy_import(name):
+	"""
+	Imports a heavy optional module the first time it is actually needed and
+	records how long that took, so it shows up in the startup report.
+	"""
+	module = sys.modules.get(name)
+	if module is None:
+		start = time.perf_counter()
+		module = importlib.import_module(name)
+		import_times.setdefault(name.partition('.')[0], (time.perf_counter() - start, 0))
+	return module
+
+
+def report_startup(label='first frame'):
+	print(f'Startup: {label} after {(time.perf_counter() - LAUNCH_TIME) * 1000:.1f} ms')
+	for name, (seconds, depth) in sorted(import_times.items(), key=lambda item: -item[1][0]):
+		if seconds >= 0.001:
+			print(f'  {"  " * depth}{name:<20} {seconds * 1000:8.1f} ms')
@@ -0,0 +1,180 @@
+"""
+Headless stress scenarios: builds levels with a chosen number of enemies,
+enemy type mix, map size and cell count, runs each for a fixed number of
+simulation ticks and reports throughput and memory against the enemy count.
+
+	python stress.py --enemies 4 16 64 256 --mix S=2,K=1 --map-size 120 --cells 30
+	python stress.py --enemies 8 32 128 --draw --plot stress.png
+
+Mix letters are Level.enemy_types: S Spider, W Worm, K Skeleton, B big Worm.
+"""
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import contextlib
+import gc
+import time
+import tracemalloc
+import numpy as np
+import pygame
+from settings import *
+from level import Level
+from replay import InputState
+from timestep import sim_clock
+from telemetry import start_telemetry
+from startup import lazy_import
+
+# Per-phase columns shown in the report, see telemetry.PHASES
+REPORT_PHASES = ['fov', 'entities', 'enemy_ai', 'sprites', 'particles', 'draw', 'fog']
+
+
+def parse_mix(text):
+	# 'S=2,K=1' -> {'S': 2.0, 'K': 1.0}
+	if not text:
+		return None
+	mix = {}
+	for part in text.split(','):
+		letter, _, weight = part.partition('=')
+		letter = letter.strip().upper()
+		if letter not in Level.enemy_names:
+			raise argparse.ArgumentTypeError(f'unknown enemy type {letter!r}, use one of {", ".join(Level.enemy_names)}')
+		mix[letter] = float(weight) if weight else 1.0
+	return mix
+
+
+def surface_bytes(sprites):
+	# Pixel memory of the distinct images the sprites show, SDL allocates it outside tracemalloc
+	seen = {}
+	for sprite in sprites:
+		image = getattr(sprite, 'image', None)
+		if image is not None:
+			root = image.get_abs_parent()  # subsurfaces share their sheet's pixels
+			seen[id(root)] = root.get_width() * root.get_height() * root.get_bytesize()
+	return sum(seen.values())
+
+
+def resident_mb():
+	try:
+		with open('/proc/self/statm') as statm:
+			return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+	except (OSError, ValueError):
+		return float('nan')  # not on Linux
+
+
+def run_scenario(enemy_count, enemy_mix, map_size, cell_count, ticks, seed, draw=False, deterministic=False, verbose=False):
+	with contextlib.ExitStack() as output:
+		if not verbose:
+			output.enter_context(contextlib.redirect_stdout(output.enter_context(open(os.devnull, 'w'))))
+		gc.collect()
+		sim_clock.reset()
+		tracemalloc.start()
+		start = time.perf_counter()
+		level = Level(seed, deterministic, map_size, map_size, cell_count, enemy_count, enemy_mix)
+		build_ms = (time.perf_counter() - start) * 1000
+		heap_bytes = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+
+		# Player stands still, so every enemy that notices it converges on one spot
+		idle = InputState()
+		telemetry = start_telemetry(ticks)
+		start = time.perf_counter()
+		for _ in range(ticks):
+			telemetry.next_frame()
+			sim_clock.advance(1000 / TICK_RATE)
+			level.update(idle)
+			if draw:
+				level.draw()
+		telemetry.next_frame()
+		elapsed = time.perf_counter() - start
+
+		result = {
+			'enemies': len(level.enemy_sprites),
+			'awake': len(level.awake_enemies),
+			'rooms': len(level.rooms),
+			'sprites': len(level.visible_sprites),
+			'build_ms': build_ms,
+			'tick_ms': elapsed * 1000 / ticks,
+			'p95_ms': float(np.percentile(telemetry.ordered()['frame_ms'], 95)),
+			'ticks_per_s': ticks / elapsed,
+			'heap_mb': heap_bytes / 2 ** 20,
+			'surface_mb': surface_bytes(level.visible_sprites) / 2 ** 20,
+			'rss_mb': resident_mb(),
+			'stages': dict(level.generation.timings),
+		}
+		frames = telemetry.ordered()
+		for phase in REPORT_PHASES:
+			result[phase] = float(frames[phase].mean())
+
+		level.close()
+		level.visible_sprites.empty()
+		del level
+	return result
+
+
+def print_report(results, draw):
+	phases = [phase for phase in REPORT_PHASES if draw or phase not in ('draw', 'fog')]
+	header = f'{"enemies":>7} {"awake":>5} {"rooms":>5} {"build ms":>9} {"tick ms":>8} {"p95 ms":>7} {"ticks/s":>8} ' + ' '.join(f'{phase:>8}' for phase in phases) + f' {"heap MB":>8} {"surf MB":>8} {"rss MB":>7}'
+	print(header)
+	for result in results:
+		print(f'{result["enemies"]:>7} {result["awake"]:>5} {result["rooms"]:>5} {result["build_ms"]:>9.1f} {result["tick_ms"]:>8.3f} {result["p95_ms"]:>7.3f} {result["ticks_per_s"]:>8.0f} '
+			  + ' '.join(f'{result[phase]:>8.3f}' for phase in phases)
+			  + f' {result["heap_mb"]:>8.2f} {result["surface_mb"]:>8.2f} {result["rss_mb"]:>7.1f}')
+	print(f'phase columns are mean ms per tick; {1000 / TICK_RATE:.2f} ms is the budget for one tick at {TICK_RATE} Hz')
+
+	print(f'\n{"generation ms":<14} ' + ' '.join(f'{result["enemies"]:>8}' for result in results))
+	for stage in results[0]['stages']:
+		print(f'{stage:<14} ' + ' '.join(f'{result["stages"][stage]:>8.1f}' for result in results))
+
+
+def plot(results, path, draw):
+	try:
+		plt = lazy_import('matplotlib.pyplot')
+	except ImportError:
+		print('matplotlib is not installed, skipping the plot')
+		return
+	enemies = [result['enemies'] for result in results]
+	figure, (time_axis, memory_axis) = plt.subplots(1, 2, figsize=(12, 5))
+	for phase in REPORT_PHASES:
+		if draw or phase not in ('draw', 'fog'):
+			time_axis.plot(enemies, [result[phase] for result in results], marker='o', label=phase)
+	time_axis.plot(enemies, [result['tick_ms'] for result in results], marker='o', color='black', label='whole tick')
+	time_axis.axhline(1000 / TICK_RATE, linestyle='--', color='red', label='tick budget')
+	time_axis.set_xlabel('enemies')
+	time_axis.set_ylabel('ms per tick')
+	time_axis.legend()
+	memory_axis.plot(enemies, [result['heap_mb'] for result in results], marker='o', label='python heap')
+	memory_axis.plot(enemies, [result['surface_mb'] for result in results], marker='o', label='surfaces')
+	memory_axis.set_xlabel('enemies')
+	memory_axis.set_ylabel('MB')
+	memory_axis.legend()
+	figure.tight_layout()
+	figure.savefig(path)
+	print(f'Plot written to {path}')
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Run headless stress scenarios')
+	parser.add_argument('--enemies', type=int, nargs='+', default=[4, 16, 64, 256], help='enemy counts to try')
+	parser.add_argument('--mix', type=parse_mix, help='enemy type weights, e.g. S=2,K=1 (default: uniform)')
+	parser.add_argument('--map-size', type=int, default=MAP_WIDTH, help='map width and height in tiles')
+	parser.add_argument('--cells', type=int, default=CELL_COUNT, help='cells scattered before rooms are picked')
+	parser.add_argument('--ticks', type=int, default=600, help='simulation ticks per scenario')
+	parser.add_argument('--seed', type=int, default=1, help='level seed, the same for every scenario')
+	parser.add_argument('--draw', action='store_true', help='render every tick as well')
+	parser.add_argument('--deterministic', action='store_true', help='wait for path searches like replays do')
+	parser.add_argument('--plot', metavar='PATH', help='save a throughput and memory plot (needs matplotlib)')
+	parser.add_argument('--verbose', action='store_true', help='keep the level\'s own output')
+	args = parser.parse_args()
+
+	pygame.init()
+	pygame.display.set_mode((WIDTH, HEIGHT))
+	results = []
+	for enemy_count in args.enemies:
+		print(f'{enemy_count} enemies on {args.map_size}x{args.map_size}, {args.cells} cells, {args.ticks} ticks...')
+		results.append(run_scenario(enemy_count, args.mix, args.map_size, args.cells, args.ticks, args.seed, args.draw, args.deterministic, args.verbose))
+	print_report(results, args.draw)
+	if args.plot:
+		plot(results, args.plot, args.draw)
+	pygame.quit()
@@ -0,0 +1,134 @@
+"""
+Per-frame timing telemetry kept in a preallocated ring buffer and written
+to a .npy (structured, compact) or .csv file.
+
+	python telemetry.py session.npy    # summary of a recorded session
+"""
+import sys
+import time
+import numpy as np
+from settings import *
+
+# Phase columns in milliseconds, in the order they happen during a frame
+PHASES = ['clock_tick', 'events', 'fov', 'entities', 'enemy_ai', 'sprites', 'draw', 'particles', 'fog', 'upscale', 'postfx', 'ui', 'present']
+PHASE_INDEX = {name: index for index, name in enumerate(PHASES)}
+# collections overlap the phases they interrupt, so they get columns of their own, see gcpolicy.py
+FRAME_DTYPE = np.dtype([('frame_ms', 'f4'), ('sim_ticks', 'u1')] + [(name, 'f4') for name in PHASES] + [('gc_ms', 'f4'), ('gc_runs', 'u1'), ('gc_collected', 'u4')])
+
+
+class FrameTelemetry:
+	def __init__(self, capacity=TELEMETRY_CAPACITY):
+		self.frames = np.zeros(capacity, dtype=FRAME_DTYPE)
+		self.capacity = capacity
+		self.count = 0  # frames written in total, the ring keeps the last capacity
+		# the frame being measured, plain floats until it is committed to the ring
+		self.current = [0.0] * len(PHASES)
+		self.current_ticks = 0
+		self.current_gc = [0.0, 0, 0]  # ms, collections, objects collected
+		self.frame_start = None
+
+	def next_frame(self):
+		# Close the previous frame (start to start, so waiting counts) and open a new one
+		now = time.perf_counter()
+		if self.frame_start is not None:
+			row = self.frames[self.count % self.capacity]
+			row['frame_ms'] = (now - self.frame_start) * 1000
+			row['sim_ticks'] = min(self.current_ticks, 255)
+			for index, name in enumerate(PHASES):
+				row[name] = self.current[index]
+			row['gc_ms'], row['gc_runs'], row['gc_collected'] = self.current_gc[0], min(self.current_gc[1], 255), self.current_gc[2]
+			self.count += 1
+		self.frame_start = now
+		self.current_ticks = 0
+		self.current_gc = [0.0, 0, 0]
+		for index in range(len(self.current)):
+			self.current[index] = 0.0
+
+	def add(self, phase_index, seconds):
+		self.current[phase_index] += seconds * 1000
+
+	def add_collection(self, seconds, collected):
+		self.current_gc[0] += seconds * 1000
+		self.current_gc[1] += 1
+		self.current_gc[2] += collected
+
+	def ordered(self):
+		# Buffer contents oldest first
+		if self.count <= self.capacity:
+			return self.frames[:self.count]
+		split = self.count % self.capacity
+		return np.concatenate((self.frames[split:], self.frames[:split]))
+
+	def flush(self, path):
+		frames = self.ordered()
+		if path.endswith('.csv'):
+			np.savetxt(path, frames, delimiter=',', header=','.join(FRAME_DTYPE.names), comments='', fmt='%.3f')
+		else:
+			np.save(path, frames)
+		print(f'Telemetry: wrote {len(frames)} frames to {path}')
+
+
+frame_telemetry = None
+
+
+def start_telemetry(capacity=TELEMETRY_CAPACITY):
+	global frame_telemetry
+	frame_telemetry = FrameTelemetry(capacity)
+	return frame_telemetry
+
+
+def mark(phase, start):
+	# Charge the time since start to a phase and return now, for chaining
+	now = time.perf_counter()
+	if frame_telemetry is not None:
+		frame_telemetry.add(PHASE_INDEX[phase], now - start)
+	return now
+
+
+def count_tick():
+	if frame_telemetry is not None:
+		frame_telemetry.current_ticks += 1
+
+
+def load_frames(path):
+	if path.endswith('.csv'):
+		return np.genfromtxt(path, delimiter=',', names=True)
+	return np.load(path)
+
+
+def summarize(path, fps=FPS, worst=10):
+	frames = load_frames(path)
+	if len(frames) == 0:
+		print('No frames recorded')
+		return
+	frame_ms = frames['frame_ms']
+	budget = 1000 / fps
+	p50, p95, p99 = np.percentile(frame_ms, [50, 95, 99])
+	over_budget = frame_ms > budget * 1.5
+	# a frame that took 3 budgets stood in for 2 missing ones
+	dropped = int(np.maximum(np.floor(frame_ms / budget) - 1, 0).sum())
+
+	print(f'{len(frames)} frames, {frame_ms.sum() / 1000:.1f}s, target {fps} FPS ({budget:.2f} ms)')
+	print(f'frame time p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms  max {frame_ms.max():.2f} ms')
+	print(f'{int(over_budget.sum())} frames over 1.5x budget, about {dropped} frames dropped')
+
+	print('mean per phase:')
+	for name in PHASES:
+		print(f'  {name:<12} {frames[name].mean():7.3f} ms')
+	if 'gc_ms' in frames.dtype.names:
+		paused = frames['gc_ms'] > 0
+		print(f'gc: {int(frames["gc_runs"].sum())} collections in {int(paused.sum())} frames, {frames["gc_ms"].sum():.1f} ms in total, '
+			  f'longest frame {frames["gc_ms"].max():.2f} ms, {int(frames["gc_collected"].sum())} objects collected')
+
+	print(f'worst {worst} frames:')
+	for index in np.argsort(frame_ms)[::-1][:worst]:
+		frame = frames[index]
+		phases = ', '.join(f'{name} {frame[name]:.1f}' for name in PHASES + ['gc_ms'] if name in frames.dtype.names and frame[name] >= 0.5)
+		print(f'  #{index:<6} {frame["frame_ms"]:7.2f} ms  ticks {int(frame["sim_ticks"])}  {phases}')
+
+
+if __name__ == '__main__':
+	if len(sys.argv) != 2:
+		print('usage: python telemetry.py SESSION.npy|SESSION.csv')
+		sys.exit(1)
+	summarize(sys.argv[1])
@@ -1,12 +1,13 @@
 import pygame 
 from settings import *
+from assets import load_image
 
 class Tile(pygame.sprite.Sprite):
     tilesheets = {}
 
     @classmethod
     def load_tilesheet(cls, key, path):
-        tilesheet = pygame.image.load(path).convert_alpha()
+        tilesheet = load_image(path)
         cls.tilesheets[key] = tilesheet
 
     def __init__(self, pos, visible_group, obstacle_group, tilesheet_key, tile_coordinates, tile_type, edge_type = None):
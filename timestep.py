@@ -0,0 +1,85 @@
+import heapq
+from settings import *
+
+
+class SimulationClock:
+	"""
+	Milliseconds of simulated time. Advanced by a fixed step per simulation
+	tick, so cooldowns and animations run at the same rate whatever the
+	rendered frame rate is. Timers started with after() sit in a heap by the
+	time they are due and advance() fires the due ones in order, so a tick
+	costs nothing for the cooldowns that are still running.
+	"""
+
+	def __init__(self):
+		self.ticks = 0.0
+		self.timers = []  # heap of [due ms, sequence, callback], callback None once cancelled or fired
+		self.sequence = 0  # keeps timers due on the same ms in the order they were started
+		self.fired = 0
+
+	def advance(self, ms):
+		self.ticks += ms
+		now = int(self.ticks)
+		timers = self.timers
+		while timers and timers[0][0] <= now:
+			timer = heapq.heappop(timers)
+			callback = timer[2]
+			if callback is not None:
+				timer[2] = None
+				self.fired += 1
+				callback()
+
+	def after(self, ms, callback):
+		# callback() once the clock is ms further on, returns the timer for cancel()
+		timer = [int(self.ticks) + ms, self.sequence, callback]
+		self.sequence += 1
+		heapq.heappush(self.timers, timer)
+		return timer
+
+	def cancel(self, timer):
+		timer[2] = None
+
+	def pending(self):
+		return sum(1 for timer in self.timers if timer[2] is not None)
+
+	def reset(self):
+		self.ticks = 0.0
+		self.timers.clear()
+
+	def get_ticks(self):
+		return int(self.ticks)
+
+
+sim_clock = SimulationClock()
+
+
+def get_ticks():
+	# Drop-in replacement for pygame.time.get_ticks() inside the simulation
+	return sim_clock.get_ticks()
+
+
+class FixedTimestep:
+	def __init__(self, tick_rate=TICK_RATE, max_catchup_ticks=MAX_CATCHUP_TICKS):
+		self.step_ms = 1000 / tick_rate
+		self.max_catchup_ticks = max_catchup_ticks
+		self.accumulator = 0.0
+		self.dropped_ms = 0.0
+
+	def advance(self, frame_ms):
+		# Returns how many simulation ticks to run for this rendered frame
+		self.accumulator += frame_ms
+		ticks = int(self.accumulator // self.step_ms)
+		if ticks > self.max_catchup_ticks:
+			# Too far behind to catch up: keep the remainder and forget the rest
+			# instead of spiralling into ever longer frames
+			excess = (ticks - self.max_catchup_ticks) * self.step_ms
+			self.dropped_ms += excess
+			self.accumulator -= excess
+			ticks = self.max_catchup_ticks
+		self.accumulator -= ticks * self.step_ms
+		return ticks
+
+	@property
+	def alpha(self):
+		# Fraction of a tick elapsed since the last simulation step, for interpolation
+		return self.accumulator / self.step_ms
@@ -0,0 +1,93 @@
+import math
+
+# Lightweight stand-ins for scipy.spatial.Delaunay and networkx's MST, good
+# enough for the handful of room centres the generator works with
+
+
+def circumcircle(a, b, c):
+	ax, ay = a
+	bx, by = b
+	cx, cy = c
+	d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+	if d == 0:
+		# Collinear points, treat the circle as infinitely large
+		return 0.0, 0.0, math.inf
+	a_sq = ax * ax + ay * ay
+	b_sq = bx * bx + by * by
+	c_sq = cx * cx + cy * cy
+	ux = (a_sq * (by - cy) + b_sq * (cy - ay) + c_sq * (ay - by)) / d
+	uy = (a_sq * (cx - bx) + b_sq * (ax - cx) + c_sq * (bx - ax)) / d
+	return ux, uy, (ax - ux) ** 2 + (ay - uy) ** 2
+
+
+def bowyer_watson(points):
+	"""
+	Delaunay triangulation of a list of (x, y) points.
+	Returns a list of (i, j, k) index triples, like Delaunay(points).simplices.
+	"""
+	n = len(points)
+	if n < 3:
+		return []
+
+	min_x = min(x for x, _ in points)
+	max_x = max(x for x, _ in points)
+	min_y = min(y for _, y in points)
+	max_y = max(y for _, y in points)
+	delta = max(max_x - min_x, max_y - min_y, 1)
+	mid_x = (min_x + max_x) / 2
+	mid_y = (min_y + max_y) / 2
+
+	# Super triangle enclosing every point, its vertices are n, n + 1 and n + 2
+	vertices = list(points) + [(mid_x - 10000 * delta, mid_y - 10000 * delta), (mid_x, mid_y + 10000 * delta), (mid_x + 10000 * delta, mid_y - 10000 * delta)]
+	triangles = {(n, n + 1, n + 2): circumcircle(*vertices[n:n + 3])}
+
+	seen = set()
+	for i in range(n):
+		point = vertices[i]
+		if point in seen:
+			continue  # duplicate centres would only produce degenerate triangles
+		seen.add(point)
+		px, py = point
+
+		bad = [triangle for triangle, (ux, uy, r_sq) in triangles.items() if (px - ux) ** 2 + (py - uy) ** 2 < r_sq]
+
+		# The hole left by the bad triangles is bounded by edges they don't share
+		edge_count = {}
+		for triangle in bad:
+			del triangles[triangle]
+			a, b, c = triangle
+			for edge in ((a, b), (b, c), (c, a)):
+				key = (min(edge), max(edge))
+				edge_count[key] = edge_count.get(key, 0) + 1
+
+		for (a, b), count in edge_count.items():
+			if count == 1:
+				triangles[(a, b, i)] = circumcircle(vertices[a], vertices[b], point)
+
+	return [triangle for triangle in triangles if max(triangle) < n]
+
+
+def kruskal_mst(points, edges):
+	"""
+	Minimum spanning tree over index pairs, weighted by Euclidean distance.
+	Returns the tree as a list of (i, j) pairs.
+	"""
+	parent = list(range(len(points)))
+
+	def find(i):
+		while parent[i] != i:
+			parent[i] = parent[parent[i]]
+			i = parent[i]
+		return i
+
+	def length(edge):
+		(ax, ay), (bx, by) = points[edge[0]], points[edge[1]]
+		return (ax - bx) ** 2 + (ay - by) ** 2
+
+	tree = []
+	for a, b in sorted(edges, key=length):
+		root_a, root_b = find(a), find(b)
+		if root_a != root_b:
+			parent[root_a] = root_b
+			tree.append((a, b))
+	return tree
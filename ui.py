@@ -1,5 +1,6 @@
 import pygame
 from settings import *
+from assets import load_image
 
 class UI:
     def __init__(self):
@@ -7,6 +8,12 @@ class UI:
         self.display_surface = pygame.display.get_surface()
         self.font = pygame.font.Font(UI_FONT, UI_FONT_SIZE)
         
+        # cached hud, only redrawn when the player state it shows changes
+        self.hud_surface = pygame.Surface(self.display_surface.get_size(), pygame.SRCALPHA)
+        self.hud_state = None
+        self.hud_rects = []
+        self.text_surfaces = {}
+        
         # bar setup
         self.health_bar_rect = pygame.Rect(10,10,HEALTH_BAR_WIDTH,BAR_HEIGHT)
         self.energy_bar_rect = pygame.Rect(10,34,ENERGY_BAR_WIDTH,BAR_HEIGHT)
@@ -15,18 +22,18 @@ class UI:
         self.weapon_graphics = []
         for weapon in weapon_data.values():
             path = weapon['graphic']
-            weapon = pygame.image.load(path).convert_alpha()
+            weapon = load_image(path)
             self.weapon_graphics.append(weapon)
             
         # convert magic dictionary
         self.magic_graphics = []
         for magic in magic_data.values():
-            magic = pygame.image.load(magic['graphic']).convert_alpha()
+            magic = load_image(magic['graphic'])
             self.magic_graphics.append(magic)
     
     def show_bar(self, current, max_amount, bg_rect, color):
         # draw background for bar
-        pygame.draw.rect(self.display_surface, UI_BG_COLOR, bg_rect)
+        pygame.draw.rect(self.hud_surface, UI_BG_COLOR, bg_rect)
 
         # convert stat to pixel
         ratio = current / max_amount
@@ -35,27 +42,37 @@ class UI:
         current_rect.width = current_width
         
         # draw the bar
-        pygame.draw.rect(self.display_surface, color, current_rect)
-        pygame.draw.rect(self.display_surface, UI_BORDER_COLOR, bg_rect, 5)
+        pygame.draw.rect(self.hud_surface, color, current_rect)
+        pygame.draw.rect(self.hud_surface, UI_BORDER_COLOR, bg_rect, 5)
+        return bg_rect
+    
+    def get_text_surface(self, text):
+        # text surfaces are memoized by value, exp rarely changes
+        if text not in self.text_surfaces:
+            if len(self.text_surfaces) >= UI_TEXT_CACHE_SIZE:
+                self.text_surfaces.clear()
+            self.text_surfaces[text] = self.font.render(text, False, TEXT_COLOR)
+        return self.text_surfaces[text]
     
     def show_exp(self, exp):
-        text_surf = self.font.render(str(int(exp)), False, TEXT_COLOR)
+        text_surf = self.get_text_surface(str(int(exp)))
         x = self.display_surface.get_size()[0] - 20
         y = self.display_surface.get_size()[1] - 20
         text_rect = text_surf.get_rect(bottomright = (x,y))
         
         
-        pygame.draw.rect(self.display_surface, UI_BG_COLOR, text_rect.inflate(10,10))
-        self.display_surface.blit(text_surf,text_rect)
-        pygame.draw.rect(self.display_surface, UI_BORDER_COLOR, text_rect.inflate(10,10),3)
+        pygame.draw.rect(self.hud_surface, UI_BG_COLOR, text_rect.inflate(10,10))
+        self.hud_surface.blit(text_surf,text_rect)
+        pygame.draw.rect(self.hud_surface, UI_BORDER_COLOR, text_rect.inflate(10,10),3)
+        return text_rect.inflate(10,10)
     
     def selection_box(self, left, top, has_switched):
         bg_rect = pygame.Rect(left, top, ITEM_BOX_SIZE, ITEM_BOX_SIZE)
-        pygame.draw.rect(self.display_surface, UI_BG_COLOR, bg_rect)
+        pygame.draw.rect(self.hud_surface, UI_BG_COLOR, bg_rect)
         if has_switched:
-            pygame.draw.rect(self.display_surface, UI_BORDER_COLOR_ACTIVE, bg_rect, 3)
+            pygame.draw.rect(self.hud_surface, UI_BORDER_COLOR_ACTIVE, bg_rect, 3)
         else:
-            pygame.draw.rect(self.display_surface, UI_BORDER_COLOR, bg_rect, 3)
+            pygame.draw.rect(self.hud_surface, UI_BORDER_COLOR, bg_rect, 3)
         return bg_rect
     
     def weapon_overlay(self, weapon_index, has_switched):
@@ -63,21 +80,54 @@ class UI:
         weapon_surf = self.weapon_graphics[weapon_index]
         weapon_rect = weapon_surf.get_rect(center = bg_rect.center)
         
-        self.display_surface.blit(weapon_surf, weapon_rect)
+        self.hud_surface.blit(weapon_surf, weapon_rect)
+        return bg_rect
     
     def magic_overlay(self, magic_index, has_switched):
         bg_rect = self.selection_box(10, HEIGHT - (ITEM_BOX_SIZE * 2) - 10, has_switched) # magic
         magic_surf = self.magic_graphics[magic_index]
         magic_rect = magic_surf.get_rect(center = bg_rect.center)
         
-        self.display_surface.blit(magic_surf, magic_rect)
+        self.hud_surface.blit(magic_surf, magic_rect)
+        return bg_rect
+    
+    def get_hud_state(self, player):
+        # energy refills a little every tick, only its bar width matters
+        energy_width = int(self.energy_bar_rect.width * player.energy / player.stats['energy'])
+        return (player.health, player.stats['health'], energy_width, player.stats['energy'], int(player.exp),
+                player.weapon_index, player.magic_index, player.can_switch_weapon, player.can_switch_magic)
     
+    def rebuild_hud(self, player):
+        self.hud_surface.fill((0, 0, 0, 0))
+        self.hud_rects = [
+            self.show_bar(player.health, player.stats['health'], self.health_bar_rect, HEALTH_COLOR),
+            self.show_bar(player.energy, player.stats['energy'], self.energy_bar_rect, ENERGY_COLOR),
+            self.show_exp(player.exp),
+            self.weapon_overlay(player.weapon_index, not player.can_switch_weapon), # draw weapon
+            self.magic_overlay(player.magic_index, not player.can_switch_magic), # draw magic
+        ]
+    
+    def show_loading(self, stage, progress):
+        # drawn between generation slices, before there is a player to show a hud for
+        self.display_surface.fill(UI_BG_COLOR)
+        width, height = self.display_surface.get_size()
+        text_surf = self.font.render(f'Generating dungeon: {stage}', False, TEXT_COLOR)
+        self.display_surface.blit(text_surf, text_surf.get_rect(midbottom = (width // 2, height // 2 - 10)))
+
+        bg_rect = pygame.Rect(0, 0, width // 3, BAR_HEIGHT)
+        bg_rect.midtop = (width // 2, height // 2 + 10)
+        current_rect = bg_rect.copy()
+        current_rect.width = bg_rect.width * progress
+        pygame.draw.rect(self.display_surface, UI_BORDER_COLOR, bg_rect)
+        pygame.draw.rect(self.display_surface, ENERGY_COLOR, current_rect)
+        pygame.draw.rect(self.display_surface, UI_BORDER_COLOR_ACTIVE, bg_rect, 2)
+
     def display(self, player):
-        self.show_bar(player.health, player.stats['health'], self.health_bar_rect, HEALTH_COLOR)
-        self.show_bar(player.energy, player.stats['energy'], self.energy_bar_rect, ENERGY_COLOR)
-        
-        self.show_exp(player.exp)
+        hud_state = self.get_hud_state(player)
+        if hud_state != self.hud_state:
+            self.rebuild_hud(player)
+            self.hud_state = hud_state
         
-        self.weapon_overlay(player.weapon_index, not player.can_switch_weapon) # draw weapon
-        self.magic_overlay(player.magic_index, not player.can_switch_magic) # draw magic
-        
\ No newline at end of file
+        # copy only the areas the hud covers; the returned rects can go to pygame.display.update
+        self.display_surface.blits([(self.hud_surface, rect, rect) for rect in self.hud_rects], False)
+        return self.hud_rects
@@ -1,29 +1,32 @@
 import pygame
+from assets import load_image
 
 class Weapon(pygame.sprite.Sprite):
     def __init__(self, player, groups):
         super().__init__(groups)
         self.sprite_type = 'weapon'
+
+        # one rect for every swing, the pool reuses the sprite
+        self.rect = pygame.Rect(0, 0, 0, 0)
+
+         # Define the hitbox
+        self.hitbox = self.rect
+        self.reset(player)
+
+    def reset(self, player):
         direction = player.status
-        
+
         # graphic
         full_path = f'graphics/weapons/{player.weapon}/{direction}.png'
-        original_image = pygame.image.load(full_path).convert_alpha()
-        
-        # Create a red box of the same size as the weapon's image
-        self.image = original_image
-        #self.image.fill((255, 0, 0))  # Fill with red color
-        
+        self.image = load_image(full_path)
+        self.rect.size = self.image.get_size()
+
         # placement
         if direction == 'right':
-            self.rect = self.image.get_rect(center = player.rect.midright + pygame.math.Vector2(16,0))
+            self.rect.center = (player.rect.midright[0] + 16, player.rect.midright[1])
         elif direction == 'left':
-            self.rect = self.image.get_rect(center = player.rect.midleft - pygame.math.Vector2(16,0))
+            self.rect.center = (player.rect.midleft[0] - 16, player.rect.midleft[1])
         elif direction == 'up':
-            self.rect = self.image.get_rect(center = player.rect.midtop + pygame.math.Vector2(16,0))
+            self.rect.center = (player.rect.midtop[0] + 16, player.rect.midtop[1])
         else:
-            self.rect = self.image.get_rect(center = player.rect.midbottom - pygame.math.Vector2(16,0))
-         
-         # Define the hitbox
-        self.hitbox = self.rect 
-
+            self.rect.center = (player.rect.midbottom[0] - 16, player.rect.midbottom[1])